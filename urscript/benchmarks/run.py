@@ -0,0 +1,287 @@
+"""
+Benchmarks of the hot paths of the urscript package on fixed synthetic workloads:
+    1) Program generation: create_function and statements on 10k to 1M statements
+    2) Poses: pose_by_plane and axisangle_from_vectors on large target sets
+    3) Kinematics: forward and inverse kinematics throughput, pure Python and batched with NumPy
+    4) Communication: _format_data decode rate and send_script round trips against a local emulator.Emulator
+
+Every workload is built from a fixed seed, so runs on the same machine are comparable. Results are the best of
+several repeats, reported as time per item. Comparing against a baseline file reports the ratio for every benchmark
+and exits with status 1 when one is slower than the threshold allows.
+
+Usage:
+    python run.py                                   # run and print
+    python run.py --quick                           # skip the largest workloads
+    python run.py --save baseline.json              # record a new baseline
+    python run.py --compare baseline.json           # report regressions against the baseline
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+import comm
+import core
+import emulator
+import robot
+import urscript as ur
+
+try:
+    import numpy as np
+    import batch_kinematics
+except ImportError:
+    np = None
+
+SEED = 2013
+REPEATS = 3
+
+# ----- Workloads -----
+
+def _random_joints(count, rng):
+    """Private function that returns joint vectors inside the elbow limits, away from the singular stretched arm"""
+    return [tuple(rng.uniform(-math.pi, math.pi) if i != 2 else rng.uniform(0.3, 2.5) for i in range(6))
+            for _ in range(count)]
+
+def _targets(joints, model):
+    """Private function that returns the tool flange frames of many joint vectors"""
+    return [model.forward_kinematics(j)[-1] for j in joints]
+
+def _reachable(frames, model):
+    """Private function that returns the frames the pure Python inverse kinematics solves in its default configuration"""
+    result = []
+    for frame in frames:
+        try:
+            core.inverse_kinematics(frame, model)
+        except ValueError:
+            continue
+        result.append(frame)
+    return result
+
+def _orthonormal_vectors(frames):
+    """Private function that returns the (X, Y, Z) axes of frames"""
+    return [(core.column(f, 0), core.column(f, 1), core.column(f, 2)) for f in frames]
+
+def _statements(count):
+    """Private function that returns a mix of motion and IO statements"""
+    lines = []
+    for i in range(count):
+        if i % 10 == 0:
+            lines.append(ur.set_digital_out(i % 8, i % 20 == 0))
+        else:
+            lines.append(ur.movel(ur.pose(0.001 * i, 0.2, 0.3, 0.0, 3.14, 0.0), 1.2, 0.3, blend = 0.001))
+    return lines
+
+def _packets(count):
+    """Private function that returns realtime packets of the default size"""
+    source = emulator.Emulator()
+    return [source.packet(i) for i in range(count)]
+
+def benchmarks(quick = False):
+    """Returns the benchmarks as (name, items, function) tuples. Workloads are built when the benchmark runs"""
+    sizes = (10000, 100000) if quick else (10000, 100000, 1000000)
+    model = robot.model('UR5')
+    result = []
+    for size in sizes:
+        result.append(('create_function_{0}'.format(size), size, _create_function(size)))
+        result.append(('statements_{0}'.format(size), size, _combine_statements(size)))
+    result.append(('pose_by_plane_10000', 10000, _pose_by_plane(10000, model)))
+    result.append(('axisangle_from_vectors_10000', 10000, _axisangle(10000, model)))
+    result.append(('forward_kinematics_2000', 2000, _forward_kinematics(2000, model)))
+    result.append(('core_forward_kinematics_2000', 2000, _core_forward_kinematics(2000, model)))
+    result.append(('inverse_kinematics_2000', 2000, _inverse_kinematics(2000, model)))
+    if np is not None:
+        result.append(('batch_forward_kinematics_100000', 100000, _batch_forward_kinematics(100000, model)))
+        result.append(('batch_inverse_kinematics_100000', 100000, _batch_inverse_kinematics(100000, model)))
+    result.append(('format_data_10000', 10000, _format_data(10000)))
+    result.append(('send_script_round_trip_200', 200, _send_script(200)))
+    return result
+
+# Every benchmark factory returns (setup, run) or (setup, run, teardown). setup builds the workload once, run is timed
+
+def _create_function(size):
+    def setup():
+        return _statements(size)
+    def run(lines):
+        ur.create_function('main', lines)
+    return setup, run
+
+def _combine_statements(size):
+    def setup():
+        lines = _statements(size)
+        return [lines[i:i + 100] for i in range(0, size, 100)]
+    def run(groups):
+        ur.statements(*groups)
+    return setup, run
+
+def _pose_by_plane(size, model):
+    def setup():
+        return _targets(_random_joints(size, random.Random(SEED)), model)
+    def run(frames):
+        for frame in frames:
+            ur.pose_by_plane(frame)
+    return setup, run
+
+def _axisangle(size, model):
+    def setup():
+        return _orthonormal_vectors(_targets(_random_joints(size, random.Random(SEED)), model))
+    def run(vectors):
+        for v in vectors:
+            ur.axisangle_from_vectors(v)
+    return setup, run
+
+def _forward_kinematics(size, model):
+    def setup():
+        return _random_joints(size, random.Random(SEED))
+    def run(joints):
+        # a fresh model per run, so the cached chain of a previous run is not reused
+        fresh = robot.RobotModel(model.dh_table)
+        for j in joints:
+            fresh.forward_kinematics(j)
+    return setup, run
+
+def _core_forward_kinematics(size, model):
+    # the public path of kinematics.forward_kinematics without the Rhino planes: the joint values are folded into the
+    # angle column of the DH table, so every call brings a table of its own
+    def setup():
+        base = core.frame_from_pose((0.1, 0.2, 0.3, 0.0, 0.0, 0.5))
+        tables = [tuple((d, theta + joint, r, alpha) for (d, theta, r, alpha), joint in zip(model.dh_table, j))
+                  for j in _random_joints(size, random.Random(SEED))]
+        return base, tables
+    def run(workload):
+        base, tables = workload
+        for table in tables:
+            core.forward_kinematics(base, table)
+    return setup, run
+
+def _inverse_kinematics(size, model):
+    def setup():
+        frames = _reachable(_targets(_random_joints(2 * size, random.Random(SEED)), model), model)
+        return frames[:size]
+    def run(frames):
+        for frame in frames:
+            core.inverse_kinematics(frame, model)
+    return setup, run
+
+def _batch_forward_kinematics(size, model):
+    def setup():
+        return np.array(_random_joints(size, random.Random(SEED)))
+    def run(joints):
+        batch_kinematics.forward_kinematics(joints, model)
+    return setup, run
+
+def _batch_inverse_kinematics(size, model):
+    def setup():
+        joints = np.array(_random_joints(size, random.Random(SEED)))
+        return batch_kinematics.forward_kinematics(joints, model)[:, -1]
+    def run(frames):
+        batch_kinematics.inverse_kinematics(frames, model)
+    return setup, run
+
+def _format_data(size):
+    def setup():
+        return _packets(size)
+    def run(packets):
+        for data in packets:
+            comm._format_data(data)
+    return setup, run
+
+def _send_script(size):
+    def setup():
+        server = emulator.Emulator(ports = (0, 0, 0), primary_rate = 0)
+        server.start()
+        program = ur.create_function('main', _statements(20))
+        return server, program
+    def run(workload):
+        server, program = workload
+        # each send opens a connection, writes the program and returns once the emulator has recorded it
+        expected = len(server.scripts)
+        for _ in range(size):
+            comm.send_script(program, server.host, server.ports[0])
+            expected += 1
+            server.wait_for_scripts(expected)
+    def teardown(workload):
+        workload[0].stop()
+    return setup, run, teardown
+
+# ----- Runner -----
+
+def run(quick = False, names = None, repeats = REPEATS):
+    """Runs the benchmarks and returns a dictionary of name: seconds per item (best of repeats)"""
+    results = {}
+    for name, items, functions in benchmarks(quick):
+        if names and not any(n in name for n in names):
+            continue
+        setup, bench = functions[0], functions[1]
+        workload = setup()
+        try:
+            best = min(_time(bench, workload) for _ in range(repeats))
+        finally:
+            if len(functions) > 2:
+                functions[2](workload)
+        results[name] = best / items
+        print("{0:<36} {1:>12.3f} us/item {2:>14,.0f} items/s".format(name, 1e6 * best / items, items / best))
+    return results
+
+def _time(bench, workload):
+    """Private function that returns the duration of one run [s]"""
+    start = timeit.default_timer()
+    bench(workload)
+    return timeit.default_timer() - start
+
+def compare(results, baseline, threshold):
+    """Prints the ratio of every result to its baseline. Returns the names slower than 1 + threshold times baseline"""
+    regressions = []
+    for name in sorted(results):
+        reference = baseline.get(name)
+        if reference is None:
+            print("{0:<36} no baseline".format(name))
+            continue
+        ratio = results[name] / reference
+        flag = ''
+        if ratio > 1.0 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print("{0:<36} {1:>8.2f}x baseline{2}".format(name, ratio, flag))
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmarks of the urscript package")
+    parser.add_argument('names', nargs = '*', help = "Only run benchmarks whose name contains one of these")
+    parser.add_argument('--quick', action = 'store_true', help = "Skip the largest workloads")
+    parser.add_argument('--repeats', type = int, default = REPEATS, help = "Runs per benchmark, the best is kept")
+    parser.add_argument('--save', metavar = 'FILE', help = "Write the results as a baseline file")
+    parser.add_argument('--compare', metavar = 'FILE', help = "Compare the results with a baseline file")
+    parser.add_argument('--threshold', type = float, default = 0.25,
+                        help = "Allowed slowdown against the baseline before a benchmark counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.quick, args.names, args.repeats)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(),
+                       'numpy': np.__version__ if np is not None else None,
+                       'seconds_per_item': results}, f, indent = 2, sort_keys = True)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        if baseline.get('python') != platform.python_version():
+            print("Baseline was recorded with Python {0}, this is Python {1}".format(baseline.get('python'),
+                                                                                  platform.python_version()))
+        baseline = baseline['seconds_per_item']
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Tests of batch_kinematics.py against robot.py and core.py"""
+
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+import core
+import robot
+
+try:
+    import numpy as np
+    import batch_kinematics
+except ImportError:
+    np = None
+
+def _random_joints(count, rng):
+    """Joint vectors with the elbow bent, away from the singular stretched arm"""
+    joints = rng.uniform(-math.pi, math.pi, size = (count, 6))
+    joints[:, 2] = rng.uniform(0.3, 2.5, size = count)
+    return joints
+
+def _wrapped(angles):
+    return (angles + math.pi) % (2 * math.pi) - math.pi
+
+@unittest.skipIf(np is None, "batch_kinematics.py requires NumPy")
+class BatchKinematicsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model = robot.model('UR5')
+        self.joints = _random_joints(500, np.random.RandomState(2013))
+        self.frames = batch_kinematics.forward_kinematics(self.joints, self.model)
+
+    def test_forward_kinematics_matches_the_model(self):
+        self.assertEqual(self.frames.shape, (500, 7, 4, 4))
+        for joints, frames in zip(self.joints[:20], self.frames):
+            np.testing.assert_allclose(frames, self.model.forward_kinematics(joints), atol = 1e-12)
+        # a plain table and a model name give the same chain
+        np.testing.assert_allclose(batch_kinematics.forward_kinematics(self.joints[:20], self.model.dh_table),
+                                   self.frames[:20], atol = 1e-12)
+        np.testing.assert_allclose(batch_kinematics.forward_kinematics(np.zeros(6), 'UR5')[0, 1:],
+                                   core.forward_kinematics(None, self.model.dh_table), atol = 1e-12)
+
+    def test_round_trip(self):
+        targets = self.frames[:, -1]
+        joints, valid = batch_kinematics.inverse_kinematics(targets, self.model)
+        # targets from random joints need all configurations, the default one solves most of them
+        self.assertGreater(valid.mean(), 0.8)
+        reached = batch_kinematics.forward_kinematics(joints[valid], self.model)[:, -1]
+        np.testing.assert_allclose(reached, targets[valid], atol = 1e-9)
+
+    def test_all_configurations(self):
+        targets = self.frames[:100, -1]
+        solutions, valid = batch_kinematics.inverse_kinematics_all(targets, self.model)
+        self.assertEqual(solutions.shape, (100, 8, 6))
+        for target, joints, solved, found in zip(targets, self.joints, solutions, valid):
+            reached = batch_kinematics.forward_kinematics(solved[found], self.model)[:, -1]
+            np.testing.assert_allclose(reached, np.broadcast_to(target, reached.shape), atol = 1e-9)
+            # the joints the target came from are one of the solutions
+            differences = np.abs(_wrapped(solved[found] - joints)).max(axis = 1)
+            self.assertLess(differences.min(), 1e-6)
+
+    def test_matches_core_inverse_kinematics(self):
+        targets = self.frames[:50, -1]
+        for k, (right_hand, elbow_up, wrist_up) in enumerate(batch_kinematics.CONFIGURATIONS):
+            joints, valid = batch_kinematics.inverse_kinematics(targets, self.model, right_hand, elbow_up, wrist_up)
+            for target, solved, found in zip(targets, joints, valid):
+                if found:
+                    expected = core.inverse_kinematics(target.tolist(), self.model, right_hand, elbow_up, wrist_up)
+                    np.testing.assert_allclose(solved, expected, atol = 1e-9)
+                else:
+                    self.assertRaises(ValueError, core.inverse_kinematics, target.tolist(), self.model, right_hand,
+                                      elbow_up, wrist_up)
+
+    def test_located_model(self):
+        base = core.frame_from_pose((1.0, 2.0, 0.5, 0.0, 0.0, 1.0))
+        located = self.model.located(base)
+        frames = batch_kinematics.forward_kinematics(self.joints[:50], located)
+        np.testing.assert_allclose(frames[:, 0], np.broadcast_to(base, (50, 4, 4)))
+        np.testing.assert_allclose(frames, np.matmul(base, self.frames[:50]), atol = 1e-12)
+        joints, valid = batch_kinematics.inverse_kinematics(frames[:, -1], located)
+        np.testing.assert_allclose(batch_kinematics.forward_kinematics(joints[valid], located)[:, -1],
+                                   frames[valid, -1], atol = 1e-9)
+        expected = core.inverse_kinematics(frames[0, -1].tolist(), located)
+        np.testing.assert_allclose(batch_kinematics.inverse_kinematics(frames[0, -1], located)[0][0], expected,
+                                   atol = 1e-9)
+
+    def test_unreachable_targets(self):
+        targets = np.array((core.translate(core.IDENTITY, (0.01, 0.0, 0.2)),
+                            core.translate(core.IDENTITY, (3.0, 0.0, 0.2))))
+        joints, valid = batch_kinematics.inverse_kinematics(targets, self.model)
+        self.assertFalse(valid.any())
+        self.assertTrue(np.isnan(joints).all())
+        for target in targets:
+            self.assertRaises(ValueError, core.inverse_kinematics, target.tolist(), self.model)
+
+    def test_empty_targets(self):
+        targets = np.zeros((0, 4, 4))
+        joints, valid = batch_kinematics.inverse_kinematics(targets, self.model)
+        self.assertEqual((joints.shape, valid.shape), ((0, 6), (0,)))
+        joints, valid = batch_kinematics.inverse_kinematics_all(targets, self.model)
+        self.assertEqual((joints.shape, valid.shape), ((0, 8, 6), (0, 8)))
+        joints, configurations, discontinuities = batch_kinematics.inverse_kinematics_path(targets, self.model)
+        self.assertEqual((joints.shape, configurations.shape, discontinuities.shape), ((0, 6), (0,), (0,)))
+
+    def test_joint_limits(self):
+        limited = robot.RobotModel(self.model.dh_table, joint_limits = ((0.0, 0.1),) + ((-7.0, 7.0),) * 5)
+        joints, valid = batch_kinematics.inverse_kinematics_all(self.frames[:50, -1], limited)
+        self.assertTrue(np.all(joints[valid][:, 0] >= 0.0))
+        self.assertTrue(np.all(joints[valid][:, 0] <= 0.1))
+
+    def test_continuous_path(self):
+        steps = np.linspace(0.0, 1.0, 200)[:, np.newaxis]
+        path = self.joints[0] + steps * 0.5
+        targets = batch_kinematics.forward_kinematics(path, self.model)[:, -1]
+        joints, configurations, discontinuities = batch_kinematics.inverse_kinematics_path(targets, self.model,
+                                                                                            start = path[0])
+        self.assertFalse(discontinuities.any())
+        np.testing.assert_allclose(joints, path, atol = 1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
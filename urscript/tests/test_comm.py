@@ -0,0 +1,98 @@
+"""Tests of the connections of comm.py against a local emulator.Emulator"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+import comm
+import emulator
+import program
+import urscript as ur
+
+class ScriptSenderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.robot = emulator.Emulator(ports = (0, 0, 0), primary_rate = 50.0)
+        self.robot.start()
+        self.addCleanup(self.robot.stop)
+        self.sender = comm.ScriptSender(self.robot.host, self.robot.ports[0])
+        self.addCleanup(self.sender.close)
+
+    def test_pooled_connection_is_reused(self):
+        self.assertFalse(self.sender.send('textmsg("first")').reused)
+        report = self.sender.send('textmsg("second")')
+        self.assertTrue(report.reused)
+        self.assertEqual(report.connect_seconds, 0.0)
+        self.assertTrue(self.robot.wait_for_scripts(2))
+
+    def test_closed_pooled_connection_is_replaced(self):
+        self.sender.send('textmsg("before")')
+        self.assertTrue(self.robot.wait_for_scripts(1))
+        self.robot.disconnect()
+        time.sleep(0.1)
+        self.assertFalse(self.sender.send('textmsg("after")').reused)
+        self.assertTrue(self.robot.wait_for_scripts(2))
+        self.assertEqual(self.robot.scripts, ['textmsg("before")', 'textmsg("after")'])
+
+    def test_reset_pooled_connection_is_replaced(self):
+        self.assertFalse(self.sender.send('textmsg("before")').reused)
+        self.assertTrue(self.robot.wait_for_scripts(1))
+        self.robot.disconnect(reset = True)
+        time.sleep(0.1)
+        report = self.sender.send('textmsg("after")')
+        self.assertFalse(report.reused)
+        self.assertTrue(self.robot.wait_for_scripts(2))
+        self.assertEqual(self.robot.scripts, ['textmsg("before")', 'textmsg("after")'])
+
+    def test_send_script_accepts_the_same_programs(self):
+        function = program.Function('built')
+        function.add(ur.textmsg("built"))
+        self.sender.send(function)
+        self.assertTrue(self.robot.wait_for_scripts(1))
+        # each send_script opens a connection of its own, wait so the scripts arrive in order
+        comm.send_script(function, self.robot.host, self.robot.ports[0])
+        self.assertTrue(self.robot.wait_for_scripts(2))
+        comm.send_script('textmsg("text")', self.robot.host, self.robot.ports[0])
+        self.assertTrue(self.robot.wait_for_scripts(3))
+        self.assertEqual(self.robot.scripts[0], self.robot.scripts[1])
+        self.assertEqual(self.robot.scripts[1], str(function).rstrip('\n'))
+        self.assertEqual(self.robot.scripts[2], 'textmsg("text")')
+
+class DashboardClientTest(unittest.TestCase):
+
+    def start(self, **settings):
+        self.robot = emulator.Emulator(ports = (0, 0, 0), primary_rate = 0.0, **settings)
+        self.robot.start()
+        self.addCleanup(self.robot.stop)
+        self.client = comm.DashboardClient(self.robot.host, self.robot.ports[2])
+        self.addCleanup(self.client.close)
+
+    def test_pipeline(self):
+        self.start()
+        self.assertEqual(self.client.pipeline(['stop', 'load /programs/cut.urp', 'play']),
+                         ['Stopped', 'Loading program: /programs/cut.urp', 'Starting program'])
+        self.assertEqual(self.client.banner, emulator.WELCOME)
+
+    def test_only_unanswered_commands_are_sent_again(self):
+        # the server drops the connection after the reply to 'load', before answering 'play' and 'running'
+        self.start(dashboard_disconnect_after = 3)
+        self.assertEqual(self.client.command('robotmode'), 'Robotmode: RUNNING')
+        replies = self.client.pipeline(['stop', 'load /programs/cut.urp', 'play', 'running'])
+        self.assertEqual(replies, ['Stopped', 'Loading program: /programs/cut.urp', 'Starting program',
+                                   'Program running: false'])
+        self.assertEqual(self.robot.dashboard_commands,
+                         ['robotmode', 'stop', 'load /programs/cut.urp', 'play', 'running'])
+
+    def test_submitted_replies_are_kept_for_collect(self):
+        self.start()
+        self.client.submit('robotmode', 'programState')
+        self.assertEqual(self.client.command('stop'), 'Stopped')
+        self.assertEqual(self.client.collect(), [('robotmode', 'Robotmode: RUNNING'),
+                                                 ('programState', 'STOPPED <unnamed>')])
+        self.assertEqual(self.client.collect(), [])
+
+if __name__ == '__main__':
+    unittest.main()
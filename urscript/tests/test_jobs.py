@@ -0,0 +1,91 @@
+"""Tests of jobs.JobQueue against a local emulator.Emulator"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+import emulator
+import jobs
+import urscript as ur
+
+class JobQueueTest(unittest.TestCase):
+
+    def start(self, stop_on_fault = True, job_timeout = 10.0, **settings):
+        self.robot = emulator.Emulator(ports = (0, 0, 0), primary_rate = 50.0, seed = 1, **settings)
+        self.robot.start()
+        self.addCleanup(self.robot.stop)
+        self.queue = jobs.JobQueue(self.robot.host, self.robot.ports[0], job_timeout = job_timeout,
+                                   stop_on_fault = stop_on_fault)
+        self.queue.start()
+        self.addCleanup(self.queue.stop)
+
+    def submit(self, name):
+        return self.queue.submit(name, statements = [ur.textmsg(name)])
+
+    def test_programs_run_back_to_back_in_order(self):
+        self.start(program_time = 0.1)
+        submitted = [self.submit('part{0}'.format(i)) for i in range(4)]
+        self.assertTrue(self.queue.join(10.0))
+        self.assertEqual([job.status for job in submitted], [jobs.DONE] * 4)
+        self.assertEqual([script.split('(')[0] for script in self.robot.scripts],
+                         ['def part{0}'.format(i) for i in range(4)])
+        for job in submitted:
+            self.assertGreater(job.run_seconds, 0.05)
+            self.assertLessEqual(job.submitted, job.generated)
+            self.assertLessEqual(job.generated, job.dispatched)
+        for earlier, later in zip(submitted, submitted[1:]):
+            self.assertGreaterEqual(later.dispatched, earlier.finished)
+        statistics = self.queue.statistics()
+        self.assertEqual(statistics[jobs.DONE], 4)
+        self.assertGreater(statistics['utilisation'], 0.0)
+
+    def test_programs_shorter_than_a_state_period_finish(self):
+        # the emulator runs these for no time at all, no state message reports them running
+        self.start(program_time = 0.0)
+        submitted = [self.submit('quick{0}'.format(i)) for i in range(3)]
+        self.assertTrue(self.queue.join(10.0))
+        self.assertEqual([job.status for job in submitted], [jobs.DONE] * 3)
+        self.assertEqual([job.started for job in submitted], [None] * 3)
+        self.assertEqual(len(self.robot.scripts), 3)
+
+    def test_fault_holds_the_queue_until_resumed(self):
+        self.start(program_time = 0.05, fault_rate = 1.0)
+        faulted = self.submit('bad')
+        after = self.submit('after')
+        self.assertTrue(self.queue.join(10.0))
+        self.assertEqual(faulted.status, jobs.FAULTED)
+        self.assertIn("runtime exception", faulted.detail)
+        self.assertTrue(self.queue.halted)
+        self.assertNotIn(after.status, (jobs.RUNNING, jobs.DONE, jobs.FAULTED))
+        self.robot.fault_rate = 0.0
+        self.queue.resume()
+        self.assertTrue(self.queue.join(10.0))
+        self.assertEqual(after.status, jobs.DONE)
+
+    def test_failed_builder(self):
+        self.start(stop_on_fault = False)
+        def builder():
+            raise RuntimeError("no toolpath")
+        failed = self.queue.submit('broken', builder = builder)
+        done = self.submit('fine')
+        self.assertTrue(self.queue.join(10.0))
+        self.assertEqual(failed.status, jobs.FAILED)
+        self.assertIn("no toolpath", failed.detail)
+        self.assertEqual(done.status, jobs.DONE)
+        self.assertEqual(len(self.robot.scripts), 1)
+
+    def test_timeout_covers_start_and_end(self):
+        self.start(program_time = 5.0, job_timeout = 0.5)
+        job = self.submit('long')
+        self.assertTrue(job.wait(5.0))
+        ended = time.time()
+        self.assertEqual(job.status, jobs.FAILED)
+        self.assertIsNotNone(job.started)
+        # one deadline from dispatch, not a new timeout once the program was seen running
+        self.assertLess(ended - job.dispatched, 0.9)
+
+if __name__ == '__main__':
+    unittest.main()
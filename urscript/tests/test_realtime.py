@@ -0,0 +1,49 @@
+"""Tests of realtime.RealtimeClient against a local emulator.Emulator"""
+
+import itertools
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+import emulator
+import realtime
+
+class RealtimeClientTest(unittest.TestCase):
+
+    def start(self, **settings):
+        self.robot = emulator.Emulator(ports = (0, 0, 0), rate = 1000.0, primary_rate = 0.0, **settings)
+        self.robot.start()
+        self.addCleanup(self.robot.stop)
+        self.errors = []
+        self.client = realtime.RealtimeClient(self.robot.host, self.robot.ports[1], reconnect_delay = 0.01,
+                                              on_error = self.errors.append)
+        self.addCleanup(self.client.close)
+
+    def assertPackets(self, count):
+        """Checks that the first count packets arrive whole and in order"""
+        for index, data in enumerate(itertools.islice(self.client.packets(reconnect = False), count)):
+            self.assertEqual(data, self.robot.packet(index))
+
+    def test_split_packets(self):
+        self.start(fragment_size = 7)
+        self.assertPackets(50)
+
+    def test_packets_larger_than_a_receive(self):
+        # several reads per packet, and packet boundaries inside a read
+        self.start(packet_size = 10007)
+        self.assertPackets(50)
+
+    def test_reconnect(self):
+        self.start(disconnect_after = 20)
+        states = list(itertools.islice(self.client.states(), 50))
+        self.assertEqual(len(states), 50)
+        self.assertGreaterEqual(self.client.reconnect_count, 2)
+        # the lost connections are reported to on_error instead of printed
+        self.assertEqual(len(self.errors), self.client.reconnect_count)
+        # every connection streams from the first packet again
+        self.assertEqual(states[20]['time'], states[0]['time'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Tests of recorder.Recorder against a local emulator.Emulator"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+import emulator
+import recorder
+
+class RecorderTest(unittest.TestCase):
+
+    def record(self, rate, count, **settings):
+        robot = emulator.Emulator(ports = (0, 0, 0), rate = rate, primary_rate = 0.0)
+        robot.start()
+        self.addCleanup(robot.stop)
+        rec = recorder.Recorder(robot.host, port = robot.ports[1], **settings)
+        rec.start()
+        self.addCleanup(rec.stop)
+        deadline = time.time() + 5.0
+        while rec.count < count and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(rec.count, count)
+        return rec
+
+    def test_packet_rate_from_the_model(self):
+        self.assertEqual(recorder.Recorder('127.0.0.1', model = 'UR5').frequency, 125.0)
+        rec = recorder.Recorder('127.0.0.1', model = 'UR5e')
+        self.assertEqual((rec.frequency, rec.capacity), (500.0, 30000))
+        self.assertEqual(recorder.Recorder('127.0.0.1', model = 'UR5e', frequency = 250).frequency, 250.0)
+        self.assertEqual(recorder.Recorder('127.0.0.1').frequency, recorder.Recorder.FREQUENCY)
+
+    def test_last_seconds_at_500_hz(self):
+        rec = self.record(500.0, 200, model = 'UR10e')
+        states = rec.last(0.2)
+        self.assertEqual(len(states), 100)
+        # the controller time of the packets spans the requested time
+        self.assertAlmostEqual(states[-1]['time'][0] - states[0]['time'][0], 0.2 - 1 / 500.0, places = 9)
+
+    def test_connection_errors_go_to_on_error(self):
+        robot = emulator.Emulator(ports = (0, 0, 0), primary_rate = 0.0)
+        robot.start()
+        port = robot.ports[1]
+        robot.stop()
+        errors = []
+        rec = recorder.Recorder(robot.host, port = port, on_error = errors.append)
+        rec.client.reconnect_delay = 0.01
+        rec.start()
+        self.addCleanup(rec.stop)
+        deadline = time.time() + 5.0
+        while len(errors) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(len(errors), 2)
+        self.assertEqual(rec.count, 0)
+
+if __name__ == '__main__':
+    unittest.main()
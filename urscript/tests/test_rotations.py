@@ -0,0 +1,68 @@
+"""Tests of the rotation conversions of rotations.py"""
+
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+import core
+
+try:
+    import numpy as np
+    import rotations
+except ImportError:
+    np = None
+
+def _random_vectors(count, rng, low = 0.0, high = math.pi):
+    """Rotation vectors with random axes and angles in [low, high)"""
+    axes = rng.normal(size = (count, 3))
+    axes /= np.linalg.norm(axes, axis = 1)[:, np.newaxis]
+    return axes * rng.uniform(low, high, size = count)[:, np.newaxis]
+
+@unittest.skipIf(np is None, "rotations.py requires NumPy")
+class RotationsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(2013)
+
+    def test_matrices_are_rotations(self):
+        matrices = rotations.rotation_matrices(_random_vectors(1000, self.rng))
+        np.testing.assert_allclose(np.matmul(matrices, matrices.transpose((0, 2, 1))),
+                                   np.broadcast_to(np.eye(3), matrices.shape), atol = 1e-12)
+        np.testing.assert_allclose(np.linalg.det(matrices), 1.0)
+
+    def test_round_trip(self):
+        vectors = _random_vectors(1000, self.rng)
+        np.testing.assert_allclose(rotations.rotation_vectors(rotations.rotation_matrices(vectors)), vectors,
+                                   atol = 1e-9)
+
+    def test_small_angles(self):
+        vectors = _random_vectors(100, self.rng, 0.0, 1e-7)
+        vectors[0] = 0.0
+        np.testing.assert_allclose(rotations.rotation_vectors(rotations.rotation_matrices(vectors)), vectors,
+                                   atol = 1e-15)
+
+    def test_angles_near_pi(self):
+        # the axis sign is ambiguous at pi, so the rotations are compared instead of the vectors
+        vectors = _random_vectors(100, self.rng, math.pi - 1e-5, math.pi)
+        matrices = rotations.rotation_matrices(vectors)
+        result = rotations.rotation_vectors(matrices)
+        np.testing.assert_allclose(np.linalg.norm(result, axis = 1), np.linalg.norm(vectors, axis = 1), atol = 1e-9)
+        np.testing.assert_allclose(rotations.rotation_matrices(result), matrices, atol = 1e-9)
+
+    def test_half_turns_about_the_axes(self):
+        matrices = np.array((np.diag((1.0, -1.0, -1.0)), np.diag((-1.0, 1.0, -1.0)), np.diag((-1.0, -1.0, 1.0))))
+        result = rotations.rotation_vectors(matrices)
+        np.testing.assert_allclose(np.abs(result), math.pi * np.eye(3), atol = 1e-12)
+
+    def test_matches_frame_from_pose(self):
+        poses = np.hstack((self.rng.uniform(-1, 1, size = (50, 3)), _random_vectors(50, self.rng)))
+        frames = rotations.frames_from_poses(poses)
+        for pose, frame in zip(poses, frames):
+            np.testing.assert_allclose(frame, core.frame_from_pose(pose), atol = 1e-12)
+        np.testing.assert_allclose(rotations.poses_from_frames(frames), poses, atol = 1e-9)
+
+if __name__ == '__main__':
+    unittest.main()
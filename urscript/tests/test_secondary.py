@@ -0,0 +1,106 @@
+"""Tests of the message decoding of secondary.py"""
+
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+import secondary
+
+def _message(message_type, body):
+    return secondary.MESSAGE_HEADER.pack(secondary.MESSAGE_HEADER.size + len(body), message_type) + body
+
+def _state(running, protective_stopped = False, emergency_stopped = False):
+    """Robot state message with a joint data package before the robot mode data"""
+    joint_data = secondary.MESSAGE_HEADER.pack(secondary.MESSAGE_HEADER.size + 8, 1) + b'\0' * 8
+    mode = secondary.ROBOT_MODE.pack(0, False, True, True, emergency_stopped, protective_stopped, running, False, 7)
+    robot_mode = secondary.MESSAGE_HEADER.pack(secondary.MESSAGE_HEADER.size + len(mode),
+                                               secondary.PACKAGE_ROBOT_MODE) + mode
+    return _message(secondary.MESSAGE_ROBOT_STATE, joint_data + robot_mode)
+
+def _robot_message(robot_message_type, body):
+    return _message(secondary.MESSAGE_ROBOT_MESSAGE,
+                    secondary.ROBOT_MESSAGE_HEADER.pack(0, -2, robot_message_type) + body)
+
+def _runtime_exception(line, column, text):
+    return _robot_message(secondary.ROBOT_MESSAGE_RUNTIME_EXCEPTION,
+                          struct.pack("!ii", line, column) + text.encode('utf-8'))
+
+def _popup(title, text):
+    title = title.encode('utf-8')
+    return _robot_message(secondary.ROBOT_MESSAGE_POPUP,
+                          struct.pack("!II???B", 1, 0, False, False, True, len(title)) + title + text.encode('utf-8'))
+
+class StateParserTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = secondary.StateParser()
+
+    def kinds(self, *messages):
+        return [event.kind for data in messages for event in self.parser.feed(data)]
+
+    def test_decodes_robot_mode(self):
+        self.assertEqual(self.kinds(_state(False)), [])
+        mode = self.parser.robot_mode
+        self.assertTrue(mode.power_on)
+        self.assertFalse(mode.program_running)
+        self.assertEqual(secondary.ROBOT_MODES[mode.robot_mode], 'RUNNING')
+
+    def test_program_started_and_finished(self):
+        kinds = self.kinds(_state(False), _state(True), _state(True), _state(False), _state(False))
+        self.assertEqual(kinds, [secondary.PROGRAM_STARTED, secondary.PROGRAM_FINISHED])
+        self.assertIsNone(self.parser.last_fault)
+
+    def test_runtime_exception_ends_the_program_faulted(self):
+        self.kinds(_state(False), _state(True))
+        events = self.parser.feed(_runtime_exception(3, 4, "Undefined variable"))
+        self.assertEqual([e.kind for e in events], [secondary.PROGRAM_FAULTED])
+        self.assertEqual(events[0].detail, "Line 3, column 4: Undefined variable")
+        self.assertEqual(self.parser.last_fault, events[0].detail)
+        # no finished event for the program that faulted
+        self.assertEqual(self.kinds(_state(False)), [])
+
+    def test_protective_stop_during_a_program(self):
+        self.kinds(_state(False), _state(True))
+        events = self.parser.feed(_state(True, protective_stopped = True))
+        self.assertEqual([(e.kind, e.detail) for e in events], [(secondary.PROGRAM_FAULTED, 'Protective stop')])
+        self.assertEqual(self.kinds(_state(False, protective_stopped = True)), [])
+        # not a fault without a program
+        self.assertEqual(self.kinds(_state(False), _state(False, emergency_stopped = True)), [])
+
+    def test_popup(self):
+        events = self.parser.feed(_popup("Check", "Tool changed"))
+        self.assertEqual([(e.kind, e.detail) for e in events], [(secondary.POPUP, "Check: Tool changed")])
+
+    def test_other_messages_are_ignored(self):
+        self.assertEqual(self.kinds(_message(secondary.MESSAGE_PROGRAM_STATE, b'\0' * 9),
+                                    _robot_message(secondary.ROBOT_MESSAGE_TEXT, b'hello')), [])
+
+    def test_program_never_seen_running(self):
+        self.kinds(_state(False))
+        # without a mark a program that ended between two states goes unnoticed
+        self.assertEqual(self.kinds(_state(False)), [])
+        self.parser.expect_program(settle = 0.0)
+        self.assertEqual(self.kinds(_state(False), _state(False)), [secondary.PROGRAM_FINISHED])
+
+    def test_expected_program_waits_for_settle(self):
+        self.kinds(_state(False))
+        self.parser.expect_program(settle = 60.0)
+        self.assertEqual(self.kinds(_state(False)), [])
+
+    def test_expected_program_seen_running_finishes_once(self):
+        self.kinds(_state(False))
+        self.parser.expect_program(settle = 0.0)
+        kinds = self.kinds(_state(True), _state(False), _state(False))
+        self.assertEqual(kinds, [secondary.PROGRAM_STARTED, secondary.PROGRAM_FINISHED])
+
+    def test_expected_program_that_fails_to_compile(self):
+        self.kinds(_state(False))
+        self.parser.expect_program(settle = 0.0)
+        kinds = self.kinds(_runtime_exception(1, 0, "Compile error"), _state(False))
+        self.assertEqual(kinds, [secondary.PROGRAM_FAULTED])
+
+if __name__ == '__main__':
+    unittest.main()
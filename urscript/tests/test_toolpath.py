@@ -0,0 +1,82 @@
+"""Tests of the path reduction of toolpath.py"""
+
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+try:
+    import numpy as np
+    import toolpath
+except ImportError:
+    np = None
+
+def _frames(positions, angles = None):
+    """Frames at positions, turned about Z by angles [rad]"""
+    positions = np.asarray(positions, dtype = float)
+    angles = np.zeros(len(positions)) if angles is None else np.asarray(angles, dtype = float)
+    frames = np.zeros((len(positions), 4, 4))
+    frames[:, 0, 0] = frames[:, 1, 1] = np.cos(angles)
+    frames[:, 1, 0] = np.sin(angles)
+    frames[:, 0, 1] = -np.sin(angles)
+    frames[:, 2, 2] = frames[:, 3, 3] = 1.0
+    frames[:, :3, 3] = positions
+    return frames
+
+def _distance_to_segment(point, start, end):
+    chord = end - start
+    t = np.clip(np.dot(point - start, chord) / np.dot(chord, chord), 0.0, 1.0)
+    return np.linalg.norm(point - start - t * chord)
+
+@unittest.skipIf(np is None, "toolpath.simplify requires NumPy")
+class SimplifyTest(unittest.TestCase):
+
+    def test_straight_line_keeps_the_ends(self):
+        positions = np.outer(np.linspace(0.0, 1.0, 101), (0.3, 0.2, 0.1))
+        np.testing.assert_array_equal(toolpath.simplify(_frames(positions), 1e-6), (0, 100))
+
+    def test_empty_path(self):
+        keep = toolpath.simplify(np.zeros((0, 4, 4)), 1e-3, 1e-3)
+        self.assertEqual((keep.shape, keep.dtype.kind), ((0,), 'i'))
+
+    def test_corner_is_kept(self):
+        positions = [(0, 0, 0), (0.1, 0, 0), (0.2, 0, 0), (0.2, 0.1, 0), (0.2, 0.2, 0)]
+        np.testing.assert_array_equal(toolpath.simplify(_frames(positions), 1e-4), (0, 2, 4))
+
+    def test_deviation_below_tolerance_is_dropped(self):
+        positions = [(0, 0, 0), (0.1, 0.0004, 0), (0.2, 0, 0), (0.3, 0.002, 0), (0.4, 0, 0)]
+        np.testing.assert_array_equal(toolpath.simplify(_frames(positions), 0.001), (0, 2, 3, 4))
+
+    def test_dropped_targets_stay_within_tolerance(self):
+        rng = np.random.RandomState(2013)
+        positions = np.cumsum(rng.normal(scale = 0.001, size = (2000, 3)), axis = 0)
+        tolerance = 0.002
+        keep = toolpath.simplify(_frames(positions), tolerance)
+        self.assertLess(len(keep), len(positions))
+        for first, last in zip(keep, keep[1:]):
+            for i in range(first + 1, last):
+                self.assertLessEqual(_distance_to_segment(positions[i], positions[first], positions[last]),
+                                     tolerance + 1e-12)
+
+    def test_orientation(self):
+        positions = np.outer(np.linspace(0.0, 1.0, 11), (1.0, 0.0, 0.0))
+        # a steady turn is what the robot interpolates between the ends
+        steady = np.linspace(0.0, 1.0, 11)
+        np.testing.assert_array_equal(toolpath.simplify(_frames(positions, steady), 1e-6, 1e-6), (0, 10))
+        # orientations are ignored without an angle tolerance
+        twisted = steady.copy()
+        twisted[5] += 0.2
+        np.testing.assert_array_equal(toolpath.simplify(_frames(positions, twisted), 1e-6), (0, 10))
+        np.testing.assert_array_equal(toolpath.simplify(_frames(positions, twisted), 1e-6, 0.1), (0, 4, 5, 6, 10))
+
+    def test_pure_reorientation(self):
+        positions = np.zeros((5, 3))
+        angles = (0.0, 0.1, 0.2, math.pi / 2, 0.4)
+        keep = toolpath.simplify(_frames(positions, angles), 1e-6, 0.01)
+        self.assertIn(3, keep)
+        self.assertEqual((keep[0], keep[-1]), (0, 4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""Tests of trajectory.py. Run with python -m pytest tests, or python -m unittest discover -s tests"""
+
+import os
+import sys
+import unittest
+
+# the modules import each other by module name, as in Rhino and Grasshopper, so their folder goes on the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'urscript'))
+
+try:
+    import numpy as np
+    import trajectory
+except ImportError:
+    np = None
+
+@unittest.skipIf(np is None, "trajectory.py requires NumPy")
+class PlanTest(unittest.TestCase):
+
+    MAX_VELOCITY = (1.0, 1.0, 1.5, 2.0, 2.0, 2.0)
+    MAX_ACCELERATION = (2.0, 2.0, 3.0, 4.0, 4.0, 4.0)
+
+    def waypoints(self):
+        s = np.linspace(0, 2 * np.pi, 400)
+        curve = np.stack((np.sin(s), 0.5 * np.cos(2 * s), 0.3 * s, 0 * s, 0.2 * np.sin(3 * s), s), axis = 1)
+        # ends with a right angle corner
+        return np.vstack((curve, curve[-1] + (0.5, 0, 0, 0, 0, 0), curve[-1] + (0.5, 0.5, 0, 0, 0, 0)))
+
+    def test_samples_respect_the_limits(self):
+        path = trajectory.plan(self.waypoints(), self.MAX_VELOCITY, self.MAX_ACCELERATION)
+        velocities = np.diff(path.positions, axis = 0) / np.diff(path.times)[:, np.newaxis]
+        # the last sample may come sooner than one period, so its finite difference is not an acceleration
+        accelerations = np.diff(velocities[:-1], axis = 0) / path.period
+        self.assertLessEqual((np.abs(velocities) / self.MAX_VELOCITY).max(), 1.0 + 1e-9)
+        # sampling the constant acceleration steps every period overshoots the limit by well under 1%
+        self.assertLessEqual((np.abs(accelerations) / self.MAX_ACCELERATION).max(), 1.01)
+
+    def test_starts_and_ends_at_the_waypoints_at_rest(self):
+        waypoints = self.waypoints()
+        path = trajectory.plan(waypoints, self.MAX_VELOCITY, self.MAX_ACCELERATION)
+        np.testing.assert_allclose(path.positions[0], waypoints[0])
+        np.testing.assert_allclose(path.positions[-1], waypoints[-1])
+        self.assertAlmostEqual(path.times[0], 0.0)
+        self.assertTrue(np.all(np.diff(path.times) <= path.period + 1e-12))
+        # from rest the first step moves less than full acceleration allows in one period
+        first_step = np.abs(path.positions[1] - path.positions[0]).max()
+        self.assertLess(first_step, max(self.MAX_ACCELERATION) * path.period ** 2)
+
+    def test_single_and_repeated_waypoints(self):
+        path = trajectory.plan([(0.1, 0.2), (0.1, 0.2)], 1.0, 1.0)
+        np.testing.assert_allclose(path.positions, [(0.1, 0.2)])
+        np.testing.assert_allclose(path.times, [0.0])
+
+    def test_no_waypoints(self):
+        self.assertRaises(ValueError, trajectory.plan, [], 1.0, 1.0)
+        self.assertRaises(ValueError, trajectory.plan, np.zeros((0, 6)), 1.0, 1.0)
+
+    def test_limits_must_be_positive(self):
+        waypoints = np.array(((0.0, 0.0), (1.0, 1.0)))
+        self.assertRaises(ValueError, trajectory.plan, waypoints, 0.0, 1.0)
+        self.assertRaises(ValueError, trajectory.plan, waypoints, 1.0, -1.0)
+        self.assertRaises(ValueError, trajectory.plan, waypoints, (1.0, 0.0), 1.0)
+
+    def test_servoj_statements(self):
+        path = trajectory.plan([(0.0,) * 6, (0.1,) * 6], 1.0, 2.0)
+        statements = list(trajectory.servoj_statements(path))
+        self.assertEqual(len(statements), len(path.times) - 1)
+        self.assertTrue(statements[-1].startswith('servoj([0.100000, 0.100000'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,23 @@ It is designed to be easy to use and extend
 It contains:
     1) script.py module: For generating UR Script programs 
     2) comm.py module: For sending UR Script programs
+    3) batch_kinematics.py module: For solving kinematics of whole toolpaths with NumPy
+    4) core.py module: Rhino-free math for frames, transforms and kinematics (Rhino objects only through adapters)
+    5) realtime.py module: Persistent client that streams robot states from the realtime interface
+    6) packets.py module: Zero-copy NumPy decoding of realtime packets
+    7) recorder.py module: Background ring-buffer recorder of realtime robot states
+    8) telemetry.py module: Binary telemetry log files with memory-mapped replay
+    9) controller.py module: Concurrent control of several robots with asyncio (Python 3 only)
+    10) streaming.py module: Streaming execution of long paths through a small resident program
+    11) program.py module: Builder that assembles UR Script programs as nodes and serializes them once
+    12) poses.py module: Pose value type and NumPy-backed PoseArray that format lazily
+    13) rotations.py module: Vectorized conversions between rotation matrices and rotation vectors
+    14) toolpath.py module: Base-frame transforms, pose generation and path simplification for whole target lists
+    15) robot.py module: Robot models (UR3/UR5/UR10 and e-series registry) with precomputed link terms
+    16) trajectory.py module: Time-optimal trajectory planning and servoj streams
+    17) emulator.py module: Local controller stand-in for load and latency testing without a robot
+    18) secondary.py module: Robot mode, program state and runtime exception events from the primary interface
+    19) jobs.py module: Job queue that pre-generates programs and dispatches them back to back
 
 It was developed at the Chair of Architecture and Digital Fabrication, ETH Zurich
 Contact : jasonlimteckchye@gmail.com
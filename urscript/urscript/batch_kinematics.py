@@ -0,0 +1,310 @@
+"""
+This module contains vectorized kinematics functions that solve whole toolpaths in one pass.
+It follows the same geometric method as kinematics.py but works on NumPy arrays instead of Rhino objects.
+
+Frames are homogeneous 4x4 matrices whose columns are the X axis, Y axis, Z axis (normal) and origin of a plane.
+A list of N frames is an (N,4,4) array.
+Every dh_table argument also accepts a robot.RobotModel or a registered model name such as 'UR5'.
+Plain tables are converted to cached models.
+"""
+
+import numpy as np
+
+import core
+import robot
+
+def forward_kinematics(joints, dh_table, base = None):
+    """
+    Function that returns all the frames of the kinematic chain for many joint vectors at once
+    Each link transform is computed once per joint vector and accumulated onto the previous frame.
+
+    Args:
+        joints: (N,6) array of joint angles added to the joint angles of the DH table. A single joint vector is also accepted
+        dh_table: Tuple of (joint_distance, joint_angle, link_length, link_twist). This is the Denavit Hartenberg parameter table.
+        base: Optional. Frame 0 as a 4x4 matrix. Defaults to the base of a robot.RobotModel, the world XY frame for a table
+
+    Returns:
+        frames: (N,7,4,4) array. frames[:,0] is the base frame and frames[:,6] is the tool flange
+    """
+    model = _as_model(dh_table)
+    joints = np.asarray(joints, dtype = float).reshape((-1, len(model)))
+    frames = np.empty((len(joints), len(model) + 1, 4, 4))
+    # as in core.forward_kinematics, a given base takes the place of the model's own
+    frames[:, 0] = model.base if base is None else base
+    for i in range(len(model)):
+        frames[:, i + 1] = np.matmul(frames[:, i], _link_transforms(model, i, joints[:, i]))
+    return frames
+
+# Order of the solutions returned by inverse_kinematics_all as (right_hand, elbow_up, wrist_up) flags
+CONFIGURATIONS = tuple((right_hand, elbow_up, wrist_up) for right_hand in (False, True)
+                       for elbow_up in (False, True)
+                       for wrist_up in (False, True))
+
+def inverse_kinematics(frames, dh_table, right_hand = False, elbow_up = False, wrist_up = False):
+    """
+    Function that returns joint angles for a UR robot for a list of target frames
+
+    Args:
+        frames: (N,4,4) array of target frames in the coordinates of forward_kinematics without a base, see
+                core.inverse_kinematics. A single (4,4) frame is also accepted
+        dh_table: Tuple of (joint_distance, joint_angle, link_length, link_twist). This is the Denavit Hartenberg parameter table.
+        right_hand: True to return right hand solution. Optional
+        elbow_up: True to return elbow_up solution. Optional
+        wrist_up: True to return wrist up solution. Optional
+
+    Returns:
+        joints: (N,6) array of joint angles. Rows that could not be solved are NaN
+        valid: (N,) boolean array. False where the target is too close to the base, out of reach or the solution is
+               outside the joint limits
+    """
+    model = _as_model(dh_table)
+    joints, valid = _within_limits(model, *_solve(frames, model, (right_hand,), (elbow_up,), (wrist_up,)))
+    return joints[:, 0], valid[:, 0]
+
+def inverse_kinematics_all(frames, dh_table):
+    """
+    Function that returns all 8 analytic joint solutions (shoulder x elbow x wrist) for a list of target frames
+    The base, shoulder and wrist geometry is solved once per target and shared by the branches that use it.
+
+    Args:
+        frames: (N,4,4) array of target frames in the coordinates of forward_kinematics without a base, see
+                core.inverse_kinematics. A single (4,4) frame is also accepted
+        dh_table: Tuple of (joint_distance, joint_angle, link_length, link_twist). This is the Denavit Hartenberg parameter table.
+
+    Returns:
+        joints: (N,8,6) array of joint angles. Solution k uses the flags in CONFIGURATIONS[k]. Unsolved solutions are NaN
+        valid: (N,8) boolean array of solved configurations inside the joint limits
+    """
+    model = _as_model(dh_table)
+    return _within_limits(model, *_all_solutions(frames, model))
+
+def _all_solutions(frames, model):
+    """Private function that returns all 8 solutions of inverse_kinematics_all before the joint limits are applied"""
+    return _solve(frames, model, (False, True), (False, True), (False, True))
+
+def inverse_kinematics_path(frames, dh_table, start = None, max_step = 0.5):
+    """
+    Function that returns a continuous joint space path through a list of target frames
+    All 8 solutions are solved at once, then a single pass over the path seeds every target from the previous joints:
+    each solution is unwrapped by multiples of 2pi to the turn closest to the previous joints (within the joint limits
+    of the model) and the solution with the least joint travel is chosen.
+
+    Args:
+        frames: (N,4,4) array of target frames in the coordinates of forward_kinematics without a base
+        dh_table: Tuple of (joint_distance, joint_angle, link_length, link_twist), a robot.RobotModel or a model name
+        start: Optional. Joint angles the path starts from, e.g. the current robot joints. Defaults to all zeros
+        max_step: Optional. Largest change of any joint between consecutive targets that counts as continuous. in radians
+
+    Returns:
+        joints: (N,6) array of joint angles. Unreachable targets are NaN and do not move the seed
+        configurations: (N,) int array of indices into CONFIGURATIONS. -1 for unreachable targets
+        discontinuities: (N,) boolean array. True where the target is unreachable or a joint moves more than max_step
+    """
+    model = _as_model(dh_table)
+    # the limits are applied after unwrapping, a solution may only fit the limits one turn further
+    solutions, valid = _all_solutions(frames, model)
+    limits = np.array(model.joint_limits)
+    # candidate turns of every joint: unwrapped, one turn less and one turn more
+    shifts = np.array((0.0, -2 * np.pi, 2 * np.pi))[:, None, None]
+    previous = np.zeros(6) if start is None else np.asarray(start, dtype = float)
+
+    joints = np.full((len(solutions), 6), np.nan)
+    configurations = np.full(len(solutions), -1)
+    discontinuities = np.ones(len(solutions), dtype = bool)
+    for i in range(len(solutions)):
+        candidates = solutions[i][valid[i]]
+        if not len(candidates):
+            continue
+        unwrapped = candidates + 2 * np.pi * np.round((previous - candidates) / (2 * np.pi))
+        turns = unwrapped + shifts
+        travel = np.abs(turns - previous)
+        travel[(turns < limits[:, 0]) | (turns > limits[:, 1])] = np.inf
+        best_turn = np.argmin(travel, axis = 0)
+        columns = np.arange(6)
+        rows = np.arange(len(candidates))[:, None]
+        candidates = turns[best_turn, rows, columns]
+        travel = travel[best_turn, rows, columns]
+        k = np.argmin(np.sum(travel * travel, axis = 1))
+        if not np.isfinite(travel[k]).all():
+            continue
+        joints[i] = previous = candidates[k]
+        configurations[i] = np.flatnonzero(valid[i])[k]
+        discontinuities[i] = travel[k].max() > max_step
+    if start is None and len(joints):
+        # the first target has no predecessor to jump from
+        discontinuities[0] = configurations[0] < 0
+    return joints, configurations, discontinuities
+
+def _solve(frames, dh_table, right_hands, elbows_up, wrists_up):
+    """
+    Private function that solves inverse kinematics for every combination of the given configuration flags
+
+    Args:
+        frames: Target frames (N,4,4)
+        dh_table: Denavit Hartenberg parameter table
+        right_hands, elbows_up, wrists_up: Sequences of configuration flags to solve for
+
+    Returns:
+        joints: (N,K,6) array of joint angles with K = len(right_hands) * len(elbows_up) * len(wrists_up)
+        valid: (N,K) boolean array
+    """
+    frames = _as_frames(frames)
+    model = _as_model(dh_table)
+    if model.base != core.IDENTITY:
+        frames = np.matmul(core.invert_frame(model.base), frames)
+    dh = np.asarray(model.dh_table)
+    # axes: target, shoulder, wrist, elbow
+    origin = frames[:, None, None, None, :3, 3]
+    yaxis = frames[:, None, None, None, :3, 1]
+    zaxis = frames[:, :3, 2]
+
+    # 1 - Find base (j0) for each shoulder choice
+    frame5_origin = frames[:, :3, 3] - zaxis * dh[5, 0]
+    j0, valid = _base_angle(frame5_origin, dh[3, 0], model.min_reach, right_hands)
+
+    # 2 - Find shoulder (frame 1)
+    m01 = _link_transforms(model, 0, j0)
+    frame1_origin = m01[..., :3, 3]
+    frame1_normal = m01[..., :3, 2]
+
+    # 3 - Find wrist 2 (frame 4) along the intersection of frame 1 and the target plane, for each wrist choice
+    frame4_z = _wrist_direction(frame1_normal, zaxis[:, None], wrists_up) * dh[4, 0]
+    frame4_origin = frame5_origin[:, None, None] + frame4_z - frame1_normal[:, :, None] * dh[3, 0]
+
+    # 4 - Circle circle intersection gives the elbow (frame 2) for each elbow choice
+    frame2_origin, reachable = _elbow_positions(frame1_origin[:, :, None], dh[1, 2], frame4_origin, dh[2, 2],
+                                                frame1_normal[:, :, None], elbows_up)
+    reachable &= np.linalg.norm(frame4_origin - frame1_origin[:, :, None], axis = -1) <= model.max_reach
+    valid = valid[:, :, None, None] & reachable[..., None]
+
+    # broadcast shoulder and wrist geometry over the elbow axis
+    m01 = m01[:, :, None, None]
+    frame1_origin = frame1_origin[:, :, None, None]
+    frame1_normal = frame1_normal[:, :, None, None]
+    frame4_origin = frame4_origin[:, :, :, None]
+    frame4_z = frame4_z[:, :, :, None]
+
+    # 5 - Find j1 and elbow (frame 2)
+    j1 = _signed_angle(-m01[..., :3, 0], _unitize(frame2_origin - frame1_origin), frame1_normal)
+    m02 = np.matmul(m01, _link_transforms(model, 1, j1))
+
+    # 6 - Find j2 and wrist 1 (frame 3)
+    j2 = _signed_angle(-m02[..., :3, 0], _unitize(frame4_origin - m02[..., :3, 3]), m02[..., :3, 2])
+    m03 = np.matmul(m02, _link_transforms(model, 2, j2))
+
+    # 7 - Find j3 and wrist 2 (frame 4)
+    j3 = _signed_angle(-m03[..., :3, 1], -frame4_z, m03[..., :3, 2])
+    m04 = np.matmul(m03, _link_transforms(model, 3, j3))
+
+    # 8 - Find j4 and wrist 3 (frame 5)
+    j4 = _signed_angle(m04[..., :3, 1], zaxis[:, None, None, None], m04[..., :3, 2])
+    m05 = np.matmul(m04, _link_transforms(model, 4, j4))
+
+    # 9 - Find j5
+    j5 = _signed_angle(m05[..., :3, 1], yaxis, m05[..., :3, 2])
+
+    j0 = np.broadcast_to(j0[:, :, None, None], j1.shape)
+    joints = np.stack((j0, j1, j2, j3, j4, j5), axis = -1)
+    # reorder axes to shoulder x elbow x wrist
+    count = len(right_hands) * len(elbows_up) * len(wrists_up)
+    joints = joints.transpose((0, 1, 3, 2, 4)).reshape((len(frames), count, 6))
+    valid = np.broadcast_to(valid, j1.shape).transpose((0, 1, 3, 2)).reshape((len(frames), count))
+    valid = valid & np.isfinite(joints).all(axis = -1)
+    joints[~valid] = np.nan
+    return joints, valid
+
+# ----- Vectorized helper functions -----
+
+def _as_frames(frames):
+    """Private function that returns frames as a float (N,4,4) array"""
+    frames = np.asarray(frames, dtype = float)
+    if frames.shape[-2:] != (4, 4):
+        raise ValueError("Frames must be 4x4 matrices, got shape {0}".format(frames.shape))
+    return frames.reshape((-1, 4, 4))
+
+def _as_model(dh_table):
+    """Private function that returns the robot model of a 6 link DH parameter table, model or model name"""
+    return robot.model(dh_table, 6)
+
+def _within_limits(model, joints, valid):
+    """Private function that marks solutions outside the joint limits of the model invalid and NaN"""
+    limits = np.array(model.joint_limits)
+    with np.errstate(invalid = 'ignore'):
+        valid = valid & ((joints >= limits[:, 0]) & (joints <= limits[:, 1])).all(axis = -1)
+    joints[~valid] = np.nan
+    return joints, valid
+
+def _link_transforms(model, i, theta):
+    """
+    Private function that returns Denavit Hartenberg transformation matrices for many joint values of one link
+    The constant terms of the link come from the model, only cos and sin of the joint angles are computed here.
+
+    Args:
+        model: robot.RobotModel
+        i: Index of the link
+        theta: Array of joint values added to the joint angle offset. in radians
+
+    Returns:
+        m: Array of shape theta.shape + (4,4)
+    """
+    theta = np.asarray(theta) + model.dh_table[i][1]
+    factors = np.stack((np.cos(theta), np.sin(theta), np.ones_like(theta)), axis = -1)
+    return np.einsum('...k,kij->...ij', factors, model.link_terms[i])
+
+def _base_angle(frame5_origin, offset, min_reach, right_hands):
+    """Private function that returns base joint angles (j0) of shape (N,S) and a mask of targets far enough from the base"""
+    distance = np.hypot(frame5_origin[:, 0], frame5_origin[:, 1])
+    valid = (distance > 0) & (distance >= min_reach)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        ratio = offset / distance
+    angle = np.arccos(np.clip(ratio, -1, 1))[:, None] * np.where(right_hands, -1.0, 1.0)
+    # vector from base to the shoulder offset, rotated about world Z
+    x = (frame5_origin[:, 0] * ratio)[:, None]
+    y = (frame5_origin[:, 1] * ratio)[:, None]
+    c = np.cos(angle)
+    s = np.sin(angle)
+    v_ot = np.stack((c * x - s * y, s * x + c * y, np.zeros_like(angle)), axis = -1)
+    j0 = _signed_angle(np.array((0.0, 1.0, 0.0)), -v_ot, np.array((0.0, 0.0, 1.0)))
+    return j0, np.broadcast_to(valid[:, None], j0.shape)
+
+def _wrist_direction(frame1_normal, target_normal, wrists_up):
+    """Private function that returns unit directions from wrist 3 to wrist 2, with a new last-but-one axis per wrist choice"""
+    direction = np.cross(frame1_normal, target_normal)
+    length = np.linalg.norm(direction, axis = -1)
+    tiny = length < 1e-9
+    direction = np.where(tiny[..., None], (0.0, 0.0, 1.0), direction / np.where(tiny, 1.0, length)[..., None])
+    up = np.where((direction[..., 2] < 0)[..., None], -direction, direction)
+    down = np.where((direction[..., 2] > 0)[..., None], -direction, direction)
+    return np.stack([up if wrist_up else down for wrist_up in wrists_up], axis = -2)
+
+def _elbow_positions(center1, radius1, center2, radius2, normal, elbows_up):
+    """Private function that returns circle circle intersection points, with a new last-but-one axis per elbow choice,
+    and a mask of reachable targets"""
+    v_c1c2 = center2 - center1
+    d = np.linalg.norm(v_c1c2, axis = -1)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        a = (radius1 ** 2 - radius2 ** 2 + d ** 2) / (2 * d)
+        h_squared = radius1 ** 2 - a ** 2
+        v_c1c2 = v_c1c2 * (a / d)[..., None]
+    reachable = h_squared >= 0
+    pt0 = center1 + v_c1c2
+    v_pt0ptx = _unitize(np.cross(normal, v_c1c2)) * np.sqrt(np.where(reachable, h_squared, 0))[..., None]
+    xpt1 = pt0 + v_pt0ptx
+    xpt2 = pt0 - v_pt0ptx
+    # the higher point is the elbow up solution, as in kinematics.inverse_kinematics
+    swap = (xpt1[..., 2] < xpt2[..., 2])[..., None]
+    upper = np.where(swap, xpt2, xpt1)
+    lower = np.where(swap, xpt1, xpt2)
+    return np.stack([upper if elbow_up else lower for elbow_up in elbows_up], axis = -2), reachable
+
+def _unitize(v):
+    """Private function that unitizes an array of vectors along the last axis"""
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return v / np.linalg.norm(v, axis = -1)[..., None]
+
+def _signed_angle(v1, v2, v_normal):
+    """Private function that returns the signed angles (-pi, pi] between arrays of vectors. See utils.signed_angle"""
+    n = np.cross(v1, v2)
+    c = np.sum(v1 * v2, axis = -1)
+    theta = np.arctan2(np.linalg.norm(n, axis = -1), c)
+    return np.where(np.sum(n * v_normal, axis = -1) < 0, -theta, theta)
@@ -2,39 +2,393 @@
 It contains functions for sending and listening to the robot
 """
 
+import errno
 import socket
-from struct import unpack
+import threading
+import time
+from collections import deque, namedtuple
+from struct import Struct, calcsize, unpack
 
 PORT_DASH = 29999
 PORT = 30002
 PORT_RT = 30003
+MAX_PACKET_SIZE = 65536
 
-def send_script(ur_program, robot_ip) :
+# Layout of a realtime interface packet: (name, byte offset, struct format of one value, number of values)
+RT_FIELDS = (("message_length", 0, "i", 1),
+             ("time", 4, "d", 1),
+             ("target_joints_pos", 12, "d", 6),
+             ("target_joints_vel", 60, "d", 6),
+             ("target_joints_accel", 108, "d", 6),
+             ("target_joints_current", 156, "d", 6),
+             ("target_joints_torque", 204, "d", 6),
+             ("actual_joints_pos", 252, "d", 6),
+             ("actual_joints_vel", 300, "d", 6),
+             ("actual_joints_current", 348, "d", 6),
+             ("xyz_accelerometer", 396, "d", 3),
+             ("tcp_force", 540, "d", 6),
+             ("tool_pose", 588, "d", 6),
+             ("tool_speed", 636, "d", 6),
+             ("joint_temperatures", 692, "d", 6))
+
+def robot_ip(robot_id):
+    """Returns the IP address of a robot in the cell network
+    Args:
+    robot_id: Robot ID: 1/2/3 (int)
+    Returns:
+    IP address of robot (string)
+    """
+    return '192.168.10.%d'%(10 * int(robot_id) + 3)
+
+def send_script(ur_program, robot_ip, port = PORT) :
     """Send a script to robot via a socket
     Args:
-    ur_program: Formatted UR Script program to send (string)
+    ur_program: Formatted UR Script program to send (string), or a program.Function
     robot_ip: IP address of robot (string)        
+    port: Optional. Port to send to (int)
     """
        
+    if hasattr(ur_program, 'chunks'):
+        # a program builder, accepted like ScriptSender.send does
+        ur_program = str(ur_program)
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.settimeout(2)
     try:
         # add an extra new line
         ur_program += '\n'
-        s.connect((robot_ip, PORT))
-        s.send(ur_program)
+        s.connect((robot_ip, port))
+        s.sendall(_encode(ur_program))
     except socket.timeout:
-        print "Time out connecting to {0} Port:{1}".format(robot_ip,PORT)
-    except socket.error, e:
-        print e  
+        print("Time out connecting to {0} Port:{1}".format(robot_ip,port))
+    except socket.error as e:
+        print(e)
     s.close()
 
+SendReport = namedtuple('SendReport', 'bytes_sent seconds connect_seconds reused')
+
+class ScriptSender(object):
+    """Sends scripts to the primary interface over a connection that is kept open between sends
+    Scripts are written in chunks with sendall semantics, so large programs are never truncated. Each chunk blocks
+    until the socket accepts it, which applies the controller's backpressure instead of buffering the whole program.
+
+    Usage:
+        sender = ScriptSender('192.168.10.13')
+        report = sender.send(program)
+        print(report.bytes_sent, report.seconds)
+
+    Args:
+    robot_ip: IP address of robot (string)
+    port: Optional. Port of the primary interface (int)
+    timeout: Optional. Socket timeout for connecting and for each chunk [s]
+    chunk_size: Optional. Bytes written per sendall call
+    """
+
+    def __init__(self, robot_ip, port = PORT, timeout = 2.0, chunk_size = 65536):
+        self.robot_ip = robot_ip
+        self.port = port
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self._socket = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, ur_program):
+        """Sends a script, reusing the open connection if there is one
+        A pooled connection that the robot closed or reset is replaced before anything is written to it. Any other
+        failure raises, so a program that may have been partly received is never sent twice.
+        Args:
+        ur_program: Formatted UR Script program to send (string), or a program.Function which is serialized
+                    while sending
+        Returns:
+        SendReport of bytes sent, total seconds, seconds spent connecting and whether the connection was reused
+        Raises:
+        socket.error on failure
+        """
+        start = time.time()
+        connect_seconds = 0.0
+        reused = self._socket is not None
+        bytes_sent = 0
+        try:
+            if self._socket is not None and not self._drain():
+                # closed by the robot since the last send, nothing of this program was written to it
+                self.close()
+                reused = False
+            if self._socket is None:
+                connect_start = time.time()
+                self._connect()
+                connect_seconds += time.time() - connect_start
+            for chunk in self._chunks(ur_program):
+                self._socket.sendall(chunk)
+                bytes_sent += len(chunk)
+        except socket.error:
+            self.close()
+            raise
+        return SendReport(bytes_sent, time.time() - start, connect_seconds, reused)
+
+    def close(self):
+        """Closes the pooled connection"""
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except socket.error:
+                pass
+            self._socket = None
+
+    def _chunks(self, ur_program):
+        """Private generator of the bytes to send, ending with an extra new line"""
+        if hasattr(ur_program, 'chunks'):
+            for chunk in ur_program.chunks(self.chunk_size):
+                yield _encode(chunk)
+            yield b'\n'
+        else:
+            data = _encode(ur_program + '\n')
+            for i in range(0, len(data), self.chunk_size):
+                yield data[i:i + self.chunk_size]
+
+    def _connect(self):
+        """Private method that opens the connection"""
+        self._socket = socket.create_connection((self.robot_ip, self.port), self.timeout)
+        self._socket.settimeout(self.timeout)
+
+    def _drain(self):
+        """Private method that discards state messages the robot pushed since the last send
+        Returns:
+        False if the robot closed or reset the connection, True if it is still open
+        Raises:
+        socket.error on any failure other than an empty receive buffer or a closed connection
+        """
+        s = self._socket
+        s.setblocking(0)
+        try:
+            while True:
+                if not s.recv(65536):
+                    return False
+        except socket.error as e:
+            code = getattr(e, 'errno', None)
+            # a controller reboot resets the connection rather than closing it
+            if code in _CLOSED:
+                return False
+            if code not in _WOULD_BLOCK:
+                raise
+            return True
+        finally:
+            s.settimeout(self.timeout)
+
+def _encode(text):
+    """Private function that returns text as bytes for sending"""
+    if isinstance(text, bytes):
+        return text
+    return text.encode('utf-8')
+
+_WOULD_BLOCK = (errno.EAGAIN, errno.EWOULDBLOCK, getattr(errno, 'WSAEWOULDBLOCK', errno.EWOULDBLOCK))
+# errno of ConnectionResetError and ConnectionAbortedError, also on Python 2 and IronPython which lack the classes
+_CLOSED = (errno.ECONNRESET, errno.ECONNABORTED, getattr(errno, 'WSAECONNRESET', errno.ECONNRESET),
+           getattr(errno, 'WSAECONNABORTED', errno.ECONNABORTED))
+
+class DashboardClient(object):
+    """Session with the dashboard server that keeps one connection open between commands
+    The welcome banner is read once when connecting. The server answers every command with one line in the order the
+    commands arrive, so several commands can be written in one packet and their replies matched by order, which costs
+    one round trip for the whole batch.
+
+    Usage:
+        dashboard = DashboardClient('192.168.10.13')
+        dashboard.command('pause')                      # 'Pausing program'
+        dashboard.pipeline(['stop', 'load /programs/cut.urp', 'play'])
+        dashboard.submit('programState')                # returns at once
+        dashboard.collect()                             # [('programState', 'PLAYING cut.urp')]
+
+    Args:
+    robot_ip: IP address of robot (string)
+    port: Optional. Port of the dashboard server (int)
+    timeout: Optional. Socket timeout for connecting and for each reply [s]
+    """
+
+    def __init__(self, robot_ip, port = PORT_DASH, timeout = 2.0):
+        self.robot_ip = robot_ip
+        self.port = port
+        self.timeout = timeout
+        self.banner = None
+        self._socket = None
+        self._buffer = b''
+        self._pending = deque()
+        # replies of submitted commands that a pipeline call read on the way to its own
+        self._collected = []
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def command(self, command):
+        """Sends a command and returns its reply (string)
+        Raises:
+        socket.error on failure
+        """
+        return self.pipeline([command])[0]
+
+    def pipeline(self, commands):
+        """Sends several commands in one write and returns their replies in the same order
+        A reused connection that turns out to be closed is replaced once. Only the commands whose replies were not read
+        yet are sent again, so a command the server already answered is never repeated.
+        Replies of commands submitted earlier are read first and kept for the next collect.
+        Args:
+        commands: Dashboard commands e.g. ['stop', 'load /programs/cut.urp', 'play'] (string collection)
+        Returns:
+        List of replies (string)
+        Raises:
+        socket.error on failure
+        """
+        commands = list(commands)
+        with self._lock:
+            if self._pending:
+                self._collected = self.collect()
+            retry = self._socket is not None
+            replies = []
+            while True:
+                try:
+                    self.submit(*commands[len(replies):])
+                    while self._pending:
+                        replies.append(self._read_line())
+                        self._pending.popleft()
+                    return replies
+                except socket.error:
+                    self.close()
+                    if not retry:
+                        raise
+                    retry = False
+
+    def submit(self, *commands):
+        """Writes commands without waiting for their replies. Read the replies later with collect
+        Raises:
+        socket.error on failure
+        """
+        with self._lock:
+            if self._socket is None:
+                self._connect()
+            self._socket.sendall(_encode(''.join(c.strip() + '\n' for c in commands)))
+            self._pending.extend(c.strip() for c in commands)
+
+    def collect(self):
+        """Waits for the replies of all submitted commands
+        Returns:
+        List of (command, reply) tuples in the order the commands were submitted
+        Raises:
+        socket.error on failure. The connection is closed and the unanswered commands are dropped
+        """
+        with self._lock:
+            replies, self._collected = self._collected, []
+            try:
+                while self._pending:
+                    reply = self._read_line()
+                    replies.append((self._pending.popleft(), reply))
+            except socket.error:
+                self.close()
+                raise
+            return replies
+
+    def close(self):
+        """Closes the connection. Replies that were not collected are dropped"""
+        with self._lock:
+            if self._socket is not None:
+                try:
+                    self._socket.close()
+                except socket.error:
+                    pass
+                self._socket = None
+            self._buffer = b''
+            self._pending.clear()
+
+    # ----- Dashboard commands -----
+
+    def play(self):
+        """Starts the loaded program"""
+        return self.command('play')
+
+    def pause(self):
+        """Pauses the running program"""
+        return self.command('pause')
+
+    def stop(self):
+        """Stops the running program"""
+        return self.command('stop')
+
+    def load(self, program_path):
+        """Loads a program file (.urp) stored on the robot"""
+        return self.command('load {0}'.format(program_path))
+
+    def robot_mode(self):
+        """Returns the robot mode reply, e.g. 'Robotmode: RUNNING'"""
+        return self.command('robotmode')
+
+    def program_state(self):
+        """Returns the program state reply, e.g. 'PLAYING cut.urp'"""
+        return self.command('programState')
+
+    def running(self):
+        """Returns True if a program is running"""
+        return self.command('running').strip().lower().endswith('true')
+
+    def close_popup(self):
+        """Closes the popup shown on the teach pendant"""
+        return self.command('close popup')
+
+    def _connect(self):
+        """Private method that opens the connection and reads the welcome banner"""
+        self._socket = socket.create_connection((self.robot_ip, self.port), self.timeout)
+        self._socket.settimeout(self.timeout)
+        # replies are single short lines, send commands at once instead of waiting to fill a segment
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buffer = b''
+        try:
+            self.banner = self._read_line()
+        except socket.error:
+            self.close()
+            raise
+
+    def _read_line(self):
+        """Private method that returns the next reply line without its line break
+        Raises:
+        socket.error if the robot closed the connection
+        """
+        while b'\n' not in self._buffer:
+            data = self._socket.recv(4096)
+            if not data:
+                raise socket.error("Connection closed by {0}".format(self.robot_ip))
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line.decode('utf-8').rstrip('\r')
+
+_dashboards = {}
+
+def dashboard(robot_ip):
+    """Returns the shared DashboardClient of a robot. Its connection is opened by the first command and kept open
+    Args:
+    robot_ip: IP address of robot (string)
+    """
+    client = _dashboards.get(robot_ip)
+    if client is None:
+        client = _dashboards.setdefault(robot_ip, DashboardClient(robot_ip))
+    return client
+
 def stop_program(robot_ip):
     """ Pauses a running program by sending a command to the Dashboard
     Args:
     robot_ip: IP address of robot (string) 
+    Returns:
+    Reply of the dashboard server (string), or None if the robot could not be reached. The error is printed
     """
-    send_script('pause', robot_ip,PORT_DASH)
+    try:
+        return dashboard(robot_ip).pause()
+    except socket.error as e:
+        print(e)
+        return None
 
 def listen(robot_ip):
     """Returns robot data received through a socket in dictionary format.
@@ -59,13 +413,47 @@ def _receive_data(robot_ip):
     try:
         s.connect((robot_ip, PORT_RT))
     except socket.timeout:
-        print "Time out connecting to {0} Port:{1}".format(robot_ip,PORT_RT)
-    except socket.error, e:
-        print e  
-    data = s.recv(1024)
+        print("Time out connecting to {0} Port:{1}".format(robot_ip,PORT_RT))
+    except socket.error as e:
+        print(e)
+    data = _recv_packet(s)
     s.close()
     return data
 
+def _recv_exactly(s, size, data = b''):
+    """Receives from a socket until data is size bytes long
+    Args:
+    s: Connected socket
+    size: Number of bytes to return (int)
+    data: Optional. Bytes already received
+    Returns:
+    data: Received bytes (byte[])
+    Raises:
+    socket.error if the connection closes first
+    """
+    chunks = [data]
+    received = len(data)
+    while received < size:
+        chunk = s.recv(size - received)
+        if not chunk:
+            raise socket.error("Connection closed after {0} of {1} bytes".format(received, size))
+        chunks.append(chunk)
+        received += len(chunk)
+    return b''.join(chunks)
+
+def _recv_packet(s):
+    """Receives one complete packet from a UR interface. Packets start with their total length as a 4 byte integer
+    Args:
+    s: Connected socket
+    Returns:
+    data: Packet including the length header (byte[])
+    """
+    header = _recv_exactly(s, 4)
+    message_length = unpack("!i", header)[0]
+    if message_length < 4 or message_length > MAX_PACKET_SIZE:
+        raise socket.error("Invalid packet length {0}".format(message_length))
+    return _recv_exactly(s, message_length, header)
+
 def _format_data(data):
     """Formats robot data into dictionary   
     Received byte array is formatted as a dictionary. For added into on data: see 
@@ -74,29 +462,30 @@ def _format_data(data):
     Returns:
     dict_data: A dictionary containing data in readable format
     """ 
-    dict_data = {}
-
-    fmt_int = "!i"
-    #fmt_uInt = "!Q"
-    fmt_double1 = "!d"
-    fmt_double3 = "!ddd"
-    fmt_double6 = "!dddddd"
-    
-    dict_data["message_length"] = unpack(fmt_int, data[0:4])
-    dict_data["time"] = unpack(fmt_double1, data[4:12])
-    dict_data["target_joints_pos"] = unpack(fmt_double6, data[12:60])
-    dict_data["target_joints_vel"] = unpack(fmt_double6, data[60:108])
-    dict_data["target_joints_accel"] = unpack(fmt_double6, data[108:156])
-    dict_data["target_joints_current"] = unpack(fmt_double6, data[156:204])
-    dict_data["target_joints_torque"] = unpack(fmt_double6, data[204:252])
-    dict_data["actual_joints_pos"] = unpack(fmt_double6, data[252:300])
-    dict_data["actual_joints_vel"] = unpack(fmt_double6, data[300:348])
-    dict_data["actual_joints_current"] = unpack(fmt_double6, data[348:396])
-    dict_data["xyz_accelerometer"] = unpack(fmt_double3, data[396:420])
-    dict_data["tcp_force"] = unpack(fmt_double6, data[540:588])
-    dict_data["tool_pose"] = unpack(fmt_double6, data[588:636])
-    dict_data["tool_speed"] = unpack(fmt_double6, data[636:684])
-    #dict_data["digital_input"] = unpack(fmt_double6, data[636:684])
-    dict_data["joint_temperatures"] = unpack(fmt_double6, data[692:740])
-
-    return dict_data
\ No newline at end of file
+    values = _RT_STRUCT.unpack_from(data)
+    return dict((name, values[start:end]) for name, start, end in _RT_SLICES)
+
+def _compile_layout(fields):
+    """Compiles a packet layout into one struct and the slice of unpacked values that belongs to each field
+    Args:
+    fields: Sequence of (name, byte offset, struct format of one value, number of values) sorted by offset
+    Returns:
+    packet_struct: Struct that unpacks all fields in one call
+    slices: Tuple of (name, start, end) indices into the unpacked values
+    """
+    fmt = "!"
+    position = 0
+    index = 0
+    slices = []
+    for name, offset, value_fmt, count in fields:
+        if offset > position:
+            fmt += "{0}x".format(offset - position)
+        fmt += "{0}{1}".format(count, value_fmt)
+        position = offset + count * calcsize("!" + value_fmt)
+        slices.append((name, index, index + count))
+        index += count
+    return Struct(fmt), tuple(slices)
+
+_RT_STRUCT, _RT_SLICES = _compile_layout(RT_FIELDS)
+# Smallest realtime packet that contains every field of RT_FIELDS
+RT_MIN_PACKET_SIZE = _RT_STRUCT.size
@@ -0,0 +1,189 @@
+""" controller.py module talks to several robots concurrently with asyncio. Requires Python 3.6 or later.
+Every robot has its own connections and timeouts, so an unreachable robot does not stall the others.
+
+Usage:
+    cell = CellController.from_ids((1, 2, 3))
+    results = await cell.send_script(program)         # {name: bytes sent or exception}
+    async for name, state in cell.states():
+        print(name, state['tool_pose'])
+"""
+
+import asyncio
+from struct import unpack
+
+import comm
+
+class AsyncRobot(object):
+    """Asynchronous connection manager for one robot
+
+    Args:
+    robot_ip: IP address of robot (string)
+    name: Optional. Name used in cell results. Defaults to the IP address
+    timeout: Optional. Timeout for connecting, sending and dashboard replies [s]
+    ports: Optional. Ports of the primary, realtime and dashboard interfaces (tuple of 3 int)
+    decoder: Optional. Function that formats a raw realtime packet. Defaults to the dictionary format of comm.listen
+    on_error: Optional. Function called with the error when the realtime connection is lost, before reconnecting
+    """
+
+    def __init__(self, robot_ip, name = None, timeout = 2.0, ports = (comm.PORT, comm.PORT_RT, comm.PORT_DASH),
+                 decoder = comm._format_data, on_error = None):
+        self.robot_ip = robot_ip
+        self.name = name or robot_ip
+        self.timeout = timeout
+        self.port, self.port_rt, self.port_dash = ports
+        self.decoder = decoder
+        self.on_error = on_error
+        self._dashboard = None
+        # created by the first dashboard command, so the robot can be built outside the event loop that uses it
+        self._dashboard_lock = None
+
+    async def send_script(self, ur_program):
+        """Sends a script to the primary interface
+        Args:
+        ur_program: Formatted UR Script program to send (string)
+        Returns:
+        Number of bytes sent
+        """
+        data = (ur_program + '\n').encode('ascii')
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.robot_ip, self.port), self.timeout)
+        try:
+            writer.write(data)
+            await asyncio.wait_for(writer.drain(), self.timeout)
+        finally:
+            writer.close()
+        return len(data)
+
+    async def states(self, reconnect_delay = 0.5):
+        """Asynchronous generator of decoded robot states from the realtime interface at the controller rate
+        The connection is reopened after reconnect_delay when it is lost. Set reconnect_delay to None to raise instead
+        """
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(self.robot_ip, self.port_rt), self.timeout)
+                while True:
+                    header = await asyncio.wait_for(reader.readexactly(4), self.timeout)
+                    message_length = unpack("!i", header)[0]
+                    if message_length < 4 or message_length > comm.MAX_PACKET_SIZE:
+                        raise ConnectionError("Invalid packet length {0}".format(message_length))
+                    body = await asyncio.wait_for(reader.readexactly(message_length - 4), self.timeout)
+                    yield self.decoder(header + body)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                if reconnect_delay is None:
+                    raise
+                if self.on_error is not None:
+                    self.on_error(e)
+            finally:
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(reconnect_delay)
+
+    async def dashboard(self, command):
+        """Sends a command to the dashboard server and returns its reply. The connection is kept open between commands
+        Args:
+        command: Dashboard command e.g. 'pause', 'play', 'stop' (string)
+        Returns:
+        Reply line without the line ending (string)
+        """
+        if self._dashboard_lock is None:
+            self._dashboard_lock = asyncio.Lock()
+        async with self._dashboard_lock:
+            try:
+                if self._dashboard is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.robot_ip, self.port_dash), self.timeout)
+                    # welcome message
+                    await asyncio.wait_for(reader.readline(), self.timeout)
+                    self._dashboard = reader, writer
+                reader, writer = self._dashboard
+                writer.write((command + '\n').encode('ascii'))
+                reply = await asyncio.wait_for(reader.readline(), self.timeout)
+                if not reply:
+                    raise ConnectionError("Dashboard connection closed by {0}".format(self.robot_ip))
+            except Exception:
+                self._close_dashboard()
+                raise
+            return reply.decode('ascii').strip()
+
+    async def close(self):
+        """Closes open connections"""
+        self._close_dashboard()
+
+    def _close_dashboard(self):
+        """Private method that closes the dashboard connection"""
+        if self._dashboard is not None:
+            self._dashboard[1].close()
+            self._dashboard = None
+
+class CellController(object):
+    """Runs commands on several robots concurrently
+
+    Args:
+    robots: A list of AsyncRobot objects, or a dictionary of {name: robot_ip}
+    """
+
+    def __init__(self, robots):
+        if hasattr(robots, 'items'):
+            robots = [AsyncRobot(ip, name) for name, ip in sorted(robots.items())]
+        self.robots = dict((robot.name, robot) for robot in robots)
+
+    @classmethod
+    def from_ids(cls, robot_ids, **kwargs):
+        """Returns a controller for robots addressed by their id in the cell network (see comm.robot_ip)"""
+        return cls([AsyncRobot(comm.robot_ip(i), name = i, **kwargs) for i in robot_ids])
+
+    async def send_script(self, ur_program):
+        """Sends scripts to all robots at once
+        Args:
+        ur_program: One program for every robot (string) or a dictionary of {name: program}
+        Returns:
+        Dictionary of {name: bytes sent or the exception raised}
+        """
+        if hasattr(ur_program, 'items'):
+            jobs = dict((name, self.robots[name].send_script(program)) for name, program in ur_program.items())
+        else:
+            jobs = dict((name, robot.send_script(ur_program)) for name, robot in self.robots.items())
+        return await self._gather(jobs)
+
+    async def dashboard(self, command, names = None):
+        """Sends a dashboard command to all robots (or the named robots) at once
+        Returns:
+        Dictionary of {name: reply or the exception raised}
+        """
+        names = self.robots.keys() if names is None else names
+        return await self._gather(dict((name, self.robots[name].dashboard(command)) for name in names))
+
+    async def states(self, max_queue = 1000):
+        """Asynchronous generator of (name, state) tuples merged from the realtime streams of all robots
+        An exception in the stream of one robot, e.g. from its decoder, is raised here and ends the generator
+        """
+        queue = asyncio.Queue(max_queue)
+
+        async def pump(name, robot):
+            try:
+                async for state in robot.states():
+                    await queue.put((name, state, None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await queue.put((name, None, e))
+
+        tasks = [asyncio.ensure_future(pump(name, robot)) for name, robot in self.robots.items()]
+        try:
+            while True:
+                name, state, error = await queue.get()
+                if error is not None:
+                    raise error
+                yield name, state
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def close(self):
+        await asyncio.gather(*[robot.close() for robot in self.robots.values()])
+
+    async def _gather(self, jobs):
+        """Private method that awaits named coroutines concurrently and collects results or exceptions by name"""
+        names = list(jobs)
+        results = await asyncio.gather(*[jobs[name] for name in names], return_exceptions = True)
+        return dict(zip(names, results))
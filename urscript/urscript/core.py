@@ -0,0 +1,362 @@
+"""
+This module contains backend-neutral math for frames, transforms and kinematics. It does not depend on Rhino.
+    1) Vectors are (x,y,z) tuples
+    2) Frames and transforms are 4x4 row-major matrices (tuples of rows). The columns of a frame are its
+       X axis, Y axis, Z axis (normal) and origin
+NumPy arrays of the same shape are accepted wherever tuples are. Rhino objects are only accepted through the adapter
+functions at the end of this module.
+"""
+
+import math
+
+# ----- Vector functions -----
+
+def add(v1, v2):
+    """Returns the sum of two vectors"""
+    return (v1[0] + v2[0], v1[1] + v2[1], v1[2] + v2[2])
+
+def subtract(v1, v2):
+    """Returns the difference v1 - v2 of two vectors"""
+    return (v1[0] - v2[0], v1[1] - v2[1], v1[2] - v2[2])
+
+def scale(v, factor):
+    """Returns a vector multiplied by a scalar"""
+    return (v[0] * factor, v[1] * factor, v[2] * factor)
+
+def dot(v1, v2):
+    """Returns the dot product of two vectors"""
+    return v1[0] * v2[0] + v1[1] * v2[1] + v1[2] * v2[2]
+
+def cross(v1, v2):
+    """Returns the cross product of two vectors"""
+    return (v1[1] * v2[2] - v1[2] * v2[1],
+            v1[2] * v2[0] - v1[0] * v2[2],
+            v1[0] * v2[1] - v1[1] * v2[0])
+
+def length(v):
+    """Returns the length of a vector"""
+    return math.sqrt(dot(v, v))
+
+def unitize(v):
+    """Returns a vector of unit length. A zero vector is returned unchanged"""
+    l = length(v)
+    if l == 0:
+        return tuple(v)
+    return scale(v, 1.0 / l)
+
+# ----- Frame and transform functions -----
+
+IDENTITY = ((1.0, 0.0, 0.0, 0.0),
+            (0.0, 1.0, 0.0, 0.0),
+            (0.0, 0.0, 1.0, 0.0),
+            (0.0, 0.0, 0.0, 1.0))
+
+def frame(origin, xaxis, yaxis):
+    """
+    Returns a frame from an origin and two axes. The axes are unitized and the Z axis is their cross product
+
+    Args:
+        origin: Vector (x,y,z)
+        xaxis: X axis of frame
+        yaxis: Y axis of frame
+
+    Returns:
+        m: 4x4 frame matrix
+    """
+    x = unitize(xaxis)
+    y = unitize(yaxis)
+    z = cross(x, y)
+    return ((x[0], y[0], z[0], origin[0]),
+            (x[1], y[1], z[1], origin[1]),
+            (x[2], y[2], z[2], origin[2]),
+            (0.0, 0.0, 0.0, 1.0))
+
+def column(m, j):
+    """Returns the first three values of column j of a 4x4 matrix. Columns 0-3 of a frame are X, Y, Z and origin"""
+    return (m[0][j], m[1][j], m[2][j])
+
+def multiply(m1, m2):
+    """Returns the matrix product m1 * m2 of two 4x4 matrices"""
+    return tuple(tuple(m1[i][0] * m2[0][j] + m1[i][1] * m2[1][j] + m1[i][2] * m2[2][j] + m1[i][3] * m2[3][j]
+                       for j in range(4)) for i in range(4))
+
+def multiply_frames(m1, m2):
+    """Returns the product m1 * m2 of two frames or transforms whose last row is (0,0,0,1)
+    Same result as multiply for such matrices, unrolled because kinematic chains spend most of their time here.
+    """
+    (a00, a01, a02, a03), (a10, a11, a12, a13), (a20, a21, a22, a23) = m1[0], m1[1], m1[2]
+    (b00, b01, b02, b03), (b10, b11, b12, b13), (b20, b21, b22, b23) = m2[0], m2[1], m2[2]
+    return ((a00 * b00 + a01 * b10 + a02 * b20, a00 * b01 + a01 * b11 + a02 * b21,
+             a00 * b02 + a01 * b12 + a02 * b22, a00 * b03 + a01 * b13 + a02 * b23 + a03),
+            (a10 * b00 + a11 * b10 + a12 * b20, a10 * b01 + a11 * b11 + a12 * b21,
+             a10 * b02 + a11 * b12 + a12 * b22, a10 * b03 + a11 * b13 + a12 * b23 + a13),
+            (a20 * b00 + a21 * b10 + a22 * b20, a20 * b01 + a21 * b11 + a22 * b21,
+             a20 * b02 + a21 * b12 + a22 * b22, a20 * b03 + a21 * b13 + a22 * b23 + a23),
+            (0.0, 0.0, 0.0, 1.0))
+
+def invert_frame(m):
+    """Returns the inverse of a frame or rigid transform: the transposed rotation and the rotated, negated origin"""
+    (r00, r01, r02, x), (r10, r11, r12, y), (r20, r21, r22, z) = m[0], m[1], m[2]
+    return ((r00, r10, r20, -(r00 * x + r10 * y + r20 * z)),
+            (r01, r11, r21, -(r01 * x + r11 * y + r21 * z)),
+            (r02, r12, r22, -(r02 * x + r12 * y + r22 * z)),
+            (0.0, 0.0, 0.0, 1.0))
+
+def translate(m, v):
+    """Returns a frame moved by vector v"""
+    return ((m[0][0], m[0][1], m[0][2], m[0][3] + v[0]),
+            (m[1][0], m[1][1], m[1][2], m[1][3] + v[1]),
+            (m[2][0], m[2][1], m[2][2], m[2][3] + v[2]),
+            tuple(m[3]))
+
+def frame_from_pose(pose):
+    """
+    Returns the frame of a UR pose (x,y,z,ax,ay,az) whose orientation is a rotation vector
+
+    Args:
+        pose: Six values, position [m] followed by the rotation vector (axis * angle [rad])
+
+    Returns:
+        m: 4x4 frame matrix
+    """
+    x, y, z, ax, ay, az = pose
+    angle = math.sqrt(ax * ax + ay * ay + az * az)
+    if angle < 1e-12:
+        return translate(IDENTITY, (x, y, z))
+    kx, ky, kz = ax / angle, ay / angle, az / angle
+    c = math.cos(angle)
+    s = math.sin(angle)
+    t = 1.0 - c
+    return ((t * kx * kx + c, t * kx * ky - s * kz, t * kx * kz + s * ky, x),
+            (t * kx * ky + s * kz, t * ky * ky + c, t * ky * kz - s * kx, y),
+            (t * kx * kz - s * ky, t * ky * kz + s * kx, t * kz * kz + c, z),
+            (0.0, 0.0, 0.0, 1.0))
+
+def dh_matrix(d, theta, r, alpha):
+    """Returns Denavit Hartenberg transformation matrix
+
+    Arguments:
+        d - Joint distance. in mm
+        theta- joint angle. in radians
+        r- link length. in mm
+        alpha- twist angle around common normal. in radians
+
+    Returns:
+        m: Denavit Hartenberg transformation matrix (4x4 tuple)
+    """
+    ct = math.cos(theta)
+    st = math.sin(theta)
+    ca = math.cos(alpha)
+    sa = math.sin(alpha)
+    return ((ct, -st * ca, st * sa, r * ct),
+            (st, ct * ca, -ct * sa, r * st),
+            (0.0, sa, ca, d),
+            (0.0, 0.0, 0.0, 1.0))
+
+# ----- Geometry functions -----
+
+def signed_angle(v1, v2, v_normal):
+    """
+    This function gets the angle between 2 vectors -pi < theta< pi
+
+    Arguments:
+        v1: First unitized vector
+        v2: Second unitized vector
+        v_normal: Normal to 2 vectors that determines what is positive/negative
+
+    Returns:
+        theta: float. signed angle between -pi and pi
+    """
+    n = cross(v1, v2)
+    theta = math.atan2(length(n), dot(v1, v2))
+    if dot(n, v_normal) < 0:
+        theta *= -1
+    return theta
+
+def cir_cir_intersection(cir1, cir2):
+    """
+    Funtion that returns the intersection points between two coplanar circles
+
+    Arguments:
+        1) cir1: First circle as a tuple of (center, normal, radius)
+        2) cir2: Second circle as a tuple of (center, normal, radius)
+
+    Returns:
+        xpts: list of 2 points or None if the circles do not intersect
+    """
+    center1, normal, r1 = cir1
+    center2, r2 = cir2[0], cir2[2]
+    v_c1c2 = subtract(center2, center1)
+    d = length(v_c1c2)
+    if d == 0:
+        return None
+    a = (r1 ** 2 - r2 ** 2 + d ** 2) / (2 * d)
+    h_squared = r1 ** 2 - a ** 2
+    if h_squared < 0:
+        return None
+    v_c1c2 = scale(v_c1c2, a / d)
+    pt0 = add(center1, v_c1c2)
+    v_pt0ptx = scale(unitize(cross(normal, v_c1c2)), math.sqrt(h_squared))
+    return [add(pt0, v_pt0ptx), subtract(pt0, v_pt0ptx)]
+
+# ----- Kinematics functions -----
+
+def forward_kinematics(base, dh_parameters):
+    """
+    Function that returns all the frames in a serial kinematic chain given DH_parameters
+
+    Args:
+        base: Frame 0 (4x4 matrix). None for the base of a robot.RobotModel, which is the world XY frame for a table
+        dh_parameters: Tuple of (joint_distance, joint_angle, link_length, link_twist). This is the Denavit Hartenberg parameter table.
+                       A robot.RobotModel or a registered model name is also accepted
+
+    Returns:
+        frames: A list of frames (4x4 matrices)
+    """
+    if _is_model(dh_parameters):
+        model = _model(dh_parameters)
+        frames_fk = model.forward_kinematics([0.0] * len(model))[1:]
+        if base is None:
+            return frames_fk
+        # the given base takes the place of the model's own, which the frames already include
+        relative = multiply_frames(base, invert_frame(model.base))
+        return [multiply_frames(relative, frame) for frame in frames_fk]
+    # a plain table usually carries the joint values in its angles and is used once, a model would not pay off
+    _m = IDENTITY if base is None else base
+    frames_fk = []
+    for dh in dh_parameters:
+        _m = multiply_frames(_m, dh_matrix(dh[0], dh[1], dh[2], dh[3]))
+        frames_fk.append(_m)
+    return frames_fk
+
+def inverse_kinematics(target, dh_table, right_hand = False, elbow_up = False, wrist_up = False):
+    """
+    Function that returns joint angles for a UR robot given a target frame
+
+    Args:
+        target: Target frame (4x4 matrix) in the coordinates of forward_kinematics without a base: robot base
+                coordinates, or the coordinates the base of a located robot.RobotModel is given in
+        dh_table: Tuple of (joint_distance, joint_angle, link_length, link_twist). This is the Denavit Hartenberg parameter table.
+                  A robot.RobotModel or a registered model name is also accepted and reuses its precomputed link terms
+        right_hand: True to return right hand solution. Optional
+        elbow_up: True to return elbow_up solution. Optional
+        wrist_up: True to return wrist up solution. Optional
+
+    Returns:
+        joints: A tuple of 6 joint angles
+
+    Raises:
+        ValueError if the target can not be reached or the solution is outside the joint limits of the model
+    """
+    model = _model(dh_table, 6)
+    link = model.link_transform
+    dh_table = model.dh_table
+    if model.base != IDENTITY:
+        target = multiply_frames(invert_frame(model.base), target)
+    target_y = column(target, 1)
+    target_z = column(target, 2)
+
+    # 1 - Find base
+    frame5_origin = subtract(column(target, 3), scale(target_z, dh_table[5][0]))
+    r = dh_table[3][0]
+    d = math.hypot(frame5_origin[0], frame5_origin[1])
+    if d == 0 or d < model.min_reach:
+        raise ValueError("Target plane is too close to robot base (< {0}m)".format(model.min_reach))
+    angle_top = math.acos(r / d)
+    if right_hand:
+        angle_top = -angle_top
+    x = frame5_origin[0] * r / d
+    y = frame5_origin[1] * r / d
+    v_ot = (math.cos(angle_top) * x - math.sin(angle_top) * y, math.sin(angle_top) * x + math.cos(angle_top) * y, 0.0)
+    j0 = signed_angle((0.0, 1.0, 0.0), scale(v_ot, -1), (0.0, 0.0, 1.0))
+
+    # 2 - Find shoulder (frame 1)
+    m01 = link(0, j0)
+    frame1_origin = column(m01, 3)
+    frame1_normal = column(m01, 2)
+
+    # 3 - Find wrist 2 (frame 4) along the intersection of frame 1 and the target plane
+    v_frame4z = cross(frame1_normal, target_z)
+    if length(v_frame4z) < 1e-9:
+        v_frame4z = (0.0, 0.0, 1.0)
+    v_frame4z = unitize(v_frame4z)
+    if (wrist_up and v_frame4z[2] < 0) or (not wrist_up and v_frame4z[2] > 0):
+        v_frame4z = scale(v_frame4z, -1)
+    v_frame4z = scale(v_frame4z, dh_table[4][0])
+    frame4_origin = subtract(add(frame5_origin, v_frame4z), scale(frame1_normal, dh_table[3][0]))
+
+    # 4 - Circle circle intersection
+    if length(subtract(frame4_origin, frame1_origin)) > model.max_reach:
+        raise ValueError("Target is out of reach (> {0}m from the shoulder)".format(model.max_reach))
+    x_pts = cir_cir_intersection((frame1_origin, frame1_normal, dh_table[1][2]),
+                                 (frame4_origin, frame1_normal, dh_table[2][2]))
+    if x_pts is None:
+        raise ValueError("Circle circle intersection failed")
+    if x_pts[0][2] < x_pts[1][2]:
+        x_pts.reverse()
+    frame2_origin = x_pts[0] if elbow_up else x_pts[1]
+
+    # 5 - Find j1 and elbow (frame 2)
+    v_f1f2 = unitize(subtract(frame2_origin, frame1_origin))
+    j1 = signed_angle(scale(column(m01, 0), -1), v_f1f2, frame1_normal)
+    m02 = multiply_frames(m01, link(1, j1))
+
+    # 6 - Find j2 and wrist 1 (frame 3)
+    v_f2f4 = unitize(subtract(frame4_origin, column(m02, 3)))
+    j2 = signed_angle(scale(column(m02, 0), -1), v_f2f4, column(m02, 2))
+    m03 = multiply_frames(m02, link(2, j2))
+
+    # 7 - Find j3 and wrist 2 (frame 4)
+    j3 = signed_angle(scale(column(m03, 1), -1), scale(v_frame4z, -1), column(m03, 2))
+    m04 = multiply_frames(m03, link(3, j3))
+
+    # 8 - Find j4 and wrist 3 (frame 5)
+    j4 = signed_angle(column(m04, 1), target_z, column(m04, 2))
+    m05 = multiply_frames(m04, link(4, j4))
+
+    # 9 - Find j5
+    j5 = signed_angle(column(m05, 1), target_y, column(m05, 2))
+
+    joints = (j0, j1, j2, j3, j4, j5)
+    if not model.within_limits(joints):
+        raise ValueError("The solution is outside the joint limits of the robot")
+    return joints
+
+def _model(dh_table, links = None):
+    """Private function that returns the robot.RobotModel of a DH table, model or model name. See robot.model"""
+    # robot.py builds on this module, so it is imported when first needed
+    import robot
+    return robot.model(dh_table, links)
+
+def _is_model(dh_table):
+    """Private function that tells a model or model name from a plain DH table. See robot.is_model"""
+    import robot
+    return robot.is_model(dh_table)
+
+# ----- Adapters for objects with Rhino style attributes -----
+
+def vector(v):
+    """Returns an (x,y,z) tuple from a vector or point with X, Y, Z attributes (e.g. Rhino Vector3d) or a sequence"""
+    if hasattr(v, 'X'):
+        return (v.X, v.Y, v.Z)
+    return (v[0], v[1], v[2])
+
+def frame_from_plane(plane):
+    """
+    Returns a frame matrix from a plane
+
+    Args:
+        plane: Plane object that has attributes "Origin", "XAxis", "YAxis" (e.g. Rhino Plane) or a 4x4 frame matrix
+
+    Returns:
+        m: 4x4 frame matrix
+
+    Raises:
+        Attribute error if argument is neither a plane nor a 4x4 matrix
+    """
+    if hasattr(plane, 'Origin'):
+        return frame(vector(plane.Origin), vector(plane.XAxis), vector(plane.YAxis))
+    try:
+        return tuple((row[0], row[1], row[2], row[3]) for row in plane)
+    except (TypeError, IndexError):
+        raise AttributeError("Expected a plane or a 4x4 frame matrix, got {0}".format(type(plane).__name__))
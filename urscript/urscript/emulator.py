@@ -0,0 +1,356 @@
+""" emulator.py module runs a local stand-in for a UR controller, for testing comm features without a robot.
+It serves the three interfaces used by this package on background threads:
+    1) Primary interface: accepts and records scripts, runs each for program_time and pushes robot state messages
+       (see secondary.py) at primary_rate
+    2) Realtime interface: streams synthetic or replayed packets at a configurable rate and size
+    3) Dashboard server: sends the welcome banner and answers commands line by line
+Latency, dropped packets, closed connections and faulted programs can be injected to reproduce timeouts, reconnects
+and runtime exceptions.
+
+Usage:
+    with Emulator(latency = 0.005, drop_rate = 0.01) as robot:
+        sender = comm.ScriptSender(robot.host, robot.ports[0])
+        sender.send(program)
+        robot.wait_for_scripts(1)
+        print(robot.scripts[-1])
+        client = realtime.RealtimeClient(robot.host, robot.ports[1])
+"""
+
+import math
+import random
+import socket
+import struct
+import threading
+import time
+
+import comm
+import secondary
+
+WELCOME = "Connected: Universal Robots Dashboard Server"
+
+# Dashboard replies by command. Commands with arguments are matched by their first word
+DASHBOARD_REPLIES = {"play": "Starting program",
+                     "pause": "Pausing program",
+                     "stop": "Stopped",
+                     "robotmode": "Robotmode: RUNNING",
+                     "programstate": "STOPPED <unnamed>",
+                     "running": "Program running: false",
+                     "load": "Loading program: {0}",
+                     "popup": "showing popup",
+                     "close": "closing popup",
+                     "closepopup": "closing popup",
+                     "power": "Powering on",
+                     "brake": "Brake releasing",
+                     "quit": "Disconnected"}
+
+# Robot mode data package after its header: secondary.ROBOT_MODE, then control mode and three speed fractions
+_ROBOT_MODE_TAIL = struct.Struct("!Bddd")
+_ROBOT_MODE_LENGTH = secondary.MESSAGE_HEADER.size + secondary.ROBOT_MODE.size + _ROBOT_MODE_TAIL.size
+
+class Emulator(object):
+    """Local stand-in for a UR controller
+
+    Args:
+    host: Optional. Address to listen on (string)
+    ports: Optional. Ports of the primary, realtime and dashboard interfaces. 0 picks a free port (tuple of 3 int)
+    rate: Optional. Realtime packets per second
+    packet_size: Optional. Size of synthetic realtime packets, at least comm.RT_MIN_PACKET_SIZE [bytes]
+    replay: Optional. Sequence of raw realtime packets to stream in a loop instead of synthetic ones
+    latency: Optional. One way delay of every message [s]. Each realtime packet and robot state message leaves this
+             long after it is due, each dashboard reply this long after its command, and each received script chunk
+             is recorded this long after it arrives. Realtime packets keep their rate, the other messages wait in turn
+    drop_rate: Optional. Probability that a realtime packet is skipped
+    disconnect_after: Optional. Number of realtime packets after which the realtime connection is closed
+    primary_rate: Optional. Robot state messages per second pushed on the primary interface. 0 for none
+    program_time: Optional. Time every received script runs before it is reported finished [s]
+    fault_rate: Optional. Probability that a script ends with a runtime exception instead of finishing
+    seed: Optional. Seed of the random drops and faults, for reproducible runs
+    fragment_size: Optional. Realtime packets are written in pieces of at most this many bytes, so they arrive split
+                   across TCP segments
+    dashboard_disconnect_after: Optional. Number of replies after which a dashboard connection is closed without
+                                answering the commands that are still waiting
+    """
+
+    def __init__(self, host = '127.0.0.1', ports = (comm.PORT, comm.PORT_RT, comm.PORT_DASH), rate = 125.0,
+                 packet_size = 1060, replay = None, latency = 0.0, drop_rate = 0.0, disconnect_after = None,
+                 primary_rate = 10.0, program_time = 0.0, fault_rate = 0.0, seed = None, fragment_size = None,
+                 dashboard_disconnect_after = None):
+        if replay is None and packet_size < comm.RT_MIN_PACKET_SIZE:
+            raise ValueError("Packet size must be at least {0} bytes".format(comm.RT_MIN_PACKET_SIZE))
+        self.host = host
+        self.ports = tuple(ports)
+        self.rate = rate
+        self.packet_size = packet_size
+        self.replay = None if replay is None else [bytes(data) for data in replay]
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.disconnect_after = disconnect_after
+        self.primary_rate = primary_rate
+        self.program_time = program_time
+        self.fault_rate = fault_rate
+        self.fragment_size = fragment_size
+        self.dashboard_disconnect_after = dashboard_disconnect_after
+        self.scripts = []
+        self.dashboard_commands = []
+        self.bytes_received = 0
+        self.packets_sent = 0
+        self.packets_dropped = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Condition()
+        self._stopped = threading.Event()
+        self._servers = []
+        self._connections = set()
+        self._threads = []
+        # end time of the running program and whether it ends with a fault
+        self._program = None
+        self._robot_messages = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Opens the listening sockets and starts serving. ports holds the bound ports afterwards"""
+        self._stopped.clear()
+        ports = []
+        for port, handler in zip(self.ports, (self._serve_primary, self._serve_realtime, self._serve_dashboard)):
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((self.host, port))
+            server.listen(5)
+            server.settimeout(0.1)
+            self._servers.append(server)
+            ports.append(server.getsockname()[1])
+            self._spawn(self._accept, server, handler)
+        self.ports = tuple(ports)
+
+    def stop(self):
+        """Closes all sockets and stops serving"""
+        self._stopped.set()
+        for s in self._servers + list(self._connections):
+            try:
+                s.close()
+            except socket.error:
+                pass
+        for thread in self._threads:
+            thread.join(1.0)
+        self._servers = []
+        self._connections.clear()
+        self._threads = []
+
+    def disconnect(self, reset = False):
+        """Drops the open client connections while the servers keep listening, like a controller reboot
+        Args:
+        reset: Optional. True to reset the connections instead of closing them cleanly
+        """
+        for conn in list(self._connections):
+            try:
+                if reset:
+                    # no linger time makes close send a reset
+                    conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                else:
+                    conn.shutdown(socket.SHUT_RDWR)
+                conn.close()
+            except socket.error:
+                pass
+
+    def wait_for_scripts(self, count, timeout = 2.0):
+        """Waits until count scripts have been received. Returns True if they arrived in time"""
+        deadline = time.time() + timeout
+        with self._lock:
+            while len(self.scripts) < count:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def packet(self, index):
+        """Returns realtime packet number index, replayed or synthetic (byte[])"""
+        if self.replay is not None:
+            return self.replay[index % len(self.replay)]
+        return _synthetic_packet(self.packet_size, index / float(self.rate))
+
+    # ----- Connection handlers -----
+
+    def _spawn(self, target, *args):
+        """Private method that runs target on a daemon thread"""
+        thread = threading.Thread(target = target, args = args)
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def _accept(self, server, handler):
+        """Private method that accepts connections until stopped and serves each one on its own thread"""
+        while not self._stopped.is_set():
+            try:
+                conn, address = server.accept()
+            except socket.timeout:
+                continue
+            except socket.error:
+                return
+            conn.settimeout(None)
+            # replies and packets go out when written, like the controller
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._connections.add(conn)
+            self._spawn(self._serve, conn, handler)
+
+    def _serve(self, conn, handler):
+        """Private method that runs a handler and closes the connection when it returns or fails"""
+        try:
+            handler(conn)
+        except socket.error:
+            pass
+        finally:
+            self._connections.discard(conn)
+            try:
+                conn.close()
+            except socket.error:
+                pass
+
+    def _serve_primary(self, conn):
+        """Private method that records scripts and pushes robot state messages
+        Like the controller, a script starting with "def" or "sec" runs up to the unindented "end" line, and any other
+        line is a script of its own.
+        """
+        conn.settimeout(1.0 / self.primary_rate if self.primary_rate else 0.1)
+        pending = b''
+        program = []
+        next_state = time.time()
+        sent_messages = len(self._robot_messages)
+        while not self._stopped.is_set():
+            if self.primary_rate and time.time() >= next_state:
+                state = self._robot_state()
+                # like on the controller, a runtime exception is reported before the state without the program
+                with self._lock:
+                    messages = self._robot_messages[sent_messages:]
+                sent_messages += len(messages)
+                if self.latency:
+                    time.sleep(self.latency)
+                conn.sendall(b''.join(messages) + state)
+                next_state += 1.0 / self.primary_rate
+            try:
+                chunk = conn.recv(65536)
+            except socket.timeout:
+                continue
+            if not chunk:
+                break
+            if self.latency:
+                time.sleep(self.latency)
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            with self._lock:
+                self.bytes_received += len(chunk)
+                for line in lines:
+                    line = line.decode('utf-8').rstrip('\r')
+                    if program or line.startswith(('def ', 'sec ')):
+                        program.append(line)
+                        if line == 'end':
+                            self._record('\n'.join(program))
+                            program = []
+                    elif line.strip():
+                        self._record(line)
+                self._lock.notify_all()
+
+    def _record(self, script):
+        """Private method that records a script and starts running it. Called with the lock held
+        Like on the controller, a new script replaces the running program. A program shorter than the state period
+        may end before any state message reports it running, see secondary.StateParser.expect_program.
+        """
+        self.scripts.append(script)
+        fault = self._random.random() < self.fault_rate if self.fault_rate else False
+        self._program = (time.time() + self.program_time, fault)
+
+    def _robot_state(self):
+        """Private method that returns a robot state message with the robot mode data of the running program"""
+        now = time.time()
+        with self._lock:
+            if self._program is not None and now >= self._program[0]:
+                if self._program[1]:
+                    self._robot_messages.append(_runtime_exception(now, "Emulated runtime exception"))
+                self._program = None
+            running = self._program is not None
+        mode = secondary.ROBOT_MODE.pack(int(now * 1e6), False, True, True, False, False, running, False, 7)
+        return secondary.MESSAGE_HEADER.pack(secondary.MESSAGE_HEADER.size + _ROBOT_MODE_LENGTH,
+                                             secondary.MESSAGE_ROBOT_STATE) + \
+               secondary.MESSAGE_HEADER.pack(_ROBOT_MODE_LENGTH, secondary.PACKAGE_ROBOT_MODE) + mode + \
+               _ROBOT_MODE_TAIL.pack(0, 1.0, 1.0, 1.0)
+
+    def _serve_realtime(self, conn):
+        """Private method that streams packets at the configured rate, each one latency after it is due"""
+        period = 1.0 / self.rate
+        start = time.time()
+        index = 0
+        while not self._stopped.is_set():
+            if self.disconnect_after is not None and index >= self.disconnect_after:
+                break
+            # due at start + index * period, delivered latency later without holding back the packets after it
+            delay = start + index * period + self.latency - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            if self.drop_rate and self._random.random() < self.drop_rate:
+                self.packets_dropped += 1
+            else:
+                data = self.packet(index)
+                step = self.fragment_size or len(data)
+                for i in range(0, len(data), step):
+                    conn.sendall(data[i:i + step])
+                self.packets_sent += 1
+            index += 1
+
+    def _serve_dashboard(self, conn):
+        """Private method that answers dashboard commands, one reply line per command line"""
+        conn.sendall((WELCOME + '\n').encode('ascii'))
+        pending = b''
+        replies = 0
+        while not self._stopped.is_set():
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            pending += chunk
+            while b'\n' in pending:
+                line, pending = pending.split(b'\n', 1)
+                command = line.decode('utf-8').strip()
+                with self._lock:
+                    self.dashboard_commands.append(command)
+                if self.latency:
+                    time.sleep(self.latency)
+                conn.sendall((_dashboard_reply(command) + '\n').encode('utf-8'))
+                replies += 1
+                if command == 'quit' or replies == self.dashboard_disconnect_after:
+                    return
+
+def _dashboard_reply(command):
+    """Private function that returns the reply of the dashboard server to a command"""
+    words = command.split(None, 1)
+    if not words:
+        return "could not understand: ''"
+    reply = DASHBOARD_REPLIES.get(words[0].lower())
+    if reply is None:
+        return "could not understand: '{0}'".format(command)
+    return reply.format(words[1] if len(words) > 1 else '')
+
+def _runtime_exception(t, text, line = 1, column = 0):
+    """Private function that returns a robot message reporting a runtime exception"""
+    body = secondary.ROBOT_MESSAGE_HEADER.pack(int(t * 1e6), -2, secondary.ROBOT_MESSAGE_RUNTIME_EXCEPTION) + \
+           struct.pack("!ii", line, column) + text.encode('utf-8')
+    return secondary.MESSAGE_HEADER.pack(secondary.MESSAGE_HEADER.size + len(body), secondary.MESSAGE_ROBOT_MESSAGE) + \
+           body
+
+def _synthetic_packet(size, t):
+    """Private function that returns a realtime packet of the given size for time t
+    Joints follow slow sine waves so consecutive packets differ. Fields not listed in comm.RT_FIELDS are zero.
+    """
+    data = bytearray(size)
+    struct.pack_into("!i", data, 0, size)
+    struct.pack_into("!d", data, 4, t)
+    joints = [0.5 * math.sin(0.2 * t + i) for i in range(6)]
+    for name, offset, value_fmt, count in comm.RT_FIELDS:
+        if name in ("target_joints_pos", "actual_joints_pos"):
+            struct.pack_into("!6d", data, offset, *joints)
+        elif name == "joint_temperatures":
+            struct.pack_into("!6d", data, offset, *([30.0] * 6))
+    return bytes(data)
@@ -0,0 +1,330 @@
+""" jobs.py module runs a queue of programs back to back on one robot.
+Two background threads keep the robot busy:
+    1) The preparer generates the programs of the next jobs (lookahead) while the current one runs
+    2) The dispatcher sends the next prepared program as soon as the controller reports the previous one finished
+       (see secondary.py), instead of waiting for a fixed time or polling joint positions
+Every job records when it was submitted, generated, dispatched, started and finished, so queue, dispatch and run
+latencies and the utilisation of the robot can be reported per batch.
+
+Usage:
+    queue = JobQueue('192.168.10.13')
+    queue.start()
+    for part in parts:
+        queue.submit(part.name, statements = part.statements)
+    queue.join()
+    for job in queue.jobs:
+        print(job.name, job.status, job.queue_seconds, job.dispatch_seconds, job.run_seconds)
+    print(queue.statistics())
+    queue.stop()
+"""
+
+import socket
+import threading
+import time
+
+import comm
+import secondary
+import urscript as ur
+
+# Job states
+QUEUED = 'queued'
+READY = 'ready'
+RUNNING = 'running'
+DONE = 'done'
+FAULTED = 'faulted'
+FAILED = 'failed'
+
+_FINAL = (DONE, FAULTED, FAILED)
+
+class Job(object):
+    """Program waiting in a JobQueue, with the times of its life cycle (time.time() values, None until reached)
+    started stays None for a program that started and ended between two robot state messages.
+
+    Args:
+    name: Name of the program function (string)
+    statements: Optional. UR script formatted statements of the program (string collection)
+    builder: Optional. Function without arguments that returns the program, called on the preparer thread
+    functions: Optional. Inner functions of the program (string collection)
+    """
+
+    def __init__(self, name, statements = None, builder = None, functions = ()):
+        if (statements is None) == (builder is None):
+            raise ValueError("A job needs either statements or a builder")
+        self.name = name
+        self.statements = statements
+        self.builder = builder
+        self.functions = functions
+        self.status = QUEUED
+        self.program = None
+        self.detail = None
+        self.submitted = time.time()
+        self.generated = None
+        self.dispatched = None
+        self.started = None
+        self.finished = None
+        self.generate_seconds = None
+        self._done = threading.Event()
+
+    def __repr__(self):
+        return "Job({0}, {1})".format(self.name, self.status)
+
+    @property
+    def queue_seconds(self):
+        """Time from submission to dispatch [s]"""
+        return _span(self.submitted, self.dispatched)
+
+    @property
+    def dispatch_seconds(self):
+        """Time from dispatch until the controller reported the program running [s]"""
+        return _span(self.dispatched, self.started)
+
+    @property
+    def run_seconds(self):
+        """Time the controller reported the program running [s]"""
+        return _span(self.started, self.finished)
+
+    def wait(self, timeout = None):
+        """Waits until the job is done, faulted or failed. Returns True if it ended in time"""
+        return self._done.wait(timeout)
+
+    def _build(self):
+        """Private method that generates the program"""
+        start = time.time()
+        if self.builder is not None:
+            self.program = self.builder()
+        else:
+            self.program = ur.create_function(self.name, self.statements, self.functions)
+        self.generated = time.time()
+        self.generate_seconds = self.generated - start
+
+def _remaining(deadline):
+    """Private function that returns the time left until a deadline [s], or None for no deadline"""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+def _span(start, end):
+    """Private function that returns end - start, or None if either is missing"""
+    if start is None or end is None:
+        return None
+    return end - start
+
+class JobQueue(object):
+    """Queue of programs dispatched back to back to one robot
+
+    Args:
+    robot_ip: IP address of robot (string)
+    port: Optional. Port of the primary interface, used for sending and for program events (int)
+    lookahead: Optional. Number of jobs generated ahead of the running one
+    job_timeout: Optional. Longest time from dispatch to the end of a program before the queue gives up on it [s].
+                 None waits forever
+    stop_on_fault: Optional. True to hold the queue after a faulted or failed job until resume() is called
+    settle: Optional. Longest time the controller takes to start a program [s]. A program that is not seen running
+            by then and has not faulted counts as finished, see secondary.StateParser.expect_program
+    """
+
+    def __init__(self, robot_ip, port = comm.PORT, lookahead = 2, job_timeout = None, stop_on_fault = True,
+                 settle = 0.2):
+        self.robot_ip = robot_ip
+        self.lookahead = lookahead
+        self.job_timeout = job_timeout
+        self.stop_on_fault = stop_on_fault
+        self.settle = settle
+        self.jobs = []
+        self.halted = False
+        self.sender = comm.ScriptSender(robot_ip, port)
+        self.monitor = secondary.StateMonitor(robot_ip, port)
+        self._next = 0
+        self._condition = threading.Condition()
+        self._stopped = True
+        self._threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def submit(self, name, statements = None, builder = None, functions = ()):
+        """Adds a job to the end of the queue. See Job for the arguments
+        Returns:
+        Job
+        """
+        job = Job(name, statements, builder, functions)
+        with self._condition:
+            self.jobs.append(job)
+            self._condition.notify_all()
+        return job
+
+    def start(self):
+        """Starts following program events and dispatching jobs. Does nothing if already started"""
+        if not self._stopped:
+            return
+        self._stopped = False
+        self.monitor.start()
+        self._threads = [threading.Thread(target = target, name = "JobQueue {0} {1}".format(self.robot_ip, role))
+                         for target, role in ((self._prepare, 'preparer'), (self._dispatch, 'dispatcher'))]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        """Stops dispatching and closes the connections. Queued jobs stay in the queue
+        A running job is no longer followed and ends failed, the robot may still be running its program.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self.monitor.stop()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.sender.close()
+
+    def resume(self):
+        """Continues dispatching after the queue was held by a faulted or failed job"""
+        with self._condition:
+            self.halted = False
+            self._condition.notify_all()
+
+    def join(self, timeout = None):
+        """Waits until every submitted job has ended or the queue is held. Returns True if it happened in time"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while self._next < len(self.jobs) and not self.halted:
+                if deadline is None:
+                    self._condition.wait(1.0)
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            return True
+
+    def statistics(self):
+        """Returns a dictionary with the number of jobs per state, mean latencies of the ended jobs [s] and the
+        utilisation: the share of time from the first dispatch to the last finish that the robot ran programs
+        """
+        with self._condition:
+            jobs = list(self.jobs)
+        ended = [job for job in jobs if job.finished is not None]
+        result = dict((status, sum(1 for job in jobs if job.status == status))
+                      for status in (QUEUED, READY, RUNNING, DONE, FAULTED, FAILED))
+        for name in ('queue_seconds', 'dispatch_seconds', 'run_seconds', 'generate_seconds'):
+            values = [getattr(job, name) for job in ended if getattr(job, name) is not None]
+            result['mean_' + name] = sum(values) / len(values) if values else None
+        if ended:
+            first = min(job.dispatched for job in ended)
+            last = max(job.finished for job in ended)
+            busy = sum(job.run_seconds for job in ended if job.run_seconds is not None)
+            result['utilisation'] = busy / (last - first) if last > first else None
+        else:
+            result['utilisation'] = None
+        return result
+
+    # ----- Background threads -----
+
+    def _prepare(self):
+        """Private method that generates the programs of the next jobs ahead of their dispatch"""
+        while True:
+            with self._condition:
+                job = None
+                while job is None:
+                    if self._stopped:
+                        return
+                    for candidate in self.jobs[self._next:self._next + self.lookahead + 1]:
+                        if candidate.status == QUEUED:
+                            job = candidate
+                            break
+                    else:
+                        self._condition.wait(1.0)
+            try:
+                job._build()
+            except Exception as e:
+                self._end(job, FAILED, "Generating the program failed: {0}".format(e))
+                continue
+            with self._condition:
+                job.status = READY
+                self._condition.notify_all()
+
+    def _dispatch(self):
+        """Private method that sends the next prepared job once the robot is idle and follows it to its end"""
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    job = self.jobs[self._next] if self._next < len(self.jobs) else None
+                    if job is not None and job.status in _FINAL:
+                        # failed while generating
+                        self._next += 1
+                        continue
+                    if job is not None and job.status == READY and not self.halted:
+                        break
+                    self._condition.wait(1.0)
+            if not self._wait_until_idle():
+                return
+            self._run(job)
+            with self._condition:
+                self._next += 1
+                self._condition.notify_all()
+
+    def _wait_until_idle(self):
+        """Private method that waits for the first robot state and for any program that is already running
+        Returns False if the queue was stopped meanwhile
+        """
+        monitor = self.monitor
+        while monitor.parser.robot_mode is None or monitor.parser.program_running:
+            if self._stopped:
+                return False
+            if monitor.parser.robot_mode is None:
+                time.sleep(0.01)
+            else:
+                monitor.wait_for((secondary.PROGRAM_FINISHED, secondary.PROGRAM_FAULTED), timeout = 0.5)
+        return not self._stopped
+
+    def _run(self, job):
+        """Private method that sends a job and waits for the controller to report its end"""
+        monitor = self.monitor
+        mark = monitor.sequence
+        # a short program may start and end between two state messages
+        monitor.parser.expect_program(self.settle)
+        try:
+            self.sender.send(job.program)
+        except socket.error as e:
+            self._end(job, FAILED, "Sending the program failed: {0}".format(e))
+            return
+        with self._condition:
+            job.dispatched = time.time()
+            job.status = RUNNING
+            self._condition.notify_all()
+        # one deadline for the start and the end of the program
+        deadline = None if self.job_timeout is None else job.dispatched + self.job_timeout
+        # a program that fails to compile is reported faulted without ever running
+        event = monitor.wait_for((secondary.PROGRAM_STARTED, secondary.PROGRAM_FINISHED, secondary.PROGRAM_FAULTED),
+                                 since = mark, timeout = _remaining(deadline))
+        if event is not None and event.kind == secondary.PROGRAM_STARTED:
+            with self._condition:
+                job.started = event.time
+            event = monitor.wait_for((secondary.PROGRAM_FINISHED, secondary.PROGRAM_FAULTED), since = mark,
+                                     timeout = _remaining(deadline))
+        if event is None and self._stopped:
+            self._end(job, FAILED, "Queue stopped while the program was running")
+        elif event is None:
+            self._end(job, FAILED, "No program end reported within {0} s".format(self.job_timeout))
+        elif event.kind == secondary.PROGRAM_FAULTED:
+            self._end(job, FAULTED, event.detail, event.time if job.started is not None else None)
+        else:
+            self._end(job, DONE, None, event.time)
+
+    def _end(self, job, status, detail, finished = None):
+        """Private method that records the end of a job and holds the queue on failures if requested"""
+        with self._condition:
+            job.status = status
+            job.detail = detail
+            job.finished = finished
+            if status != DONE and self.stop_on_fault:
+                self.halted = True
+            self._condition.notify_all()
+        job._done.set()
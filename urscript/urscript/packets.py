@@ -0,0 +1,77 @@
+""" packets.py module decodes realtime interface packets with NumPy.
+A packet is viewed through one structured dtype built from comm.RT_FIELDS, so decoding does not copy the data.
+A contiguous buffer of many packets of the same size is decoded in one call into a record array, e.g.
+
+    states = decode_packets(buffer)
+    states['actual_joints_pos']     # (N,6) array
+    states['time']                  # (N,) array
+
+Field names are the keys of the dictionary returned by comm.listen.
+"""
+
+import numpy as np
+from struct import unpack_from
+
+import comm
+
+_NUMPY_FORMATS = {"i": ">i4", "d": ">f8"}
+
+def packet_dtype(packet_size = comm.RT_MIN_PACKET_SIZE):
+    """Returns the structured dtype of a realtime packet
+    Args:
+    packet_size: Optional. Size of one packet in bytes, including the length header. Depends on the controller version
+    Returns:
+    NumPy dtype with one field per entry of comm.RT_FIELDS
+    """
+    if packet_size < comm.RT_MIN_PACKET_SIZE:
+        raise ValueError("Realtime packets are at least {0} bytes, got {1}".format(comm.RT_MIN_PACKET_SIZE, packet_size))
+    names = []
+    formats = []
+    offsets = []
+    for name, offset, value_fmt, count in comm.RT_FIELDS:
+        names.append(name)
+        formats.append(_NUMPY_FORMATS[value_fmt] if count == 1 else (_NUMPY_FORMATS[value_fmt], (count,)))
+        offsets.append(offset)
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": packet_size})
+
+def packet_size(data, offset = 0):
+    """Returns the size of the packet starting at offset, as given by its length header"""
+    return unpack_from("!i", data, offset)[0]
+
+def decode(data):
+    """Returns one packet as a NumPy record. The record is a view of data
+    Args:
+    data: Raw packet (byte[])
+    Returns:
+    Record with named fields, e.g. record['tool_pose']
+    """
+    return np.frombuffer(data, _dtype(packet_size(data)), count = 1)[0]
+
+def decode_packets(buffer, size = None, count = -1, offset = 0):
+    """Returns many packets of the same size as a structured array. The array is a view of buffer
+    Args:
+    buffer: Object supporting the buffer interface (bytes, bytearray, memoryview, mmap) with packets back to back
+    size: Optional. Size of each packet in bytes. Read from the first packet header by default
+    count: Optional. Number of packets to decode. By default all complete packets in the buffer
+    offset: Optional. Byte offset of the first packet
+    Returns:
+    Structured array of shape (count,), e.g. array['actual_joints_pos'] has shape (count,6)
+    """
+    if size is None:
+        size = packet_size(buffer, offset)
+    if count < 0:
+        count = (len(buffer) - offset) // size
+    return np.frombuffer(buffer, _dtype(size), count = count, offset = offset)
+
+def as_dict(record):
+    """Returns a decoded packet in the dictionary format of comm.listen (a tuple of values per field)"""
+    return dict((name, tuple(np.atleast_1d(record[name]).tolist())) for name in record.dtype.names)
+
+_dtypes = {}
+
+def _dtype(size):
+    """Private function that returns the cached packet dtype for a packet size"""
+    dtype = _dtypes.get(size)
+    if dtype is None:
+        dtype = _dtypes[size] = packet_dtype(size)
+    return dtype
@@ -0,0 +1,169 @@
+""" poses.py module contains value types for UR Script poses.
+A Pose keeps its six values as floats and is only formatted as "p[x,y,z,ax,ay,az]" when it is written into a statement,
+so poses can still be compared, transformed and batched after they are created. Pose is pure Python.
+PoseArray holds many poses in one (N,6) NumPy array and requires NumPy.
+
+Usage:
+    target = Pose(0.3, 0.1, 0.2, 0, 3.1416, 0)
+    ur.movel(target)                            # 'movel(p[0.300000, ...], ...)'
+    path = PoseArray.from_array(values)         # (N,6) array, no per-pose parsing or formatting
+    statements = [ur.servoc(p) for p in path]   # formatted one at a time while serializing
+"""
+
+import core
+
+try:
+    import numpy as np
+    import rotations
+except ImportError:
+    # Pose works without NumPy, PoseArray needs it
+    np = None
+
+_FORMAT = "p[{0:f}, {1:f}, {2:f}, {3:f}, {4:f}, {5:f}]"
+
+class Pose(object):
+    """UR Script pose: a position [m] and a rotation vector (axis * angle [rad])
+
+    Args:
+    x, y, z: Position vector [m]
+    ax, ay, az: Rotation vector
+    """
+
+    __slots__ = ('x', 'y', 'z', 'ax', 'ay', 'az')
+
+    def __init__(self, x, y, z, ax, ay, az):
+        self.x = float(x)
+        self.y = float(y)
+        self.z = float(z)
+        self.ax = float(ax)
+        self.ay = float(ay)
+        self.az = float(az)
+
+    @classmethod
+    def from_vectors(cls, position, orientation):
+        """Returns a pose from a position vector and a rotation vector"""
+        return cls(position[0], position[1], position[2], orientation[0], orientation[1], orientation[2])
+
+    @property
+    def position(self):
+        return (self.x, self.y, self.z)
+
+    @property
+    def orientation(self):
+        return (self.ax, self.ay, self.az)
+
+    def __len__(self):
+        return 6
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, self.ax, self.ay, self.az))
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z, self.ax, self.ay, self.az)[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, Pose):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __str__(self):
+        return _FORMAT.format(self.x, self.y, self.z, self.ax, self.ay, self.az)
+
+    def __repr__(self):
+        return "Pose({0!r}, {1!r}, {2!r}, {3!r}, {4!r}, {5!r})".format(*tuple(self))
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+    def to_frame(self):
+        """Returns the pose as a 4x4 frame matrix (see core.py)"""
+        return core.frame_from_pose(tuple(self))
+
+class PoseArray(object):
+    """Many poses backed by one (N,6) float array. Requires NumPy
+
+    Args:
+    values: Array-like of shape (N,6). Rows are (x,y,z,ax,ay,az)
+    """
+
+    def __init__(self, values):
+        if np is None:
+            raise ImportError("PoseArray requires NumPy")
+        values = np.asarray(values, dtype = float)
+        if values.ndim != 2 or values.shape[1] != 6:
+            raise ValueError("Expected an (N,6) array of poses, got shape {0}".format(values.shape))
+        self.values = values
+
+    @classmethod
+    def from_array(cls, values):
+        """Returns a PoseArray from an (N,6) array. The array is used without copying when it is already float"""
+        return cls(values)
+
+    @classmethod
+    def from_vectors(cls, positions, orientations):
+        """Returns a PoseArray from (N,3) positions and (N,3) rotation vectors"""
+        return cls(np.hstack((np.asarray(positions, dtype = float), np.asarray(orientations, dtype = float))))
+
+    @classmethod
+    def from_frames(cls, frames):
+        """Returns a PoseArray from an (N,4,4) array of frames. Orientations are converted in one vectorized pass"""
+        return cls(rotations.poses_from_frames(frames))
+
+    @classmethod
+    def from_poses(cls, poses):
+        """Returns a PoseArray from a sequence of Pose objects or six-value sequences"""
+        return cls(np.array([tuple(p) for p in poses], dtype = float).reshape(-1, 6))
+
+    @property
+    def positions(self):
+        """(N,3) view of the positions"""
+        return self.values[:, :3]
+
+    @property
+    def orientations(self):
+        """(N,3) view of the rotation vectors"""
+        return self.values[:, 3:]
+
+    def to_frames(self):
+        """Returns the poses as an (N,4,4) array of frames"""
+        return rotations.frames_from_poses(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        """Yields one Pose per row"""
+        for row in self.values.tolist():
+            yield Pose(*row)
+
+    def __getitem__(self, index):
+        """Returns a Pose for an integer index, otherwise a PoseArray of the selected rows"""
+        if isinstance(index, (int, np.integer)):
+            return Pose(*self.values[index].tolist())
+        return PoseArray(self.values[index])
+
+    def __eq__(self, other):
+        if not isinstance(other, PoseArray):
+            return NotImplemented
+        return self.values.shape == other.values.shape and bool(np.all(self.values == other.values))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "PoseArray({0} poses)".format(len(self.values))
+
+    def strings(self):
+        """Generator of the formatted poses, one string per row"""
+        for row in self.values.tolist():
+            yield _FORMAT.format(*row)
@@ -0,0 +1,133 @@
+""" program.py module builds UR Script programs as a tree of nodes and serializes them once.
+create_function and _indent_body re-split and re-indent the whole text of every inner function at each nesting level.
+Here statements, blocks and functions are only collected, and indentation is applied while the program is written,
+so the full program text never has to exist in memory.
+
+Usage:
+    main = Function('main')
+    pick = main.function('pick')
+    pick.add(ur.comment('picking now'), ur.action(pick_pose, 1, True))
+    loop = main.block('while True:')
+    loop.add(ur.custom_function('pick'))
+    main.save(path, 'main')                     # or main.write(stream), str(main), ScriptSender.send(main)
+"""
+
+import os.path
+
+import poses
+
+class Block(object):
+    """A block of statements closed by 'end', e.g. 'while x:' or 'if x:'
+
+    Args:
+    header: First line of the block (string)
+    """
+
+    def __init__(self, header):
+        self.header = header
+        self.body = []
+
+    def __len__(self):
+        return len(self.body)
+
+    def __str__(self):
+        return ''.join(self.chunks())
+
+    def add(self, *ur_statements):
+        """Adds UR Script statements (single or sequence), blocks or functions to the body. Returns self
+        Multi-line strings, e.g. programs from create_function, are indented line by line.
+        """
+        body = self.body
+        for urs in ur_statements:
+            if hasattr(urs, 'strip') or isinstance(urs, Block):
+                body.append(urs)
+            elif isinstance(urs, poses.Pose):
+                body.append(str(urs))
+            elif hasattr(urs, '__iter__'):
+                for s in urs:
+                    body.append(s)
+        return self
+
+    def block(self, header):
+        """Adds a nested block and returns it"""
+        b = Block(header)
+        self.body.append(b)
+        return b
+
+    def function(self, name, arguments = ()):
+        """Adds an inner function and returns it"""
+        f = Function(name, arguments)
+        self.body.append(f)
+        return f
+
+    def lines(self, indent = ''):
+        """Generator of the program lines, each ending with a new line"""
+        yield indent + self.header + '\n'
+        inner = indent + '\t'
+        for node in self.body:
+            if isinstance(node, Block):
+                for line in node.lines(inner):
+                    yield line
+            elif '\n' in node:
+                for line in node.rstrip('\n').split('\n'):
+                    yield inner + line + '\n'
+            else:
+                yield inner + node + '\n'
+        yield indent + 'end\n'
+
+    def chunks(self, size = 65536):
+        """Generator of program text in chunks of about size characters"""
+        pending = []
+        pending_size = 0
+        for line in self.lines():
+            pending.append(line)
+            pending_size += len(line)
+            if pending_size >= size:
+                yield ''.join(pending)
+                pending = []
+                pending_size = 0
+        if pending:
+            yield ''.join(pending)
+
+    def write(self, stream, chunk_size = 65536):
+        """Writes the program to a file-like object or a connected socket without building the full text
+        Args:
+        stream: Object with a write method (e.g. an open file) or a socket
+        chunk_size: Optional. Characters per write
+        Returns:
+        Number of characters written
+        """
+        if hasattr(stream, 'sendall'):
+            write = lambda text: stream.sendall(text.encode('utf-8'))
+        else:
+            write = stream.write
+        written = 0
+        for chunk in self.chunks(chunk_size):
+            write(chunk)
+            written += len(chunk)
+        return written
+
+class Function(Block):
+    """A UR Script function or program. A program is a function without arguments
+
+    Args:
+    name: Name of function (string)
+    arguments: Optional. Names of the function arguments (string collection)
+    """
+
+    def __init__(self, name, arguments = ()):
+        Block.__init__(self, 'def {0}({1}):'.format(name, ','.join(['{}'.format(arg) for arg in arguments])))
+        self.name = name
+        self.arguments = tuple(arguments)
+
+    def save(self, save_path, file_name):
+        """Writes the program to <save_path>/<file_name>.txt, the layout used by urscript.save_function
+        Raises:
+        IO error on write failure
+        """
+        full_name = os.path.join(save_path, file_name + ".txt")
+        f = open(full_name, "w")
+        try:
+            self.write(f)
+        finally:
+            f.close()
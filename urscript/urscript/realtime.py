@@ -0,0 +1,188 @@
+""" realtime.py module keeps a persistent connection to the realtime interface (Port 30003) of the robot.
+The controller pushes one length-prefixed packet per control cycle (125 Hz). RealtimeClient reassembles the packets
+from the TCP stream and yields them, decoded, for as long as the connection (or reconnection) lasts.
+"""
+
+import socket
+import time
+from struct import unpack
+
+import comm
+
+class RealtimeClient(object):
+    """Long-lived client for the realtime interface of one robot
+
+    Usage:
+        client = RealtimeClient('192.168.10.13')
+        for state in client.states():
+            print(state['tool_pose'])
+
+    Args:
+    robot_ip: IP address of robot (string)
+    port: Optional. Port of the realtime interface (int)
+    timeout: Optional. Socket timeout for connecting and receiving [s]
+    reconnect_delay: Optional. Wait time before reconnecting after the connection is lost [s]
+    decoder: Optional. Function that formats a raw packet. Defaults to the dictionary format of comm.listen
+    on_error: Optional. Function called with the socket.error when the connection is lost or reconnecting fails,
+              e.g. to log it. Reconnecting goes on regardless
+    """
+
+    def __init__(self, robot_ip, port = comm.PORT_RT, timeout = 1.0, reconnect_delay = 0.5, decoder = comm._format_data,
+                 on_error = None):
+        self.robot_ip = robot_ip
+        self.port = port
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.decoder = decoder
+        self.on_error = on_error
+        self.packet_count = 0
+        self.reconnect_count = 0
+        self._socket = None
+        self._buffer = bytearray()
+        self._closed = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def connected(self):
+        return self._socket is not None
+
+    @property
+    def closed(self):
+        """True after close() until open() is called"""
+        return self._closed
+
+    def open(self, connect = True):
+        """Lets a client that was closed connect again, and opens the connection
+        Args:
+        connect: Optional. False to only clear the closed state and connect on the first read
+        Raises:
+        socket.error on failure
+        """
+        self._closed = False
+        if connect:
+            self.connect()
+
+    def connect(self):
+        """Opens the connection. Any partially received packet from a previous connection is discarded
+        Raises:
+        socket.error on failure or if the client was closed. Use open() to reuse a closed client
+        """
+        self._disconnect()
+        if self._closed:
+            raise socket.error("Client for {0} is closed".format(self.robot_ip))
+        s = socket.create_connection((self.robot_ip, self.port), self.timeout)
+        s.settimeout(self.timeout)
+        if self._closed:
+            # closed from another thread while connecting
+            s.close()
+            raise socket.error("Client for {0} is closed".format(self.robot_ip))
+        self._socket = s
+
+    def close(self):
+        """Closes the connection and stops running packet and state generators. Reading raises until open()"""
+        self._closed = True
+        self._disconnect()
+
+    def read_packet(self):
+        """Returns the next complete packet, including its length header
+        Returns:
+        data: Raw packet (byte[])
+        Raises:
+        socket.error if the connection is lost, the stream is corrupt or the client is closed
+        """
+        if self._socket is None:
+            self.connect()
+        buf = self._buffer
+        while len(buf) < 4:
+            self._fill()
+        message_length = unpack("!i", bytes(buf[:4]))[0]
+        if message_length < 4 or message_length > comm.MAX_PACKET_SIZE:
+            self._disconnect()
+            raise socket.error("Invalid packet length {0} from {1}".format(message_length, self.robot_ip))
+        while len(buf) < message_length:
+            self._fill()
+        data = bytes(buf[:message_length])
+        del buf[:message_length]
+        self.packet_count += 1
+        return data
+
+    def packets(self, reconnect = True):
+        """Generator of raw packets at the controller rate
+        Args:
+        reconnect: Optional. True to reconnect when the connection is lost, False to raise socket.error
+        """
+        while not self._closed:
+            try:
+                yield self.read_packet()
+            except socket.error as e:
+                self._disconnect()
+                if self._closed:
+                    return
+                if not reconnect:
+                    raise
+                self._report(e)
+                self._reconnect()
+
+    def states(self, reconnect = True):
+        """Generator of decoded robot states at the controller rate
+        Args:
+        reconnect: Optional. True to reconnect when the connection is lost, False to raise socket.error
+        """
+        decoder = self.decoder
+        for data in self.packets(reconnect):
+            yield decoder(data)
+
+    def stream(self, callback, reconnect = True):
+        """Calls callback(state) for every decoded robot state until the callback returns False or close() is called
+        Args:
+        callback: Function that takes a decoded state
+        reconnect: Optional. True to reconnect when the connection is lost
+        """
+        for state in self.states(reconnect):
+            if callback(state) is False:
+                break
+
+    def _fill(self):
+        """Private method that appends the next chunk from the socket to the receive buffer"""
+        s = self._socket
+        if s is None:
+            raise socket.error("Connection to {0} closed".format(self.robot_ip))
+        chunk = s.recv(4096)
+        if not chunk:
+            raise socket.error("Connection closed by {0}".format(self.robot_ip))
+        self._buffer.extend(chunk)
+
+    def _reconnect(self):
+        """Private method that retries connecting until it succeeds or the client is closed"""
+        while not self._closed:
+            time.sleep(self.reconnect_delay)
+            if self._closed:
+                return
+            try:
+                self.connect()
+            except socket.error as e:
+                self._report(e)
+            else:
+                self.reconnect_count += 1
+                return
+
+    def _report(self, error):
+        """Private method that passes a connection error to on_error, if set"""
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def _disconnect(self):
+        """Private method that closes the socket and discards buffered data"""
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except socket.error:
+                pass
+            self._socket = None
+        del self._buffer[:]
@@ -0,0 +1,150 @@
+""" recorder.py module records robot states in the background.
+A Recorder runs a realtime.RealtimeClient on a daemon thread and writes every packet into a preallocated ring buffer
+with one fixed-size slot per packet. Reads never wait for the network, so they are safe to call from a UI thread.
+"""
+
+import socket
+import threading
+
+import comm
+import realtime
+import robot
+
+class Recorder(object):
+    """Background recorder of realtime packets for one robot
+
+    Usage:
+        rec = Recorder('192.168.10.13')
+        rec.start()
+        state = rec.latest()            # newest state or None
+        states = rec.last(2.0)          # states of the last 2 seconds, oldest first
+        rec.stop()
+
+    Args:
+    robot_ip: IP address of robot (string)
+    capacity: Optional. Number of packets kept in the ring buffer. Defaults to one minute at the packet rate
+    slot_size: Optional. Bytes reserved for each packet. Longer packets are truncated to the slot size
+    port: Optional. Port of the realtime interface (int)
+    decoder: Optional. Function that formats a raw packet. Defaults to the dictionary format of comm.listen
+    model: Optional. Robot model or model name, e.g. 'UR5e'. Its controller rate is the packet rate
+    frequency: Optional. Packets per second of the realtime interface. Defaults to the rate of the model, or
+    FREQUENCY without one [Hz]
+    on_error: Optional. Function called on the recording thread with the socket.error when connecting fails or the
+              connection is lost. Recording retries regardless
+    """
+
+    FREQUENCY = 125.0
+
+    def __init__(self, robot_ip, capacity = None, slot_size = 1220, port = comm.PORT_RT, decoder = comm._format_data,
+                 model = None, frequency = None, on_error = None):
+        if slot_size < comm.RT_MIN_PACKET_SIZE:
+            raise ValueError("Slot size must be at least {0} bytes".format(comm.RT_MIN_PACKET_SIZE))
+        if frequency is None and model is not None:
+            frequency = robot.model(model).frequency
+        self.frequency = self.FREQUENCY if frequency is None else float(frequency)
+        if capacity is None:
+            capacity = int(round(60 * self.frequency))
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.decoder = decoder
+        self.client = realtime.RealtimeClient(robot_ip, port, decoder = decoder, on_error = on_error)
+        self._buffer = bytearray(capacity * slot_size)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def count(self):
+        """Total number of packets recorded since start, including those overwritten"""
+        return self._count
+
+    def start(self):
+        """Starts recording on a background thread. Does nothing if already recording"""
+        if self.running:
+            return
+        # a stop() from here on closes the client for good, also while the thread is still connecting
+        self.client.open(connect = False)
+        self._thread = threading.Thread(target = self._run, name = "Recorder {0}".format(self.client.robot_ip))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout = 2.0):
+        """Stops recording and closes the connection. Recorded packets stay readable"""
+        self.client.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def clear(self):
+        """Discards all recorded packets"""
+        with self._lock:
+            self._count = 0
+
+    def latest(self):
+        """Returns the newest decoded state, or None if nothing has been recorded yet"""
+        data = self.latest_raw()
+        if data is None:
+            return None
+        return self.decoder(data)
+
+    def latest_raw(self):
+        """Returns the slot of the newest packet (byte[]), or None if nothing has been recorded yet"""
+        with self._lock:
+            if not self._count:
+                return None
+            start = ((self._count - 1) % self.capacity) * self.slot_size
+            return bytes(self._buffer[start:start + self.slot_size])
+
+    def last(self, seconds):
+        """Returns decoded states of the last seconds, oldest first
+        Args:
+        seconds: Time span to return, converted to packets at the packet rate [s]
+        Returns:
+        List of decoded states
+        """
+        data = self.last_raw(seconds)
+        size = self.slot_size
+        return [self.decoder(data[i:i + size]) for i in range(0, len(data), size)]
+
+    def last_raw(self, seconds):
+        """Returns the slots of the last seconds as one contiguous buffer, oldest first
+        Use packets.decode_packets(data, recorder.slot_size) to view it as a NumPy record array.
+        Args:
+        seconds: Time span to return, converted to packets at the packet rate [s]
+        Returns:
+        data: Contiguous slots (byte[])
+        """
+        with self._lock:
+            n = min(int(round(seconds * self.frequency)), self._count, self.capacity)
+            if n <= 0:
+                return b''
+            end = self._count % self.capacity
+            start = (end - n) % self.capacity
+            size = self.slot_size
+            if start < end:
+                return bytes(self._buffer[start * size:end * size])
+            return bytes(self._buffer[start * size:] + self._buffer[:end * size])
+
+    def _run(self):
+        """Private method that writes packets into the ring buffer until the client is closed"""
+        try:
+            self.client.connect()
+        except socket.error as e:
+            if self.client.closed:
+                return
+            if self.client.on_error is not None:
+                self.client.on_error(e)
+        for data in self.client.packets():
+            self._write(data)
+
+    def _write(self, data):
+        """Private method that copies a packet into the next slot of the ring buffer"""
+        n = min(len(data), self.slot_size)
+        with self._lock:
+            start = (self._count % self.capacity) * self.slot_size
+            self._buffer[start:start + n] = data[:n]
+            self._count += 1
@@ -0,0 +1,213 @@
+"""
+This module contains the robot model, built once from a Denavit Hartenberg table.
+The static part of every link transform (cos and sin of the twist, link length, joint distance and angle offset) is
+computed when the model is created, so a link transform for a joint value only needs one cos and one sin.
+Forward kinematics keeps the partial products of the last joint vector and only recomputes the chain from the first
+joint that changed.
+
+A RobotModel can be passed wherever a DH table is expected (core.py, kinematics.py, batch_kinematics.py).
+Models of the Universal Robots arms are registered by name, e.g. robot.model('UR5e').
+"""
+
+import math
+
+import core
+
+try:
+    import numpy as np
+except ImportError:
+    # the batch link terms need NumPy, everything else is pure Python
+    np = None
+
+class RobotModel(object):
+    """Kinematic model of a serial robot
+
+    Args:
+        dh_table: Tuple of (joint_distance, joint_angle, link_length, link_twist). This is the Denavit Hartenberg parameter table.
+        base: Optional. Frame 0 as a 4x4 matrix. Defaults to the world XY frame
+        name: Optional. Name of the robot type, e.g. 'UR5'
+        joint_limits: Optional. (min, max) per joint in radians. Defaults to unlimited joints
+        frequency: Optional. Rate of the controller, e.g. of the realtime interface packets [Hz]
+
+    Attributes:
+        min_reach: Closest distance of the wrist to the base axis that inverse kinematics can solve [m]. 6 links only
+        max_reach: Farthest distance of the wrist from the shoulder that inverse kinematics can solve [m]. 6 links only
+    """
+
+    def __init__(self, dh_table, base = None, name = None, joint_limits = None, frequency = None):
+        self.dh_table = tuple(tuple(float(value) for value in row) for row in dh_table)
+        self.base = core.IDENTITY if base is None else tuple(tuple(row) for row in base)
+        self.name = name
+        self.frequency = frequency
+        if joint_limits is None:
+            joint_limits = ((-float('inf'), float('inf')),) * len(self.dh_table)
+        self.joint_limits = tuple((float(low), float(high)) for low, high in joint_limits)
+        # (joint_distance, joint_angle, link_length, cos(twist), sin(twist)) per link
+        self._links = tuple((d, theta, r, math.cos(alpha), math.sin(alpha)) for d, theta, r, alpha in self.dh_table)
+        # the reach follows the UR geometry that core.inverse_kinematics solves, other chains have none
+        self.min_reach = None
+        self.max_reach = None
+        if len(self.dh_table) == 6:
+            # targets whose wrist is closer to the base axis than the shoulder offset have no solution
+            self.min_reach = abs(self.dh_table[3][0])
+            # the elbow can reach at most upper arm + forearm from the shoulder
+            self.max_reach = abs(self.dh_table[1][2]) + abs(self.dh_table[2][2])
+        self._link_terms = None
+        # (joints, frames) of the last forward kinematics call, replaced as one tuple so threads sharing a model
+        # never see the joints of one call with the frames of another
+        self._chain = ((), [self.base])
+
+    def __len__(self):
+        return len(self.dh_table)
+
+    def __repr__(self):
+        return "RobotModel({0})".format(self.name or "{0} links".format(len(self.dh_table)))
+
+    def located(self, base):
+        """Returns a copy of the model standing on another base frame, e.g. for one robot of a multi-robot cell"""
+        return RobotModel(self.dh_table, base, self.name, self.joint_limits, self.frequency)
+
+    def within_limits(self, joints):
+        """Returns True if every joint value is inside its joint limits"""
+        for joint, (low, high) in zip(joints, self.joint_limits):
+            if joint < low or joint > high:
+                return False
+        return True
+
+    def link_transform(self, i, joint):
+        """
+        Returns the transform of link i for a joint value, equal to core.dh_matrix of the link with the joint value added
+
+        Args:
+            i: Index of the link
+            joint: Joint value added to the joint angle of the DH table. in radians
+
+        Returns:
+            m: 4x4 matrix
+        """
+        d, theta, r, ca, sa = self._links[i]
+        ct = math.cos(theta + joint)
+        st = math.sin(theta + joint)
+        return ((ct, -st * ca, st * sa, r * ct),
+                (st, ct * ca, -ct * sa, r * st),
+                (0.0, sa, ca, d),
+                (0.0, 0.0, 0.0, 1.0))
+
+    def forward_kinematics(self, joints):
+        """
+        Returns the frames of the kinematic chain for a joint vector
+        The partial products of the previous call are reused up to the first joint that differs.
+
+        Args:
+            joints: Joint values added to the joint angles of the DH table. in radians
+
+        Returns:
+            frames: A list of len(dh_table) + 1 frames (4x4 matrices). frames[0] is the base and frames[-1] the tool flange
+        """
+        joints = tuple(joints)
+        cached_joints, cached_frames = self._chain
+        start = 0
+        while start < len(cached_joints) and start < len(joints) and cached_joints[start] == joints[start]:
+            start += 1
+        frames = cached_frames[:start + 1]
+        for i in range(start, len(joints)):
+            frames.append(core.multiply_frames(frames[i], self.link_transform(i, joints[i])))
+        self._chain = (joints, frames)
+        return list(frames)
+
+    def inverse_kinematics(self, target, right_hand = False, elbow_up = False, wrist_up = False):
+        """Returns joint angles for a target frame in the coordinates of forward_kinematics. See core.inverse_kinematics"""
+        return core.inverse_kinematics(target, self, right_hand, elbow_up, wrist_up)
+
+    @property
+    def link_terms(self):
+        """
+        (L,3,4,4) array of constant matrices (A, B, K) per link. Requires NumPy
+        The transform of link i for an angle theta (offset included) is cos(theta) * A + sin(theta) * B + K.
+        """
+        if self._link_terms is None:
+            if np is None:
+                raise ImportError("RobotModel.link_terms requires NumPy")
+            terms = np.zeros((len(self._links), 3, 4, 4))
+            for i, (d, theta, r, ca, sa) in enumerate(self._links):
+                terms[i, 0] = ((1, 0, 0, r), (0, ca, -sa, 0), (0, 0, 0, 0), (0, 0, 0, 0))
+                terms[i, 1] = ((0, -ca, sa, 0), (1, 0, 0, r), (0, 0, 0, 0), (0, 0, 0, 0))
+                terms[i, 2] = ((0, 0, 0, 0), (0, 0, 0, 0), (0, sa, ca, d), (0, 0, 0, 1))
+            self._link_terms = terms
+        return self._link_terms
+
+# ----- Model registry -----
+
+_models = {}
+_registry = {}
+# tables with the joint values folded into the angle column (kinematics.forward_kinematics) differ on every call, so
+# the cache of plain tables is emptied when it reaches this size instead of growing without bound
+MODEL_CACHE_SIZE = 256
+
+def register(robot_model):
+    """Adds a named model to the registry so it can be looked up with model(name)"""
+    if not robot_model.name:
+        raise ValueError("Only named models can be registered")
+    _registry[robot_model.name.upper()] = robot_model
+
+def names():
+    """Returns the names of the registered models"""
+    return sorted(m.name for m in _registry.values())
+
+def is_model(dh_table):
+    """Returns True for a RobotModel or a model name, False for a Denavit Hartenberg parameter table"""
+    return isinstance(dh_table, RobotModel) or hasattr(dh_table, 'upper')
+
+def model(dh_table, links = None):
+    """Returns a RobotModel for a registered name, a DH table or a model
+    This is the one place that tells the three apart, for core.py and batch_kinematics.py alike.
+    Models built from plain tables are cached, so repeated calls with the same table share the precomputed terms.
+    The cache keeps up to MODEL_CACHE_SIZE tables.
+    Args:
+        dh_table: Model name (string), Denavit Hartenberg parameter table or RobotModel
+        links: Optional. Number of links the model must have, e.g. 6 for the inverse kinematics of UR arms
+    Raises:
+        KeyError if a name is not registered
+        ValueError if a table row is not (joint_distance, joint_angle, link_length, link_twist) or the number of
+        links differs
+    """
+    if isinstance(dh_table, RobotModel):
+        result = dh_table
+    elif hasattr(dh_table, 'upper'):
+        try:
+            result = _registry[dh_table.upper()]
+        except KeyError:
+            raise KeyError("Unknown robot model {0}. Registered models: {1}".format(dh_table, ', '.join(names())))
+    else:
+        key = tuple(tuple(float(value) for value in row) for row in dh_table)
+        if any(len(row) != 4 for row in key):
+            raise ValueError("DH table rows must be (joint_distance, joint_angle, link_length, link_twist)")
+        result = _models.get(key)
+        if result is None:
+            if len(_models) >= MODEL_CACHE_SIZE:
+                _models.clear()
+            result = _models[key] = RobotModel(key)
+    if links is not None and len(result) != links:
+        raise ValueError("Expected a model with {0} links, got {1}".format(links, len(result)))
+    return result
+
+def _ur_model(name, d1, a2, a3, d4, d5, d6, wrist3_limit = 2 * math.pi, frequency = 125.0):
+    """Private function that returns a Universal Robots model from its DH parameters [m]
+    Joints turn +-360 degrees except the elbow, which is limited to +-180 degrees by self collision.
+    The CB3 controllers run at 125 Hz, the e-series at 500 Hz.
+    """
+    dh_table = ((d1, 0, 0, math.pi / 2), (0, 0, a2, 0), (0, 0, a3, 0),
+                (d4, 0, 0, math.pi / 2), (d5, 0, 0, -math.pi / 2), (d6, 0, 0, 0))
+    limits = ((-2 * math.pi, 2 * math.pi),) * 2 + ((-math.pi, math.pi),) + ((-2 * math.pi, 2 * math.pi),) * 2 + \
+             ((-wrist3_limit, wrist3_limit),)
+    return RobotModel(dh_table, name = name, joint_limits = limits, frequency = frequency)
+
+for _m in (_ur_model('UR3', 0.1519, -0.24365, -0.21325, 0.11235, 0.08535, 0.0819, float('inf')),
+           _ur_model('UR5', 0.089159, -0.425, -0.39225, 0.10915, 0.09465, 0.0823),
+           _ur_model('UR10', 0.1273, -0.612, -0.5723, 0.163941, 0.1157, 0.0922),
+           _ur_model('UR3e', 0.15185, -0.24355, -0.2132, 0.13105, 0.08535, 0.0921, float('inf'), 500.0),
+           _ur_model('UR5e', 0.1625, -0.425, -0.3922, 0.1333, 0.0997, 0.0996, frequency = 500.0),
+           _ur_model('UR10e', 0.1807, -0.6127, -0.57155, 0.17415, 0.11985, 0.11655, frequency = 500.0),
+           _ur_model('UR16e', 0.1807, -0.4784, -0.36, 0.17415, 0.11985, 0.11655, frequency = 500.0)):
+    register(_m)
+del _m
@@ -0,0 +1,114 @@
+"""
+This module contains vectorized conversions between rotation matrices and UR rotation vectors (axis * angle).
+It replaces per-target calls of axisangle_from_vectors when poses are generated for whole toolpaths.
+
+Rotations are (N,3,3) arrays, rotation vectors are (N,3) arrays and frames are (N,4,4) arrays whose columns are the
+X axis, Y axis, Z axis (normal) and origin of a plane. Poses are (N,6) arrays of (x,y,z,ax,ay,az).
+"""
+
+import numpy as np
+
+# Below this angle the rotation vector is taken from the skew-symmetric part directly [rad]
+_SMALL_ANGLE = 1e-8
+# Closer than this to pi the axis is taken from the symmetric part, where the skew-symmetric part vanishes [rad]
+_NEAR_PI = 1e-4
+
+def rotation_vectors(matrices):
+    """
+    Function that converts rotation matrices to rotation vectors
+
+    Args:
+        matrices: (N,3,3) array of rotation matrices. A single 3x3 matrix is also accepted
+
+    Returns:
+        vectors: (N,3) array of rotation vectors. Angles are in [0, pi]
+    """
+    m = np.asarray(matrices, dtype = float).reshape((-1, 3, 3))
+    # 2 * sin(angle) * axis
+    skew = np.stack((m[:, 2, 1] - m[:, 1, 2], m[:, 0, 2] - m[:, 2, 0], m[:, 1, 0] - m[:, 0, 1]), axis = -1)
+    sin_angles = 0.5 * np.sqrt(np.einsum('ij,ij->i', skew, skew))
+    cos_angles = (np.trace(m, axis1 = 1, axis2 = 2) - 1.0) * 0.5
+    # atan2 stays accurate near 0 and pi where arccos of the trace does not
+    angles = np.arctan2(sin_angles, cos_angles)
+
+    vectors = np.empty_like(skew)
+    small = angles < _SMALL_ANGLE
+    near_pi = np.pi - angles < _NEAR_PI
+    general = ~(small | near_pi)
+
+    # 0 singularity: angle * axis = skew / 2 to first order
+    vectors[small] = 0.5 * skew[small]
+    vectors[general] = skew[general] * (angles[general] / (2.0 * sin_angles[general]))[:, np.newaxis]
+    if np.any(near_pi):
+        vectors[near_pi] = _axes_near_pi(m[near_pi], cos_angles[near_pi], skew[near_pi]) * angles[near_pi][:, np.newaxis]
+    return vectors
+
+def rotation_matrices(vectors):
+    """
+    Function that converts rotation vectors to rotation matrices with the Rodrigues formula
+
+    Args:
+        vectors: (N,3) array of rotation vectors. A single rotation vector is also accepted
+
+    Returns:
+        matrices: (N,3,3) array of rotation matrices
+    """
+    v = np.asarray(vectors, dtype = float).reshape((-1, 3))
+    angles = np.sqrt(np.einsum('ij,ij->i', v, v))
+    axes = np.zeros_like(v)
+    nonzero = angles > 0.0
+    axes[nonzero] = v[nonzero] / angles[nonzero][:, np.newaxis]
+    c = np.cos(angles)[:, np.newaxis, np.newaxis]
+    s = np.sin(angles)[:, np.newaxis, np.newaxis]
+    x, y, z = axes[:, 0], axes[:, 1], axes[:, 2]
+    zero = np.zeros_like(x)
+    cross_matrices = np.stack((np.stack((zero, -z, y), axis = -1),
+                               np.stack((z, zero, -x), axis = -1),
+                               np.stack((-y, x, zero), axis = -1)), axis = 1)
+    outer = axes[:, :, np.newaxis] * axes[:, np.newaxis, :]
+    return c * np.eye(3) + s * cross_matrices + (1.0 - c) * outer
+
+def poses_from_frames(frames):
+    """
+    Function that converts frames to UR poses
+
+    Args:
+        frames: (N,4,4) array of frames
+
+    Returns:
+        poses: (N,6) array of (x,y,z,ax,ay,az)
+    """
+    frames = np.asarray(frames, dtype = float).reshape((-1, 4, 4))
+    return np.hstack((frames[:, :3, 3], rotation_vectors(frames[:, :3, :3])))
+
+def frames_from_poses(poses):
+    """
+    Function that converts UR poses to frames
+
+    Args:
+        poses: (N,6) array of (x,y,z,ax,ay,az)
+
+    Returns:
+        frames: (N,4,4) array of frames
+    """
+    poses = np.asarray(poses, dtype = float).reshape((-1, 6))
+    frames = np.zeros((len(poses), 4, 4))
+    frames[:, :3, :3] = rotation_matrices(poses[:, 3:])
+    frames[:, :3, 3] = poses[:, :3]
+    frames[:, 3, 3] = 1.0
+    return frames
+
+def _axes_near_pi(m, cos_angles, skew):
+    """Private function that returns rotation axes of matrices with angles close to pi
+    The symmetric part of R is cos(angle) * I + (1 - cos(angle)) * axis * axis^T. The axis is its column with the
+    largest diagonal term, normalized. The sign is taken from the (small) skew-symmetric part, or made positive along
+    that column when the skew-symmetric part vanishes too.
+    """
+    outer = 0.5 * (m + np.transpose(m, (0, 2, 1))) - cos_angles[:, np.newaxis, np.newaxis] * np.eye(3)
+    rows = np.arange(len(m))
+    k = np.argmax(np.diagonal(outer, axis1 = 1, axis2 = 2), axis = 1)
+    axes = outer[rows, :, k]
+    axes /= np.sqrt(np.einsum('ij,ij->i', axes, axes))[:, np.newaxis]
+    signs = np.sign(np.einsum('ij,ij->i', axes, skew))
+    signs[signs == 0] = 1.0
+    return axes * signs[:, np.newaxis]
@@ -0,0 +1,280 @@
+""" secondary.py module decodes the message stream of the primary and secondary interfaces (comm.PORT).
+Besides accepting scripts, the controller pushes length-prefixed messages on these ports: a robot state message about
+10 times per second and robot messages (texts, popups, runtime exceptions, errors) when they happen. StateParser
+follows the robot mode data and the robot messages and turns them into program events:
+    1) PROGRAM_STARTED when the controller reports a program running
+    2) PROGRAM_FINISHED when a program stops running without a fault
+    3) PROGRAM_FAULTED on a runtime exception (including compile errors of a script that never started) or a
+       protective or emergency stop during a program
+    4) POPUP when a program or the controller shows a popup
+
+The robot mode is only sampled by the state messages, about every 0.1 s. A program that starts and ends between two of
+them is never reported running, so it raises neither PROGRAM_STARTED nor PROGRAM_FINISHED by itself. Whoever sends a
+program calls StateParser.expect_program first: the first robot state at least settle seconds later that shows no
+program running then raises PROGRAM_FINISHED, unless the program was seen running or faulted meanwhile. settle must
+cover the time the controller takes to start the program, a larger program that takes longer to compile would
+otherwise be reported finished before it started.
+
+StateMonitor is a realtime.RealtimeClient on the primary interface that yields these events, and can run on a
+background thread so others can wait for the next event without polling joint positions or padding with sleep.
+
+Usage:
+    monitor = StateMonitor('192.168.10.13')
+    monitor.start()
+    mark = monitor.sequence
+    monitor.parser.expect_program()
+    comm.send_script(program, '192.168.10.13')
+    event = monitor.wait_for((PROGRAM_FINISHED, PROGRAM_FAULTED), since = mark, timeout = 60)
+"""
+
+import socket
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+import comm
+import realtime
+
+# Message types of the primary and secondary interfaces
+MESSAGE_ROBOT_STATE = 16
+MESSAGE_ROBOT_MESSAGE = 20
+MESSAGE_PROGRAM_STATE = 25
+
+# Package types of a robot state message
+PACKAGE_ROBOT_MODE = 0
+
+# Types of a robot message
+ROBOT_MESSAGE_TEXT = 0
+ROBOT_MESSAGE_PROGRAM_LABEL = 1
+ROBOT_MESSAGE_POPUP = 2
+ROBOT_MESSAGE_VERSION = 3
+ROBOT_MESSAGE_ERROR_CODE = 6
+ROBOT_MESSAGE_KEY = 7
+ROBOT_MESSAGE_RUNTIME_EXCEPTION = 10
+
+ROBOT_MODES = {-1: 'NO_CONTROLLER', 0: 'DISCONNECTED', 1: 'CONFIRM_SAFETY', 2: 'BOOTING', 3: 'POWER_OFF',
+               4: 'POWER_ON', 5: 'IDLE', 6: 'BACKDRIVE', 7: 'RUNNING', 8: 'UPDATING_FIRMWARE'}
+
+# Events
+PROGRAM_STARTED = 'started'
+PROGRAM_FINISHED = 'finished'
+PROGRAM_FAULTED = 'faulted'
+POPUP = 'popup'
+
+# Message and package headers: length including the header, then the type
+MESSAGE_HEADER = struct.Struct("!iB")
+# Robot message header after the message header: timestamp, source, robot message type
+ROBOT_MESSAGE_HEADER = struct.Struct("!QbB")
+# Start of the robot mode data package after its header, the same from CB2 to e-series: timestamp, real robot
+# connected, real robot enabled, power on, emergency stopped, protective stopped, program running, program paused,
+# robot mode
+ROBOT_MODE = struct.Struct("!Q7?b")
+
+RobotModeData = namedtuple('RobotModeData', 'timestamp real_robot_connected real_robot_enabled power_on '
+                                            'emergency_stopped protective_stopped program_running program_paused '
+                                            'robot_mode')
+# kind: one of the event constants, time: local time the message was parsed [s], detail: message of the controller
+Event = namedtuple('Event', 'kind time detail')
+
+class StateParser(object):
+    """Follows the program state of the robot from primary or secondary interface messages
+
+    Attributes:
+    robot_mode: Latest RobotModeData, None until the first robot state message
+    program_running: True while the controller reports a running program
+    last_fault: Detail of the last fault (string), None if there was none
+    """
+
+    def __init__(self):
+        self.robot_mode = None
+        self.program_running = False
+        self.last_fault = None
+        self._faulted = False
+        # local time from which a state without a running program ends a program that was sent, None if none was
+        self._expected = None
+
+    def expect_program(self, settle = 0.2):
+        """Marks that a program is about to be sent, so it is reported finished even if it is never seen running
+        Call it before sending. The mark is cleared by the next program event.
+        Args:
+        settle: Optional. Longest time the controller takes to start the program [s]. Robot states received sooner
+                do not end the program
+        """
+        self._expected = time.time() + settle
+
+    def feed(self, data):
+        """Parses one message and returns the events it raised
+        Args:
+        data: Complete message including its length header (byte[]), e.g. from realtime.RealtimeClient.read_packet
+        Returns:
+        List of Event
+        """
+        message_length, message_type = MESSAGE_HEADER.unpack_from(data)
+        if message_type == MESSAGE_ROBOT_STATE:
+            return self._robot_state(data, message_length)
+        if message_type == MESSAGE_ROBOT_MESSAGE:
+            return self._robot_message(data, message_length)
+        return []
+
+    def _robot_state(self, data, message_length):
+        """Private method that parses the packages of a robot state message"""
+        events = []
+        offset = MESSAGE_HEADER.size
+        while offset + MESSAGE_HEADER.size <= message_length:
+            package_length, package_type = MESSAGE_HEADER.unpack_from(data, offset)
+            if package_length < MESSAGE_HEADER.size:
+                break
+            if package_type == PACKAGE_ROBOT_MODE and package_length >= MESSAGE_HEADER.size + ROBOT_MODE.size:
+                mode = RobotModeData._make(ROBOT_MODE.unpack_from(data, offset + MESSAGE_HEADER.size))
+                events.extend(self._update(mode))
+            offset += package_length
+        return events
+
+    def _update(self, mode):
+        """Private method that compares new robot mode data with the previous and returns the events"""
+        events = []
+        now = time.time()
+        previous = self.robot_mode
+        self.robot_mode = mode
+        stopped = mode.protective_stopped or mode.emergency_stopped
+        if self.program_running and stopped and not (previous.protective_stopped or previous.emergency_stopped):
+            events.append(self._fault(now, 'Emergency stop' if mode.emergency_stopped else 'Protective stop'))
+        if mode.program_running and not self.program_running:
+            self._faulted = False
+            self._expected = None
+            events.append(Event(PROGRAM_STARTED, now, None))
+        elif self.program_running and not mode.program_running and not self._faulted:
+            self._expected = None
+            events.append(Event(PROGRAM_FINISHED, now, None))
+        elif self._expected is not None and not mode.program_running and now >= self._expected:
+            # started and ended between two states
+            self._expected = None
+            events.append(Event(PROGRAM_FINISHED, now, None))
+        self.program_running = mode.program_running
+        return events
+
+    def _robot_message(self, data, message_length):
+        """Private method that parses a robot message"""
+        offset = MESSAGE_HEADER.size
+        timestamp, source, robot_message_type = ROBOT_MESSAGE_HEADER.unpack_from(data, offset)
+        offset += ROBOT_MESSAGE_HEADER.size
+        now = time.time()
+        if robot_message_type == ROBOT_MESSAGE_RUNTIME_EXCEPTION:
+            line, column = struct.unpack_from("!ii", data, offset)
+            text = _text(data, offset + 8, message_length)
+            return [self._fault(now, "Line {0}, column {1}: {2}".format(line, column, text))]
+        if robot_message_type == ROBOT_MESSAGE_POPUP:
+            request_id, request_type, warning, error, blocking, title_size = struct.unpack_from("!II???B", data, offset)
+            offset += 12
+            title = _text(data, offset, offset + title_size)
+            text = _text(data, offset + title_size, message_length)
+            return [Event(POPUP, now, "{0}: {1}".format(title, text) if title else text)]
+        return []
+
+    def _fault(self, now, detail):
+        """Private method that records a fault and returns its event"""
+        self._faulted = True
+        self._expected = None
+        self.last_fault = detail
+        return Event(PROGRAM_FAULTED, now, detail)
+
+def _text(data, start, end):
+    """Private function that decodes a text field of a message"""
+    return bytes(data[start:end]).decode('utf-8', 'replace')
+
+class StateMonitor(realtime.RealtimeClient):
+    """Long-lived client for the program events of one robot
+
+    Args:
+    robot_ip: IP address of robot (string)
+    port: Optional. Port of the primary or secondary interface (int)
+    timeout: Optional. Socket timeout for connecting and receiving. Longer than the 0.1 s robot state period [s]
+    reconnect_delay: Optional. Wait time before reconnecting after the connection is lost [s]
+    history: Optional. Number of events kept for wait_for
+    """
+
+    def __init__(self, robot_ip, port = comm.PORT, timeout = 1.0, reconnect_delay = 0.5, history = 1000):
+        self.parser = StateParser()
+        # states() yields the list of events of every message
+        realtime.RealtimeClient.__init__(self, robot_ip, port, timeout, reconnect_delay, decoder = self.parser.feed)
+        self.sequence = 0
+        self._history = deque(maxlen = history)
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def events(self, reconnect = True):
+        """Generator of program events as the controller reports them
+        Args:
+        reconnect: Optional. True to reconnect when the connection is lost, False to raise socket.error
+        """
+        for data in self.packets(reconnect):
+            for event in self.parser.feed(data):
+                with self._condition:
+                    self.sequence += 1
+                    self._history.append((self.sequence, event))
+                    self._condition.notify_all()
+                yield event
+
+    def start(self, callback = None):
+        """Follows the events on a background thread. Does nothing if already running
+        Args:
+        callback: Optional. Function called with every Event on the background thread
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.open(connect = False)
+        self._thread = threading.Thread(target = self._run, args = (callback,),
+                                        name = "StateMonitor {0}".format(self.robot_ip))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """Closes the connection, stops running event generators and wakes every wait_for"""
+        realtime.RealtimeClient.close(self)
+        with self._condition:
+            self._condition.notify_all()
+
+    def stop(self):
+        """Stops the background thread and closes the connection"""
+        self.close()
+        if self._thread is not None:
+            self._thread.join(self.timeout + 1.0)
+            self._thread = None
+
+    def wait_for(self, kinds, since = None, timeout = None):
+        """Waits for the first event of the given kinds after a sequence number. Requires start()
+        Args:
+        kinds: Event kinds, e.g. (PROGRAM_FINISHED, PROGRAM_FAULTED)
+        since: Optional. Value of sequence taken before the action that causes the event. Defaults to now
+        timeout: Optional. Longest wait [s]. None waits forever
+        Returns:
+        Event, or None on timeout or when the monitor is closed
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            if since is None:
+                since = self.sequence
+            while True:
+                for number, event in self._history:
+                    if number > since and event.kind in kinds:
+                        return event
+                if self._closed:
+                    return None
+                since = max(since, self._history[-1][0] if self._history else since)
+                if deadline is None:
+                    self._condition.wait(1.0)
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    self._condition.wait(remaining)
+
+    def _run(self, callback):
+        """Private method that runs on the background thread until stopped"""
+        try:
+            for event in self.events():
+                if callback is not None:
+                    callback(event)
+        except socket.error:
+            pass
@@ -0,0 +1,152 @@
+""" streaming.py module executes long paths by trickle-feeding targets to a small resident program.
+Instead of sending one script with a motion command per target, the robot runs a fixed loop that reads the next target
+from a socket opened to this computer. The host keeps at most `lookahead` targets in flight and sends the next one
+each time the robot acknowledges a target, so memory and latency stay constant regardless of path length.
+
+Usage:
+    streamer = TrajectoryStreamer('192.168.10.1')
+    program = streamer.program(lambda target: ur.servoc(target, 0.01, 0.0085, 0.01))
+    comm.send_script(program, robot_ip)
+    streamer.stream(poses)          # any iterable or generator of (x,y,z,ax,ay,az)
+    streamer.close()
+"""
+
+import socket
+
+import comm
+import urscript as ur
+from program import Function
+
+# URScript expressions of the streamed target inside the resident program
+POSE_TARGET = 'p[target[1], target[2], target[3], target[4], target[5], target[6]]'
+JOINT_TARGET = '[target[1], target[2], target[3], target[4], target[5], target[6]]'
+
+class TrajectoryStreamer(object):
+    """Host side of the streaming execution mode. Listens for the resident program and feeds it targets
+
+    Args:
+    host_ip: IP address of this computer as seen from the robot (string)
+    port: Optional. Port to listen on (int)
+    lookahead: Optional. Maximum number of targets sent but not yet acknowledged by the robot
+    timeout: Optional. Time to wait for the robot to connect and to acknowledge a target [s]
+    socket_name: Optional. Name of the socket inside the resident program (string)
+    """
+
+    def __init__(self, host_ip, port = 30010, lookahead = 16, timeout = 10.0, socket_name = 'stream'):
+        self.host_ip = host_ip
+        self.lookahead = lookahead
+        self.timeout = timeout
+        self.socket_name = socket_name
+        self.sent_count = 0
+        self.acknowledged_count = 0
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('', port))
+        self._server.listen(1)
+        self.port = self._server.getsockname()[1]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def program(self, motion = None, target = POSE_TARGET, name = 'stream'):
+        """Returns the resident UR Script program that reads targets from this streamer
+        Args:
+        motion: Optional. Function that returns the motion statement for a target expression, e.g.
+                lambda target: ur.movel(target, 0.1, 0.1). Defaults to servoc
+        target: Optional. POSE_TARGET or JOINT_TARGET, how the six streamed values are interpreted
+        name: Optional. Name of the program (string)
+        Returns:
+        Formatted UR Script program
+        """
+        if motion is None:
+            motion = lambda target: ur.servoc(target)
+        read_target = ur.expression('target', ur.socket_read_ascii_float(6, self.socket_name))
+        main = Function(name)
+        main.add(ur.socket_open('"{0}"'.format(self.host_ip), self.port, self.socket_name),
+                 ur.socket_send_line('ready', self.socket_name),
+                 read_target)
+        main.block('while target[0] == 6:').add(motion(target),
+                                               ur.socket_send_line('next', self.socket_name),
+                                               read_target)
+        main.add(ur.socket_close(self.socket_name))
+        return str(main)
+
+    def stream(self, targets):
+        """Waits for the resident program to connect and feeds it targets until the iterable is exhausted
+        Closing the connection at the end makes the program leave its loop.
+        Args:
+        targets: Iterable of targets with six values each, e.g. poses (x,y,z,ax,ay,az) or joint positions
+        Returns:
+        Number of targets sent
+        Raises:
+        socket.error or socket.timeout if the robot does not connect or stops acknowledging targets
+        """
+        self._server.settimeout(self.timeout)
+        conn, address = self._server.accept()
+        conn.settimeout(self.timeout)
+        self.sent_count = 0
+        self.acknowledged_count = 0
+        reader = _LineReader(conn)
+        try:
+            if reader.readline() != b'ready':
+                raise socket.error("Unexpected greeting from {0}".format(address[0]))
+            for target in targets:
+                while self.sent_count - self.acknowledged_count >= self.lookahead:
+                    self._wait_ack(reader)
+                conn.sendall(_format_target(target))
+                self.sent_count += 1
+            while self.acknowledged_count < self.sent_count:
+                self._wait_ack(reader)
+        finally:
+            conn.close()
+        return self.sent_count
+
+    def run(self, robot_ip, targets, motion = None, target = POSE_TARGET, sender = None):
+        """Sends the resident program to the robot and streams targets to it
+        Args:
+        robot_ip: IP address of robot (string)
+        targets: Iterable of targets with six values each
+        motion, target: Optional. See program
+        sender: Optional. comm.ScriptSender to reuse for sending the program
+        Returns:
+        Number of targets sent
+        """
+        program = self.program(motion, target)
+        if sender is None:
+            comm.send_script(program, robot_ip)
+        else:
+            sender.send(program)
+        return self.stream(targets)
+
+    def close(self):
+        self._server.close()
+
+    def _wait_ack(self, reader):
+        """Private method that waits for the robot to acknowledge one target"""
+        line = reader.readline()
+        if line != b'next':
+            raise socket.error("Unexpected reply {0!r} after {1} targets".format(line, self.acknowledged_count))
+        self.acknowledged_count += 1
+
+class _LineReader(object):
+    """Private helper that reads newline terminated replies from a socket"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._buffer = b''
+
+    def readline(self):
+        while b'\n' not in self._buffer:
+            chunk = self._conn.recv(4096)
+            if not chunk:
+                raise socket.error("Connection closed by robot")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line.strip()
+
+def _format_target(target):
+    """Private function that formats six values for socket_read_ascii_float"""
+    return "({0:f},{1:f},{2:f},{3:f},{4:f},{5:f})\n".format(*target).encode('ascii')
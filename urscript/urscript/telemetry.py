@@ -0,0 +1,181 @@
+""" telemetry.py module stores realtime robot states in a compact binary log file and replays them.
+
+File layout:
+    1) Magic bytes "URTLOG", format version (uint16) and header size (uint32), little-endian
+    2) JSON text describing the record layout, padded with spaces to the header size
+    3) Fixed-width records, one per packet. Each record holds the logged fields back to back, little-endian
+
+TelemetryWriter appends records while streaming and only needs the standard library.
+TelemetryReader memory-maps the file with NumPy and returns one array view per field, so multi-hour logs are not
+loaded into memory, e.g.
+
+    log = TelemetryReader('run.urtl')
+    log['actual_joints_pos']        # (N,6) array
+"""
+
+import json
+import os
+import struct
+
+import comm
+
+try:
+    import numpy as np
+except ImportError:
+    # TelemetryWriter works without NumPy, TelemetryReader needs it
+    np = None
+
+MAGIC = b'URTLOG'
+VERSION = 1
+_PREAMBLE = struct.Struct('<6sHI')
+_HEADER_ALIGNMENT = 64
+_RECORD_FORMATS = {"i": ("<i4", "i"), "d": ("<f8", "d")}
+
+class TelemetryWriter(object):
+    """Appends realtime packets to a telemetry log file
+
+    Usage:
+        with TelemetryWriter('run.urtl') as log:
+            for data in realtime.RealtimeClient(ip).packets():
+                log.append(data)
+
+    Args:
+    path: Path of the log file. An existing log with the same fields is appended to
+    fields: Optional. Names of the fields to log (see comm.RT_FIELDS). Defaults to all fields
+    """
+
+    def __init__(self, path, fields = None):
+        layout = _select_fields(fields)
+        self.fields = tuple(name for name, offset, value_fmt, count in layout)
+        self.header = _make_header(layout)
+        self._packet_struct = comm._compile_layout(layout)[0]
+        self._record_struct = struct.Struct('<' + ''.join('{0}{1}'.format(count, _RECORD_FORMATS[value_fmt][1])
+                                                          for name, offset, value_fmt, count in layout))
+        self.record_count = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            existing, header_size = _read_header(path)
+            if existing["fields"] != self.header["fields"]:
+                raise ValueError("{0} was logged with different fields".format(path))
+            # drop a partial record left by an interrupted write
+            self.record_count = (os.path.getsize(path) - header_size) // existing["record_size"]
+            self._file = open(path, 'r+b')
+            self._file.truncate(header_size + self.record_count * existing["record_size"])
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(_encode_header(self.header))
+        self.path = path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, data):
+        """Appends one state to the log
+        Args:
+        data: Raw realtime packet (byte[]) or a dictionary in the format of comm.listen
+        """
+        if hasattr(data, 'keys'):
+            values = []
+            for name in self.fields:
+                values.extend(data[name])
+        else:
+            values = self._packet_struct.unpack_from(data)
+        self._file.write(self._record_struct.pack(*values))
+        self.record_count += 1
+
+    def flush(self):
+        """Writes buffered records to disk so readers can see them"""
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class TelemetryReader(object):
+    """Memory-mapped reader of a telemetry log file. Requires NumPy
+
+    Args:
+    path: Path of the log file
+    """
+
+    def __init__(self, path):
+        if np is None:
+            raise ImportError("TelemetryReader requires NumPy")
+        self.path = path
+        self.header, self.header_size = _read_header(path)
+        self.fields = tuple(field["name"] for field in self.header["fields"])
+        self.dtype = _record_dtype(self.header)
+        self.records = None
+        self.refresh()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, name):
+        """Returns all values of a field over time as an array view, e.g. reader['time'] has shape (N,)"""
+        return self.records[name]
+
+    def refresh(self):
+        """Maps the file again to include records appended since the reader was opened"""
+        count = (os.path.getsize(self.path) - self.header_size) // self.dtype.itemsize
+        if count > 0:
+            self.records = np.memmap(self.path, dtype = self.dtype, mode = 'r', offset = self.header_size, shape = (count,))
+        else:
+            self.records = np.zeros(0, dtype = self.dtype)
+
+    def close(self):
+        """Releases the memory map"""
+        self.records = None
+
+# ----- Header functions -----
+
+def _select_fields(names):
+    """Private function that returns the comm.RT_FIELDS entries for the given field names, in packet order"""
+    if names is None:
+        return comm.RT_FIELDS
+    unknown = set(names) - set(field[0] for field in comm.RT_FIELDS)
+    if unknown:
+        raise ValueError("Unknown realtime fields: {0}".format(', '.join(sorted(unknown))))
+    return tuple(field for field in comm.RT_FIELDS if field[0] in names)
+
+def _make_header(layout):
+    """Private function that describes the record layout of the given fields"""
+    fields = []
+    offset = 0
+    for name, packet_offset, value_fmt, count in layout:
+        dtype = _RECORD_FORMATS[value_fmt][0]
+        fields.append({"name": name, "dtype": dtype, "count": count, "offset": offset})
+        offset += count * struct.calcsize('<' + _RECORD_FORMATS[value_fmt][1])
+    return {"version": VERSION, "record_size": offset, "fields": fields}
+
+def _encode_header(header):
+    """Private function that returns the header bytes, padded so records start at an aligned offset"""
+    text = json.dumps(header, sort_keys = True).encode('ascii')
+    size = _PREAMBLE.size + len(text)
+    size += -size % _HEADER_ALIGNMENT
+    return _PREAMBLE.pack(MAGIC, VERSION, size) + text + b' ' * (size - _PREAMBLE.size - len(text))
+
+def _read_header(path):
+    """Private function that returns the header dictionary and header size of a log file"""
+    f = open(path, 'rb')
+    try:
+        magic, version, size = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError("{0} is not a telemetry log".format(path))
+        if version > VERSION:
+            raise ValueError("{0} has unsupported version {1}".format(path, version))
+        header = json.loads(f.read(size - _PREAMBLE.size).decode('ascii'))
+    finally:
+        f.close()
+    return header, size
+
+def _record_dtype(header):
+    """Private function that returns the NumPy dtype of one record"""
+    fields = header["fields"]
+    return np.dtype({"names": [str(field["name"]) for field in fields],
+                     "formats": [str(field["dtype"]) if field["count"] == 1 else (str(field["dtype"]), (field["count"],))
+                                 for field in fields],
+                     "offsets": [field["offset"] for field in fields],
+                     "itemsize": header["record_size"]})
@@ -0,0 +1,182 @@
+""" toolpath.py module prepares whole lists of targets for pose and kinematics generation.
+Targets are read from planes once into frame matrices and the base frame is applied to all of them in one batched
+matrix product, instead of copying and transforming one Rhino plane per target.
+
+With NumPy, frames are (N,4,4) arrays that can be passed to batch_kinematics.inverse_kinematics or turned into a
+poses.PoseArray. Without NumPy (e.g. IronPython in Grasshopper) the same functions return lists of 4x4 tuples and
+lists of poses.Pose, computed with core.py.
+
+simplify and blend_radii reduce a dense toolpath before statements are generated and require NumPy.
+
+Usage:
+    frames = frames_from_planes(target_planes)
+    keep = simplify(frames, tolerance = 0.0005, angle_tolerance = 0.01)
+    targets = poses(frames[keep], base_plane)           # PoseArray, or a list of Pose without NumPy
+    radii = blend_radii(frames[keep, :3, 3], tolerance = 0.001)
+    statements = [ur.movel(p, accel, vel, blend = r) for p, r in zip(targets, radii)]
+"""
+
+import core
+import urscript as ur
+
+try:
+    import numpy as np
+    from poses import PoseArray
+    import rotations
+except ImportError:
+    np = None
+
+def frames_from_planes(planes):
+    """Returns the frames of many planes
+    Args:
+    planes: Planes with attributes "Origin", "XAxis", "YAxis" (e.g. Rhino planes), 4x4 frame matrices or an (N,4,4) array
+    Returns:
+    (N,4,4) array of frames, or a list of 4x4 tuples without NumPy
+    """
+    if np is None:
+        return [core.frame_from_plane(plane) for plane in planes]
+    if isinstance(planes, np.ndarray):
+        return planes.reshape((-1, 4, 4)).astype(float)
+    planes = list(planes)
+    if not planes or not hasattr(planes[0], 'Origin'):
+        return np.array([core.frame_from_plane(plane) for plane in planes], dtype = float).reshape((-1, 4, 4))
+    # read all coordinates in one pass, then build the frames with array operations
+    values = np.array([(p.Origin.X, p.Origin.Y, p.Origin.Z, p.XAxis.X, p.XAxis.Y, p.XAxis.Z, p.YAxis.X, p.YAxis.Y, p.YAxis.Z)
+                       for p in planes], dtype = float)
+    x = values[:, 3:6] / np.linalg.norm(values[:, 3:6], axis = 1)[:, np.newaxis]
+    y = values[:, 6:9] / np.linalg.norm(values[:, 6:9], axis = 1)[:, np.newaxis]
+    frames = np.zeros((len(values), 4, 4))
+    frames[:, :3, 0] = x
+    frames[:, :3, 1] = y
+    frames[:, :3, 2] = np.cross(x, y)
+    frames[:, :3, 3] = values[:, 0:3]
+    frames[:, 3, 3] = 1.0
+    return frames
+
+def apply_base(frames, base = None):
+    """Returns frames expressed relative to a base frame, i.e. the result of PlaneToPlane(WorldXY, base) on every frame
+    Args:
+    frames: Frames or planes accepted by frames_from_planes
+    base: Optional. Base plane or 4x4 frame matrix. Defaults to the world XY frame
+    Returns:
+    (N,4,4) array of frames, or a list of 4x4 tuples without NumPy
+    """
+    frames = frames_from_planes(frames)
+    if base is None:
+        return frames
+    base = core.frame_from_plane(base)
+    if np is None:
+        return [core.multiply(base, frame) for frame in frames]
+    return np.matmul(np.array(base, dtype = float), frames)
+
+def poses(frames, base = None):
+    """Returns the UR poses of many targets
+    Args:
+    frames: Frames or planes accepted by frames_from_planes
+    base: Optional. Base plane or 4x4 frame matrix applied to all targets
+    Returns:
+    poses.PoseArray, or a list of poses.Pose without NumPy
+    """
+    frames = apply_base(frames, base)
+    if np is None:
+        return [ur.pose_by_plane(frame) for frame in frames]
+    return PoseArray.from_frames(frames)
+
+# ----- Path reduction -----
+
+def simplify(frames, tolerance, angle_tolerance = None):
+    """Returns the indices of the targets to keep so that the dropped targets stay within tolerance of the motion
+    between the kept ones (Douglas-Peucker). Requires NumPy
+    A dropped target is within tolerance when its position is closer than tolerance to the straight line between its
+    kept neighbours and its orientation deviates less than angle_tolerance from the orientation the robot interpolates
+    at that point.
+    Args:
+    frames: Frames or planes accepted by frames_from_planes
+    tolerance: Largest position deviation [m]
+    angle_tolerance: Optional. Largest orientation deviation [rad]. Orientations are ignored if None
+    Returns:
+    Sorted array of indices of the targets to keep. The first and last targets are always kept
+    """
+    if np is None:
+        raise ImportError("simplify requires NumPy")
+    frames = frames_from_planes(frames)
+    if not len(frames):
+        return np.zeros(0, dtype = int)
+    positions = frames[:, :3, 3]
+    quaternions = _quaternions(frames[:, :3, :3]) if angle_tolerance is not None else None
+    keep = np.zeros(len(frames), dtype = bool)
+    keep[[0, -1]] = True
+    spans = [(0, len(frames) - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        inner = positions[first + 1:last]
+        chord = positions[last] - positions[first]
+        chord_length_squared = np.dot(chord, chord)
+        if chord_length_squared > 0:
+            t = np.clip(np.dot(inner - positions[first], chord) / chord_length_squared, 0.0, 1.0)
+        else:
+            # a pure reorientation progresses with the target index
+            t = np.arange(1, last - first) / float(last - first)
+        deviations = np.linalg.norm(inner - positions[first] - t[:, np.newaxis] * chord, axis = 1) / tolerance
+        if quaternions is not None:
+            expected = _slerp(quaternions[first], quaternions[last], t)
+            angles = 2.0 * np.arccos(np.clip(np.abs(np.sum(expected * quaternions[first + 1:last], axis = 1)), 0.0, 1.0))
+            deviations = np.maximum(deviations, angles / angle_tolerance)
+        worst = np.argmax(deviations)
+        if deviations[worst] > 1.0:
+            split = first + 1 + worst
+            keep[split] = True
+            spans.append((first, split))
+            spans.append((split, last))
+    return np.flatnonzero(keep)
+
+def blend_radii(positions, tolerance = None, fraction = 0.4, max_radius = None):
+    """Returns a blend radius for every target from the lengths of the segments around it and the turn it makes
+    Args:
+    positions: (N,3) array of target positions [m]
+    tolerance: Optional. Largest distance the blended path may pass from a target corner [m]
+    fraction: Optional. Largest share of the shorter neighbouring segment used by a blend. Up to 0.5 keeps
+              consecutive blends from overlapping
+    max_radius: Optional. Upper bound of every radius [m]
+    Returns:
+    (N,) array of blend radii [m]. The first and last targets are not blended
+    """
+    if np is None:
+        raise ImportError("blend_radii requires NumPy")
+    positions = np.asarray(positions, dtype = float).reshape((-1, 3))
+    radii = np.zeros(len(positions))
+    if len(positions) < 3:
+        return radii
+    segments = np.diff(positions, axis = 0)
+    lengths = np.linalg.norm(segments, axis = 1)
+    radii[1:-1] = fraction * np.minimum(lengths[:-1], lengths[1:])
+    if tolerance is not None:
+        # the blend passes a corner at about radius * sin(turn / 2)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            cos_turns = np.sum(segments[:-1] * segments[1:], axis = 1) / (lengths[:-1] * lengths[1:])
+            half_turn_sines = np.sqrt(np.clip((1.0 - cos_turns) / 2.0, 0.0, 1.0))
+            radii[1:-1] = np.where(half_turn_sines > 0, np.minimum(radii[1:-1], tolerance / half_turn_sines),
+                                   radii[1:-1])
+    if max_radius is not None:
+        radii = np.minimum(radii, max_radius)
+    return np.nan_to_num(radii)
+
+def _quaternions(matrices):
+    """Private function that returns unit quaternions (w,x,y,z) of (N,3,3) rotation matrices"""
+    vectors = rotations.rotation_vectors(matrices)
+    angles = np.linalg.norm(vectors, axis = 1)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        axes = np.where(angles[:, np.newaxis] > 0, vectors / angles[:, np.newaxis], 0.0)
+    return np.hstack((np.cos(angles / 2)[:, np.newaxis], axes * np.sin(angles / 2)[:, np.newaxis]))
+
+def _slerp(q0, q1, t):
+    """Private function that returns quaternions interpolated along the shortest arc from q0 to q1 at parameters t"""
+    if np.dot(q0, q1) < 0:
+        q1 = -q1
+    angle = np.arccos(np.clip(np.dot(q0, q1), -1.0, 1.0))
+    if angle < 1e-9:
+        return np.tile(q0, (len(t), 1))
+    s = np.sin(angle)
+    return (np.sin((1 - t) * angle) / s)[:, np.newaxis] * q0 + (np.sin(t * angle) / s)[:, np.newaxis] * q1
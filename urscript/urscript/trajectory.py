@@ -0,0 +1,144 @@
+"""
+This module contains a time-optimal trajectory planner for servo streaming.
+A path of waypoints (joint angles, or positions for a Cartesian path) is followed along straight segments, split into
+steps of about one controller period. The path speed is bounded by per-axis velocity limits on every segment and by
+the acceleration needed to turn at every corner. A forward and a backward pass over the squared speed make it
+reachable from the start and stoppable at the end with the acceleration the corners leave free. Both passes and the
+sampling are vectorized over the whole path.
+
+Usage:
+    joints, configurations, jumps = batch_kinematics.inverse_kinematics_path(frames, 'UR5', start = current_joints)
+    trajectory = plan(joints, max_velocity = 1.0, max_acceleration = 2.0)
+    statements = servoj_statements(trajectory)          # one servoj per controller period
+    # or stream the samples: streaming.TrajectoryStreamer(...).run(ip, trajectory.positions,
+    #     motion = lambda target: ur.servoj(target, trajectory.period), target = streaming.JOINT_TARGET)
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+import urscript as ur
+
+# Controller period of the CB3 robots, 125 Hz. The e-series also accepts servo targets at this rate [s]
+PERIOD = 0.008
+
+# Share of the acceleration limits that corners may use to turn the velocity. The rest is left for speeding up or
+# slowing down along the path at the same time
+TURN_SHARE = 0.5
+
+# times: (M,) sample times [s], positions: (M,D) samples, period: sample spacing [s]
+Trajectory = namedtuple('Trajectory', 'times positions period')
+
+def plan(waypoints, max_velocity, max_acceleration, period = PERIOD):
+    """
+    Function that returns the time-optimal samples of a path under velocity and acceleration limits
+
+    Args:
+        waypoints: (N,D) array of path points, e.g. joint angles [rad] or tool positions [m]
+        max_velocity: Velocity limit of every axis, a scalar or D values [unit/s]
+        max_acceleration: Acceleration limit of every axis, a scalar or D values [unit/s^2]
+        period: Optional. Time between samples, the controller period by default [s]
+
+    Returns:
+        Trajectory of samples every period, starting and ending at rest. The last sample is the last waypoint
+
+    Raises:
+        ValueError if there are no waypoints or a limit is not positive
+    """
+    points = np.asarray(waypoints, dtype = float)
+    if points.ndim == 0 or len(points) == 0:
+        raise ValueError("A trajectory needs at least one waypoint")
+    points = points.reshape((len(points), -1))
+    velocity_limits = np.broadcast_to(np.asarray(max_velocity, dtype = float), points.shape[1:])
+    acceleration_limits = np.broadcast_to(np.asarray(max_acceleration, dtype = float), points.shape[1:])
+    if not (np.all(velocity_limits > 0) and np.all(acceleration_limits > 0)):
+        raise ValueError("Velocity and acceleration limits must be positive")
+    # repeated points have no direction
+    keep = np.concatenate(([True], np.any(np.diff(points, axis = 0) != 0, axis = 1)))
+    points = points[keep]
+    if len(points) < 2:
+        return Trajectory(np.zeros(1), points[:1].copy(), period)
+
+    deltas = np.diff(points, axis = 0)
+    lengths = np.linalg.norm(deltas, axis = 1)
+    directions = deltas / lengths[:, np.newaxis]
+    turn_limits = TURN_SHARE * acceleration_limits
+    with np.errstate(divide = 'ignore'):
+        # path speed allowed by the most limiting axis of each segment
+        segment_speeds = np.min(velocity_limits / np.abs(directions), axis = 1)
+        # a corner turns the velocity within one period, or within the shorter segment when corners follow closer
+        turns = np.abs(directions[1:] - directions[:-1])
+        corner_lengths = np.minimum(lengths[:-1], lengths[1:])[:, np.newaxis]
+        corner_speeds = np.min(np.minimum(turn_limits * period / turns,
+                                          np.sqrt(turn_limits * corner_lengths / turns)), axis = 1)
+    corner_speeds = np.minimum(np.minimum(segment_speeds[:-1], segment_speeds[1:]), corner_speeds)
+    # acceleration used by each corner to turn at its highest speed
+    corner_turns = turns * corner_speeds[:, np.newaxis] * np.maximum(1.0 / period,
+                                                                     corner_speeds[:, np.newaxis] / corner_lengths)
+
+    # split segments into steps of about one period at full speed, so the speed can change along long segments
+    counts = np.maximum(np.ceil(lengths / (segment_speeds * period)), 1).astype(int)
+    steps = np.repeat(np.arange(len(lengths)), counts)
+    step_lengths = (lengths / counts)[steps]
+    # distance from the segment start to the start of each step
+    step_offsets = (np.arange(len(steps)) - np.repeat(np.cumsum(counts) - counts, counts)) * step_lengths
+
+    # squared path speed limit at every step boundary, at rest at both ends
+    caps = np.zeros(len(steps) + 1)
+    caps[1:-1] = segment_speeds[steps[1:]]
+    corners = np.cumsum(counts)[:-1]
+    caps[corners] = corner_speeds
+    # path acceleration of every step, from what the corners at either end leave of the axis limits
+    turning = np.zeros((len(steps) + 1, points.shape[1]))
+    turning[corners] = corner_turns
+    available = acceleration_limits - np.maximum(turning[:-1], turning[1:])
+    with np.errstate(divide = 'ignore'):
+        step_accelerations = np.min(available / np.abs(directions[steps]), axis = 1)
+    speeds = _reachable_speeds(caps ** 2, 2.0 * step_accelerations * step_lengths)
+
+    # constant acceleration along every step
+    entry_speeds = speeds[:-1]
+    durations = 2.0 * step_lengths / (entry_speeds + speeds[1:])
+    accelerations = (speeds[1:] ** 2 - entry_speeds ** 2) / (2.0 * step_lengths)
+    starts = np.concatenate(([0.0], np.cumsum(durations)))
+    times = np.arange(0.0, starts[-1], period)
+    times = np.append(times, starts[-1]) if starts[-1] - times[-1] > 1e-9 else times
+
+    k = np.clip(np.searchsorted(starts, times, side = 'right') - 1, 0, len(steps) - 1)
+    t = np.minimum(times - starts[k], durations[k])
+    distances = np.clip(entry_speeds[k] * t + 0.5 * accelerations[k] * t * t, 0.0, step_lengths[k]) + step_offsets[k]
+    positions = points[steps[k]] + directions[steps[k]] * distances[:, np.newaxis]
+    positions[-1] = points[-1]
+    return Trajectory(times, positions, period)
+
+def servoj_statements(trajectory, lookahead_time = None, gain = None):
+    """Generator of servoj statements, one per sample after the first, formatted only when consumed
+    Args:
+    trajectory: Trajectory of joint angles
+    lookahead_time, gain: Optional. See urscript.servoj
+    """
+    period = trajectory.period
+    for joints in trajectory.positions[1:].tolist():
+        target = "[{0:.6f}, {1:.6f}, {2:.6f}, {3:.6f}, {4:.6f}, {5:.6f}]".format(*joints)
+        yield ur.servoj(target, period, lookahead_time, gain)
+
+def _reachable_speeds(caps, gains):
+    """
+    Private function that returns the highest path speeds at the step boundaries that can be reached from the start
+    and still stopped at the end
+
+    Args:
+        caps: (K+1,) squared speed limits at the step boundaries
+        gains: (K,) largest change of squared speed along every step, 2 * acceleration * length
+
+    Returns:
+        speeds: (K+1,) path speeds
+    """
+    # forward pass: caps[k] <= caps[j] + sum(gains[j:k]) for every j < k
+    totals = np.concatenate(([0.0], np.cumsum(gains)))
+    caps = np.minimum(caps, np.minimum.accumulate(caps - totals) + totals)
+    # backward pass: caps[k] <= caps[j] + sum(gains[k:j]) for every j > k
+    totals = totals[-1] - totals
+    caps = np.minimum(caps, np.minimum.accumulate((caps - totals)[::-1])[::-1] + totals)
+    return np.sqrt(np.maximum(caps, 0.0))
@@ -3,7 +3,7 @@
 It contains:
     1) Functions for generating, loading and saving UR Script programs/functions
     2) Functions for generating UR Script statements (commands,comments, expressions)
-    3) Functions for generating Pose type that is specific to UR script.
+    3) Functions for generating Pose type that is specific to UR script (see poses.py).
 
 """
 
@@ -11,6 +11,13 @@ It contains:
 
 import string
 import os.path
+import core
+import poses
+
+try:
+    basestring
+except NameError:
+    basestring = str
 
 def create_function(name, statements, inner_functions = (), arguments = ()):
     """Returns a UR script formatted program/function
@@ -35,11 +42,14 @@ def create_function(name, statements, inner_functions = (), arguments = ()):
 
 def statements(*ur_statement):
     """Convenience function to combine UR Script formatted statements(single or sequence) into one list
+    A Pose is a single value, not a sequence of six statements, and is added formatted as p[...]
     """
     _statements = []
     for urs in ur_statement:
         if hasattr(urs, 'strip'):      #assume urscript formatted string
             _statements.append(urs)
+        elif isinstance(urs, poses.Pose):
+            _statements.append(str(urs))
         elif hasattr(urs, '__iter__'):
             _statements.extend(urs)
     return _statements
@@ -72,8 +82,8 @@ def save_function(save_path, file_name, text):
         finally:
             print("file saved")
             f.close()
-    except IOError,e:
-        print e
+    except IOError as e:
+        print(e)
 
 def load_function(load_path, file_name):
     """Loads a text from file. Should be used to load already formatted UR script programs
@@ -87,8 +97,8 @@ def load_function(load_path, file_name):
     try:
         f = open(full_name)
         return "".join([line for line in f])
-    except IOError, e:
-        print e.strerror
+    except IOError as e:
+        print(e.strerror)
 
 #----- Functions for Generating UR Script commands (Interfaces, Motion and Internals modules), custom operations and miscellaneous statements -----
 
@@ -174,8 +184,8 @@ def movej(joints, accel = 3.0, vel = 0.75, time = 0.0, blend = 0.0):
     Returns:
     Formatted movej UR Script function
     """
-    if not hasattr(joints, 'strip'):
-        joints = list(joints)
+    if not hasattr(joints, 'strip') and not isinstance(joints, poses.Pose):
+        joints = [float(j) for j in joints]
     return 'movej({0}, a = {1:.2f}, v = {2:.2f}, t = {3:.4f}, r = {4:.2f})'.format(joints, accel, vel, time, blend)
 
 def movel(pose, accel = 1.2, vel = 0.3, time = 0.0, blend = 0.0):
@@ -224,15 +234,24 @@ def servoc(pose, accel = 1.2, vel = 0.3, blend = 0.0):
     """
     return 'servoc({0}, a = {1:.2f}, v = {2:.2f}, r = {3:.2f})'.format(pose, accel, vel, blend)
 
-def servoj(joints, time = 0.0):
+def servoj(joints, time = 0.0, lookahead_time = None, gain = None):
     """Returns UR script for servoj - Servo to position (linear in joint-space)    
     Args:
 	joints: Joint positions (can also be specified as a pose)
 	time: Optional. Time [s]       
+	lookahead_time: Optional. Time to look ahead to smoothen the trajectory, 0.03 to 0.2 [s]
+	gain: Optional. Proportional gain for following the target position, 100 to 2000
     Returns:
     Formatted servoj UR Script function
     """
-    return 'servoc({0},  t = {1:.4f})'%(joints, time)
+    if not hasattr(joints, 'strip') and not isinstance(joints, poses.Pose):
+        joints = [float(j) for j in joints]
+    command = 'servoj({0}, t = {1:.4f}'.format(joints, time)
+    if lookahead_time is not None:
+        command += ', lookahead_time = {0:.4f}'.format(lookahead_time)
+    if gain is not None:
+        command += ', gain = {0:.0f}'.format(gain)
+    return command + ')'
 
 def set_analog_out(id, signal):
     """Returns UR script for set_analog_out(n,f) - Set analog output level   
@@ -329,6 +348,18 @@ def socket_open(address, port, socket_name):
     """
     return 'socket_open({0}, {1},socket_name = "{2}")'.format(address,port,socket_name)
 
+def socket_read_ascii_float(number, socket_name):
+    """
+    Returns UR script for socket_read_ascii_float(number,socket_name) - Reads a number of ascii formatted floats from the server
+    The server sends them as "(1.0,2.0,3.0)". The result is a list whose first value is the number of floats read (0 on failure)
+    Args:
+	number: The number of floats to read (int)
+	socket name: Name of socket (string)   
+    Returns:
+    Formatted socket_read_ascii_float UR Script function
+    """
+    return 'socket_read_ascii_float({0},socket_name = "{1}")'.format(number,socket_name)
+
 def socket_send_line(str, socket_name):
     """
     Returns UR script for socket_send_string(str,socket_name) - Sends a string with a newline character to the server  
@@ -462,13 +493,13 @@ def custom_function(function_name, args = None):
     """ Formats a statement for calling a function
     Args:
     function_name: Name of function to call (string)
-    args: Optional. Arguments for the function
+    args: Optional. Arguments for the function. A single Pose is one argument
     Returns:
     A function call statement 
     """
     if not args:
         return '{0}()'.format(function_name)
-    elif hasattr(args, '__iter__') and not isinstance(args,basestring):
+    elif hasattr(args, '__iter__') and not isinstance(args,(basestring, poses.Pose)):
         return '{0}({1})'.format(function_name,','.join([str(a) for a in args]))
     else:
         return '{0}({1})'.format(function_name,args)
@@ -478,8 +509,11 @@ def custom_function(function_name, args = None):
 import math
 from collections import namedtuple
 
+# Orientation returned by axisangle_from_vectors. Use rotations.rotation_vectors to convert many orientations at once
+Axis_angle = namedtuple('Axis_angle','angle axis')
+
 def pose(x,y,z,ax,ay,az):
-    """Returns pose as a string in format p[x,y,z,ax,ay,az]
+    """Returns a Pose, which is formatted as p[x,y,z,ax,ay,az] in statements
     Args:
     x: X value of position vector [m]
     y: Y value of position vector [m]
@@ -488,52 +522,49 @@ def pose(x,y,z,ax,ay,az):
     ay: Y value of rotation vector
     az: Z value of rotation vector
     Returns:
-    Formatted pose
+    Pose (see poses.py)
     """     
-    return "p[{0:f}, {1:f}, {2:f}, {3:f}, {4:f}, {5:f}]".format(x,y,z,ax,ay,az) 
+    return poses.Pose(x,y,z,ax,ay,az)
 
 def pose_by_vectors(position,orientation):
-    """Returns pose as a string in format p[x,y,z,ax,ay,az]
+    """Returns a Pose, which is formatted as p[x,y,z,ax,ay,az] in statements
     Args:
     position: Vector (x,y,z) [m]
     orientation: Rotation vector based on axis-angle format
     Returns:
-    Formatted pose
+    Pose (see poses.py)
     """     
-    return "p[{0:f}, {1:f}, {2:f}, {3:f}, {4:f}, {5:f}]".format(*(tuple(position) + tuple(orientation)))
+    return poses.Pose.from_vectors(tuple(position), tuple(orientation))
 
 def pose_by_plane(plane):
-    """Returns pose as a string in format p[x,y,z,ax,ay,az] using plane argument
+    """Returns a Pose, which is formatted as p[x,y,z,ax,ay,az] in statements, using plane argument
     Use this with Rhino planes
     Args:
-    plane: Plane object that has attributes "XAxis", "YAxis", "ZAxis", "Origin"
+    plane: Plane object that has attributes "XAxis", "YAxis", "Origin", or a 4x4 frame matrix (see core.py)
     Returns:
-    Formatted pose
+    Pose (see poses.py)
     Raises:
     Attribute error if argument has no plane attributes
     """
     try:
-        origin = getattr(plane, "Origin")
-        xaxis = getattr(plane, "XAxis")
-        yaxis = getattr(plane, "YAxis")
-        zaxis = getattr(plane, "Normal")           
-    except AttributeError, e:
-        print "Handling attribute error:",e
+        frame = core.frame_from_plane(plane)
+    except AttributeError as e:
+        print("Handling attribute error: {0}".format(e))
     else:
-        position = (origin.X, origin.Y, origin.Z)
-        axis_angle = axisangle_from_vectors((xaxis, yaxis, zaxis))
+        position = core.column(frame, 3)
+        axis_angle = axisangle_from_vectors((core.column(frame, 0), core.column(frame, 1), core.column(frame, 2)))
         orientation = tuple([axis_angle.angle * item for item in axis_angle.axis])
-        return "p[{0:f}, {1:f}, {2:f}, {3:f}, {4:f}, {5:f}]".format(*(position + orientation))
+        return poses.Pose.from_vectors(position, orientation)
 
 def pose_by_origin_axis(origin, xaxis, yaxis):
-    """Returns pose as a string in format p[x,y,z,ax,ay,az] 
+    """Returns a Pose, which is formatted as p[x,y,z,ax,ay,az] in statements
     Uses information from a plane
     Args:
     origin: Vector (x,y,z) [m]
     xaxis: Xaxis of plane
     yaxis: Yaxis of plane
     Returns:
-    Formatted pose
+    Pose (see poses.py)
     """
     assert len(origin) == 3, "Please ensure origin vector has 3 values"
     assert len(xaxis) == 3, "Please ensure xaxis vector has 3 values"
@@ -544,7 +575,7 @@ def pose_by_origin_axis(origin, xaxis, yaxis):
                 xaxis[0] * yaxis[1] - xaxis[1] * yaxis[0])  
     axis_angle = axisangle_from_vectors((xaxis, yaxis, zaxis))
     orientation = tuple([axis_angle.angle * item for item in axis_angle.axis])
-    return "p[{0:f}, {1:f}, {2:f}, {3:f}, {4:f}, {5:f}]".format(*(tuple(origin) + orientation))
+    return poses.Pose.from_vectors(tuple(origin), orientation)
 
 
         
@@ -552,34 +583,34 @@ def axisangle_from_vectors(vectors):
     """ Returns an Axis_angle named_tuple using three orthonormal vectors as arguments  
     References Martin Baker's implementation of matrix to axis angle function at www.euclideanspace.com    
     Args:
-    vectors: A list of three orthonormal vectors.  
+    vectors: A list of three orthonormal vectors. Either (x,y,z) sequences or objects with X, Y, Z attributes
     Returns:
     Axis_angle named_tuple that defines an orientation representation  
     """ 
-    Axis_angle = namedtuple('Axis_angle','angle axis')
+    vectors = [core.vector(v) for v in vectors]
         
     epsilon = 0.01
     epsilon2 = 0.1   
-    if (math.fabs(vectors[1].X - vectors[0].Y) < epsilon) and \
-        (math.fabs(vectors[2].X - vectors[0].Z) < epsilon) and \
-        (math.fabs(vectors[2].Y - vectors[1].Z) < epsilon):
+    if (math.fabs(vectors[1][0] - vectors[0][1]) < epsilon) and \
+        (math.fabs(vectors[2][0] - vectors[0][2]) < epsilon) and \
+        (math.fabs(vectors[2][1] - vectors[1][2]) < epsilon):
     #singularity found
     #first check for identity matrix which must have +1 for all terms in leading diagonal and zero in other terms
-        if (math.fabs(vectors[1].X + vectors[0].Y) < epsilon2) and \
-            (math.fabs(vectors[2].X + vectors[0].Z) < epsilon2) and \
-            (math.fabs(vectors[2].Y + vectors[1].Z) < epsilon2) and \
-            (math.fabs(vectors[0].X + vectors[1].Y + vectors[2].Z - 3) < epsilon2):
+        if (math.fabs(vectors[1][0] + vectors[0][1]) < epsilon2) and \
+            (math.fabs(vectors[2][0] + vectors[0][2]) < epsilon2) and \
+            (math.fabs(vectors[2][1] + vectors[1][2]) < epsilon2) and \
+            (math.fabs(vectors[0][0] + vectors[1][1] + vectors[2][2] - 3) < epsilon2):
             # Identity matrix. Singularity found: angle = 0. 
             # Set zero angle and arbitrary axis
             return Axis_angle(0, (1,0,0))
         else:
             # Singularity found: angle = 180
-            xx = (vectors[0].X + 1)/2
-            yy = (vectors[1].Y + 1)/2
-            zz = (vectors[2].Z + 1)/2
-            xy = (vectors[1].X + vectors[0].Y)/4
-            xz = (vectors[2].X + vectors[0].Z)/4
-            yz = (vectors[2].Y + vectors[1].Z)/4            
+            xx = (vectors[0][0] + 1)/2
+            yy = (vectors[1][1] + 1)/2
+            zz = (vectors[2][2] + 1)/2
+            xy = (vectors[1][0] + vectors[0][1])/4
+            xz = (vectors[2][0] + vectors[0][2])/4
+            yz = (vectors[2][1] + vectors[1][2])/4            
             root_half = math.sqrt(0.5)
             if ((xx > yy) & (xx > zz)):
                 # vectors[0][0] is the largest diagonal term
@@ -589,14 +620,14 @@ def axisangle_from_vectors(vectors):
                     x = math.sqrt(xx)
                     axis = (x, xy/x, xz/x)
             elif (yy > zz): 
-                # vectors[1].Y is the largest diagonal term
+                # vectors[1][1] is the largest diagonal term
                 if (yy < epsilon):
                     axis = (root_half, 0, root_half)
                 else:
                     y = math.sqrt(yy)
                     axis = (xy/y, y, yz/y) 
             else: 
-                # vectors[2].Z is the largest diagonal term so base result on this
+                # vectors[2][2] is the largest diagonal term so base result on this
                 if (zz < epsilon):
                     axis = (root_half, root_half, 0)
                 else:
@@ -606,12 +637,12 @@ def axisangle_from_vectors(vectors):
     else:
         #no singularities
         s = math.sqrt(\
-            (vectors[1].Z - vectors[2].Y) * (vectors[1].Z - vectors[2].Y) + \
-            (vectors[2].X - vectors[0].Z) * (vectors[2].X - vectors[0].Z) + \
-            (vectors[0].Y - vectors[1].X) * (vectors[0].Y - vectors[1].X))
+            (vectors[1][2] - vectors[2][1]) * (vectors[1][2] - vectors[2][1]) + \
+            (vectors[2][0] - vectors[0][2]) * (vectors[2][0] - vectors[0][2]) + \
+            (vectors[0][1] - vectors[1][0]) * (vectors[0][1] - vectors[1][0]))
         if (math.fabs(s) < 0.001):
             #prevent divide by zero, should not happen if vectors are orthonormal
             s = 1
-        angle = math.acos((vectors[0].X + vectors[1].Y + vectors[2].Z - 1) / 2)
-        axis = ((vectors[1].Z - vectors[2].Y)/s, (vectors[2].X - vectors[0].Z)/s, (vectors[0].Y - vectors[1].X)/s)
+        angle = math.acos((vectors[0][0] + vectors[1][1] + vectors[2][2] - 1) / 2)
+        axis = ((vectors[1][2] - vectors[2][1])/s, (vectors[2][0] - vectors[0][2])/s, (vectors[0][1] - vectors[1][0])/s)
         return Axis_angle(angle, axis)
\ No newline at end of file
@@ -6,6 +6,7 @@ This module contains utility functions:
 
 import Rhino.Geometry as rg
 import math
+import core
 
 # ----- Coordinate System conversions -----
 
@@ -150,16 +151,7 @@ def signed_angle(v1,v2,v_normal):
     Returns:
         theta: float. signed angle between -pi and pi
     """
-    # from 0 to pi
-    c = rg.Vector3d.Multiply(v1,v2)
-    n = rg.Vector3d.CrossProduct(v1,v2)
-    s= n.Length
-    
-    theta  = math.atan2(s,c)
-    
-    if (rg.Vector3d.Multiply(n, v_normal) < 0):
-        theta *= -1
-    return theta
+    return core.signed_angle(core.vector(v1), core.vector(v2), core.vector(v_normal))
 
 def cir_cir_intersection(cir1,cir2):
     """
@@ -172,33 +164,13 @@ def cir_cir_intersection(cir1,cir2):
     Returns:
         xpts: list of 2 Point3d objectts
         
-    Note that there is no error checking
+    Returns None if the circles do not intersect
     """
-    r1 = cir1.Radius
-    r2 = cir2.Radius
-    d = cir1.Center.DistanceTo(cir2.Center)
-    
-    a = (r1 **2 - r2**2 + d**2)/(2*d)
-    h = math.sqrt(r1 **2 - a **2 )
-    
-    v_c1 = rg.Vector3d(cir1.Center)
-    v_c2 = rg.Vector3d(cir2.Center)
-    
-    v_c1c2 = v_c2 - v_c1
-    v_c1c2.Unitize()
-    v_c1c2 *= a
-    
-    v_pt0 = v_c1 + v_c1c2
-    
-    v_pt0ptX = rg.Vector3d.CrossProduct(cir1.Normal,v_c1c2)
-    v_pt0ptX.Unitize()
-    v_pt0ptX *= h
-    
-    xpt1 = rg.Point3d(v_pt0 + v_pt0ptX)
-    v_pt0ptX.Reverse()
-    xpt2 = rg.Point3d(v_pt0 + v_pt0ptX)
-
-    return [xpt1,xpt2]
+    xpts = core.cir_cir_intersection((core.vector(cir1.Center), core.vector(cir1.Normal), cir1.Radius),
+                                     (core.vector(cir2.Center), core.vector(cir2.Normal), cir2.Radius))
+    if xpts is None:
+        return None
+    return [rg.Point3d(*pt) for pt in xpts]
 
 def check_arguments(function):
     def decorated(*args):
@@ -9,7 +9,8 @@ Returns:
 	out [Text] - The execution information, as output and error streams
 	a [Generic Data] - Script variable Python
 """
-import comm
+import recorder
+import scriptcontext as sc
 from Grasshopper.Kernel import GH_RuntimeMessageLevel as gh_msg
 
 error_inputs = []
@@ -18,13 +19,25 @@ if not id: error_inputs.append('id')
 
 if not error_inputs:
     ip = '192.168.10.%d'%(10 * int(id) + 3)
+    # The recorder streams in the background and is kept between solutions, so reading never blocks the UI
+    key = 'your_listener_recorder_{0}'.format(ip)
+    rec = sc.sticky.get(key)
     if listen:
-        if datatype == 0:
-            a = comm.listen(ip)['tool_pose']
+        if rec is None:
+            rec = sc.sticky[key] = recorder.Recorder(ip)
+        rec.start()
+        state = rec.latest()
+        if state is None:
+            ghenv.Component.AddRuntimeMessage(gh_msg.Remark, 'Waiting for data from {0}'.format(ip))
+        elif datatype == 0:
+            a = state['tool_pose']
         elif datatype == 1:
-            a = comm.listen(ip)['actual_joints_pos']
+            a = state['actual_joints_pos']
         else:
-            a = ["{0} {1}".format(k,v) for k,v in comm.listen(ip).iteritems()]
+            a = ["{0} {1}".format(k,v) for k,v in state.iteritems()]
+    elif rec is not None:
+        rec.stop()
+        del sc.sticky[key]
 else:
     error_message = 'Failed to collect data for {0} required input(s): {1}'.format(len(error_inputs), ','.join(error_inputs))
     ghenv.Component.AddRuntimeMessage(gh_msg.Warning, error_message)
\ No newline at end of file
@@ -10,8 +10,10 @@ Returns:
 	out [Text] - The execution information, as output and error streams
 	a [Generic Data] - Script variable Python
 """
+import socket
 import comm
 import urscript as ur
+import scriptcontext as sc
 from Grasshopper.Kernel import GH_RuntimeMessageLevel as gh_msg
 
 error_inputs = []
@@ -30,7 +32,16 @@ if not error_inputs:
         script += ur.create_function('main',statements)  
     a = script
     if _send:
-        comm.send_script(script,ip)
+        # keep one sender per robot between solutions so repeated sends reuse the connection
+        key = 'your_sender_{0}'.format(ip)
+        sender = sc.sticky.get(key)
+        if sender is None:
+            sender = sc.sticky[key] = comm.ScriptSender(ip)
+        try:
+            report = sender.send(script)
+            print('Sent {0} bytes to {1} in {2:.3f}s'.format(report.bytes_sent, ip, report.seconds))
+        except socket.error as e:
+            ghenv.Component.AddRuntimeMessage(gh_msg.Error, 'Failed to send to {0}: {1}'.format(ip, e))
 else:
     error_message = 'Failed to collect data for {0} required input(s): {1}'.format(len(error_inputs), ','.join(error_inputs))
     ghenv.Component.AddRuntimeMessage(gh_msg.Warning, error_message)
\ No newline at end of file
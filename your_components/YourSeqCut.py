@@ -15,7 +15,7 @@ Returns:
 """
 
 import urscript as ur
-import Rhino.Geometry as rg
+import toolpath
 from Grasshopper.Kernel import GH_RuntimeMessageLevel as gh_msg
 
 
@@ -29,19 +29,13 @@ if not error_inputs:
     cut_accel = float(accel) if accel else 0.01
     cut_vel = float(vel) if vel else 0.0085
     cut_blend = float(radius) if radius else 0.01
-    start_joints = [float(sj) for sj in start_joints]
-    end_joints = [float(ej) for ej in end_joints]
+    start_joints = [float(sj) for sj in start]
+    end_joints = [float(ej) for ej in end]
     
     # Orient the cut planes with reference to robot base and create poses
-    matrix = rg.Transform.PlaneToPlane(rg.Plane.WorldXY, base)
-    print type(targets[0])
-    initial_cut_plane = rg.Plane(targets[0])
-    initial_cut_plane.Transform(matrix)
-    initial_cut_pose = ur.pose_by_plane(initial_cut_plane)
-    
-    cut_planes = targets[1:]
-    [cp.Transform(matrix) for cp in cut_planes]
-    cut_poses = [ur.pose_by_plane(cp) for cp in cut_planes]
+    poses = toolpath.poses(targets, base)
+    initial_cut_pose = poses[0]
+    cut_poses = poses[1:]
     
     commands = ur.statements(#1) Approach start position
                              ur.movej(start_joints,3.0, 3.0),